@@ -0,0 +1,43 @@
+"""
+Atomic file writes shared by every writer of the data directory.
+
+A file is written to a temporary file beside it, flushed and fsynced, then
+renamed over the target, so a reader sees either the old file or the new
+one and a crash mid-write leaves the old file in place.  The temporary
+file is removed if anything fails.  Compressed siblings (precompress.py)
+are the caller's business.
+"""
+
+import os
+import tempfile
+from collections.abc import Callable
+from typing import IO, Any
+
+
+def atomic_write_with(path: str, write_fn: Callable[[IO[Any]], object], mode: str = "w", mtime_ns: int | None = None) -> None:
+    """Write a file atomically by calling `write_fn` on the open temporary file.
+
+    `mode` is "w" for text (UTF-8, newlines as written) or "wb" for bytes.
+    With `mtime_ns` the file is stamped with that mtime before it becomes
+    visible.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8", "newline": ""})) as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if mtime_ns is not None:
+            os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path: str, data: str | bytes, mode: str = "w", mtime_ns: int | None = None) -> None:
+    """Write `data` to a file atomically; see atomic_write_with."""
+    atomic_write_with(path, lambda f: f.write(data), mode, mtime_ns)
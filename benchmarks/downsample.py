@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark LTTB downsampling (series.lttb) on multi-year synthetic series.
+
+For 1, 5 and 10 years of 15-minute readings — a seasonal level curve with
+noise and a handful of one-reading flood peaks — times the reduction to
+the chart sizes the readings API serves, and compares the JSON payload
+with the full range.  Also reports how many of the peaks survive, against
+the every-Nth-point striding the frontend uses today.
+
+Usage:
+    python benchmarks/downsample.py            # 1, 5 and 10 years
+    python benchmarks/downsample.py 2 20       # custom numbers of years
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import colstore  # noqa: E402
+import series  # noqa: E402
+
+POINTS = (500, 1000, 3000)
+PEAKS = 12
+RUNS = 3
+
+
+def make_readings(years: int) -> tuple[list[tuple[str, float]], set[int]]:
+    rng = random.Random(years)
+    start = datetime(2026, 1, 1, tzinfo=UTC) - timedelta(days=365 * years)
+    count = years * 365 * 96
+    readings = [
+        (
+            (start + timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            round(0.6 + 0.3 * math.sin(2 * math.pi * i / (365 * 96)) + rng.gauss(0, 0.01), 3),
+        )
+        for i in range(count)
+    ]
+    peaks = set(rng.sample(range(1, count - 1), PEAKS))
+    for i in peaks:
+        readings[i] = (readings[i][0], 3.5)
+    return readings, peaks
+
+
+def downsample(readings: list[tuple[str, float]], points: int) -> list[int]:
+    """What downsampled_range does on a cache miss: epochs, then LTTB."""
+    return series.lttb([colstore.to_epoch(t) for t, _ in readings], [v for _, v in readings], points)
+
+
+def best(fn, *args) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    years_list = [int(a) for a in sys.argv[1:]] or [1, 5, 10]
+    print(f"{'years':>5}{'readings':>10}{'points':>8}{'LTTB (s)':>10}{'JSON full':>11}{'JSON out':>10}", end="")
+    print(f"{'peaks LTTB':>12}{'peaks stride':>14}")
+    for years in years_list:
+        readings, peaks = make_readings(years)
+        full_size = len(json.dumps(readings, separators=(",", ":")))
+        for points in POINTS:
+            keep = downsample(readings, points)
+            step = len(readings) / (points - 1)
+            stride = {round(i * step) for i in range(points)}
+            out_size = len(json.dumps([readings[i] for i in keep], separators=(",", ":")))
+            print(
+                f"{years:>5}{len(readings):>10,}{points:>8}{best(downsample, readings, points):>10.3f}"
+                f"{full_size / 1e6:>9.1f}MB{out_size / 1e3:>8.0f}KB"
+                f"{len(peaks & set(keep)):>9}/{PEAKS}{len(peaks & stride):>11}/{PEAKS}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON vs streamed CSV readings responses.
+
+Serves a synthetic EA readings response (100,000 readings by default) from
+a local HTTP server in both formats, then fetches each one in a fresh
+subprocess through fetch_data.py's real code path and reports parse time
+and peak RSS growth.
+
+The server and each fetch run in their own processes: Linux carries the
+RSS high-water mark across fork/exec, so a launcher holding the synthetic
+bodies would mask the fetcher's own peak.
+
+Usage:
+    python benchmarks/readings_format.py            # 100k readings
+    python benchmarks/readings_format.py 500000     # custom size
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEASURE = "http://environment.data.gov.uk/flood-monitoring/id/measures/50140-level-stage-i-15_min-m"
+RUNS = 3
+
+
+def make_bodies(count: int) -> dict[str, bytes]:
+    """Build equivalent JSON and CSV response bodies with `count` readings."""
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    times = [(start + timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(count)]
+    values = [round(0.5 + (i % 400) / 1000, 3) for i in range(count)]
+    items = [
+        {"@id": f"http://environment.data.gov.uk/flood-monitoring/data/readings/{dt}", "dateTime": dt, "measure": MEASURE, "value": v}
+        for dt, v in zip(times, values, strict=True)
+    ]
+    body_json = json.dumps({"@context": "http://environment.data.gov.uk/flood-monitoring/meta/context.jsonld", "items": items})
+    rows = "".join(f"{dt},{MEASURE},{v}\r\n" for dt, v in zip(times, values, strict=True))
+    return {"/readings": body_json.encode(), "/readings.csv": ("dateTime,measure,value\r\n" + rows).encode()}
+
+
+def serve(count: int) -> None:
+    """Serve both bodies until killed, printing the port first (run via subprocess)."""
+    bodies = make_bodies(count)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = bodies[self.path.split("?")[0]]
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    sizes = {path: len(body) for path, body in bodies.items()}
+    print(json.dumps({"port": httpd.server_address[1], "sizes": sizes}), flush=True)
+    httpd.serve_forever()
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB on Linux
+
+
+def child(fmt: str, url: str) -> None:
+    """Fetch once in this process and print JSON stats (run via subprocess)."""
+    sys.path.insert(0, ROOT)
+    import fetch_data
+
+    baseline = max_rss_mb()
+    started = time.perf_counter()
+    readings = fetch_data.api_get_csv_readings(url) if fmt == "csv" else fetch_data.api_get(url)["items"]
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"count": len(readings), "seconds": elapsed, "peak_rss_mb": max_rss_mb() - baseline}))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    server = subprocess.Popen([sys.executable, __file__, "--serve", str(count)], stdout=subprocess.PIPE, text=True)
+    info = json.loads(server.stdout.readline())
+    base = f"http://127.0.0.1:{info['port']}"
+    sizes = info["sizes"]
+
+    print(f"{count:,} readings — JSON {sizes['/readings'] / 1e6:.1f} MB, CSV {sizes['/readings.csv'] / 1e6:.1f} MB")
+    print(f"{'format':<8}{'parse (s)':>12}{'peak RSS (MB)':>16}")
+    for fmt, path in (("json", "/readings"), ("csv", "/readings.csv")):
+        runs = []
+        for _ in range(RUNS):
+            out = subprocess.run([sys.executable, __file__, "--child", fmt, base + path], capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(out))
+        assert all(r["count"] == count for r in runs)
+        seconds = min(r["seconds"] for r in runs)
+        rss = min(r["peak_rss_mb"] for r in runs)
+        print(f"{fmt:<8}{seconds:>12.3f}{rss:>16.1f}")
+
+    server.terminate()
+    server.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) == 3 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]))
+    else:
+        main()
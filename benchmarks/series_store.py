@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark station CSVs against binary columnar series files (colstore.py).
+
+Writes ten years of synthetic 15-minute readings (about 350,000 rows) as a
+station CSV and as a .bin file in a temporary directory, then times
+reading the last 30 days and the full history from each into the same
+{dateTime, value} dicts.
+
+Usage:
+    python benchmarks/series_store.py          # 10 years
+    python benchmarks/series_store.py 25       # custom number of years
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import colstore  # noqa: E402
+
+RUNS = 5
+
+
+def make_readings(years: int) -> list[tuple[str, float]]:
+    start = datetime(2026, 1, 1, tzinfo=UTC) - timedelta(days=365 * years)
+    count = years * 365 * 96
+    return [((start + timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"), round(0.5 + (i % 400) / 1000, 3)) for i in range(count)]
+
+
+def csv_range(path: str, start: str) -> int:
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return len([{"dateTime": row[0], "value": float(row[1])} for row in reader if row[0] >= start])
+
+
+def bin_range(path: str, start: str | None) -> int:
+    with colstore.open_series(path) as s:
+        return len(s.readings(start))
+
+
+def best(fn, *args) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    readings = make_readings(years)
+    last_month = (datetime(2026, 1, 1, tzinfo=UTC) - timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "level_50140_umberleigh.csv")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+            writer.writerows([dt, v, "m", "50140", "Umberleigh"] for dt, v in readings)
+        bin_path = colstore.path_for(tmp, "level_50140_umberleigh.csv")
+        colstore.write(bin_path, readings)
+        assert csv_range(csv_path, last_month) == bin_range(bin_path, last_month)
+
+        print(f"{len(readings):,} readings — CSV {os.path.getsize(csv_path) / 1e6:.1f} MB, binary {os.path.getsize(bin_path) / 1e6:.1f} MB")
+        print(f"{'read':<14}{'CSV (s)':>10}{'binary (s)':>12}")
+        print(f"{'last 30 days':<14}{best(csv_range, csv_path, last_month):>10.4f}{best(bin_range, bin_path, last_month):>12.4f}")
+        print(f"{'full history':<14}{best(csv_range, csv_path, ''):>10.4f}{best(bin_range, bin_path, None):>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Compact binary columnar series files, an optional companion to the CSVs.
+
+A station CSV repeats its unit, ID and label on every row and stores each
+timestamp as a 20-byte string.  The same readings in a .bin file take 8
+bytes each and need no parsing: readers mmap the file and slice its
+columns as zero-copy memoryviews, and a time range is two binary searches.
+
+Layout, all little-endian:
+
+    header   magic b"FWS1", version u16, flags u16 (0), count u32, base i64
+    times    count x int32 — seconds since `base` (Unix time), ascending
+    values   count x float32
+
+The files are derived from the CSVs (fetch_data.py --binary, serve.py
+--binary) and can always be rebuilt from them.
+"""
+
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from operator import itemgetter
+from typing import Any, BinaryIO
+
+import atomicfile
+import precompress
+import series
+
+MAGIC: bytes = b"FWS1"
+VERSION: int = 1
+_HEADER = struct.Struct("<4sHHIq")
+HEADER_SIZE: int = _HEADER.size
+
+type Reading = tuple[str, Any]  # (ISO 8601 dateTime, value)
+
+# Columns are written and mapped in native order, which must match the format
+assert sys.byteorder == "little" and array("i").itemsize == 4 and array("f").itemsize == 4
+
+
+def path_for(data_dir: str, filename: str) -> str:
+    """Binary file for a station's CSV name: data/level_50149_sticklepath.bin."""
+    return os.path.join(data_dir, filename.removesuffix(".csv") + ".bin")
+
+
+def to_epoch(timestamp: str) -> int:
+    return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp())
+
+
+def to_iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _columns(readings: Iterable[Reading]) -> tuple[list[int], list[float]]:
+    """Sorted, deduplicated (epochs, values), skipping readings without a finite numeric value."""
+    epochs, values = [], []
+    run, _ = series.sorted_run(readings, key=itemgetter(0))
+    for timestamp, value in run:
+        try:
+            v = float(value)
+        except (TypeError, ValueError):
+            continue
+        if not math.isfinite(v):
+            continue
+        epochs.append(to_epoch(timestamp))
+        values.append(v)
+    return epochs, values
+
+
+def _write_columns(path: str, base: int, offsets: array, values: array) -> None:
+    """Write header and columns atomically, dropping any compressed siblings a copy of the file left behind."""
+    atomicfile.atomic_write(path, _HEADER.pack(MAGIC, VERSION, 0, len(offsets), base) + offsets.tobytes() + values.tobytes(), "wb")
+    precompress.remove_siblings(path)
+
+
+def _write_epochs(path: str, epochs: list[int], values: list[float]) -> int:
+    base = epochs[0] if epochs else 0
+    _write_columns(path, base, array("i", [e - base for e in epochs]), array("f", values))
+    return len(epochs)
+
+
+def write(path: str, readings: Iterable[Reading]) -> int:
+    """Write (dateTime, value) readings as a new series file; returns the number stored."""
+    return _write_epochs(path, *_columns(readings))
+
+
+def _is_stored(offsets: array, values: array, offset: int, value: float) -> bool:
+    i = bisect_left(offsets, offset)
+    return i < len(offsets) and offsets[i] == offset and values[i] == value
+
+
+def merge(path: str, readings: Iterable[Reading]) -> int:
+    """Merge readings into a series file (new values win); returns the number of new timestamps.
+
+    Readings newer than the last stored one — the usual refresh — are
+    appended to copies of the stored columns without decoding them, and
+    older ones already stored with the same value, like the last stored
+    reading a `since` query repeats, are ignored, as are readings with no
+    finite value.  Anything else falls
+    back to a full merge; if nothing changes the file isn't rewritten.
+    A missing file is created.
+    """
+    epochs, values = _columns(readings)
+    with open_series(path) as stored:
+        if stored is None or not len(stored):
+            return _write_epochs(path, epochs, values)
+        base = stored.base
+        old_offsets = array("i", stored.times.tobytes())
+        old_values = array("f", stored.values.tobytes())
+
+    start = bisect_right(epochs, base + old_offsets[-1])
+    if all(_is_stored(old_offsets, old_values, e - base, v) for e, v in zip(epochs[:start], array("f", values[:start]), strict=True)):
+        if start == len(epochs):
+            return 0
+        old_offsets.extend(e - base for e in epochs[start:])
+        old_values.extend(values[start:])
+        _write_columns(path, base, old_offsets, old_values)
+        return len(epochs) - start
+
+    merged = dict(zip(old_offsets, old_values, strict=True))
+    before = len(merged)
+    merged.update((e - base, v) for e, v in zip(epochs, values, strict=True))
+    offsets = sorted(merged)
+    _write_columns(path, base, array("i", offsets), array("f", map(merged.__getitem__, offsets)))
+    return len(merged) - before
+
+
+class SeriesFile:
+    """A memory-mapped series file.
+
+    `times` (int32 offsets from `base`) and `values` (float32) are
+    memoryviews straight onto the mapping, so slicing them copies nothing
+    and reading a decade of history costs page faults, not parsing.
+    """
+
+    def __init__(self, f: BinaryIO) -> None:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER_SIZE:
+            raise ValueError(f"{f.name}: truncated series header")
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, self.base = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION or size < HEADER_SIZE + 8 * count:
+            self._mmap.close()
+            raise ValueError(f"{f.name}: not a valid version {VERSION} series file")
+        self._view = memoryview(self._mmap)
+        self.times = self._view[HEADER_SIZE : HEADER_SIZE + 4 * count].cast("i")
+        self.values = self._view[HEADER_SIZE + 4 * count : HEADER_SIZE + 8 * count].cast("f")
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def bounds(self, start: str | None = None, end: str | None = None) -> tuple[int, int]:
+        """Index range [i, j) of readings with start <= dateTime <= end, by binary search."""
+        i = bisect_left(self.times, to_epoch(start) - self.base) if start else 0
+        j = bisect_right(self.times, to_epoch(end) - self.base) if end else len(self.times)
+        return i, max(i, j)
+
+    def slice(self, start: str | None = None, end: str | None = None) -> tuple[memoryview, memoryview]:
+        """Zero-copy (times, values) views for a time range."""
+        i, j = self.bounds(start, end)
+        return self.times[i:j], self.values[i:j]
+
+    def readings(self, start: str | None = None, end: str | None = None) -> list[dict[str, Any]]:
+        """Readings in a time range as {dateTime, value} dicts, values rounded back from float32."""
+        i, j = self.bounds(start, end)
+        # Readings fall on a few times of day and repeat a few thousand distinct
+        # values, so each date, time and value is formatted once and cached
+        days: dict[int, str] = {}
+        clock: dict[int, str] = {}
+        rounded: dict[float, float] = {}
+        readings = []
+        for t, v in zip(self.times[i:j].tolist(), self.values[i:j].tolist(), strict=True):
+            day, secs = divmod(self.base + t, 86400)
+            date = days.get(day) or days.setdefault(day, to_iso(day * 86400)[:11])
+            hms = clock.get(secs) or clock.setdefault(secs, f"{secs // 3600:02d}:{secs // 60 % 60:02d}:{secs % 60:02d}Z")
+            value = rounded.get(v)
+            if value is None:
+                value = rounded[v] = float(f"{v:.7g}")
+            readings.append({"dateTime": date + hms, "value": value})
+        return readings
+
+    def last_time(self) -> str | None:
+        return to_iso(self.base + self.times[-1]) if len(self.times) else None
+
+    def close(self) -> None:
+        for view in (self.times, self.values, self._view):
+            view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # a caller still holds a slice; the mapping goes when it does
+
+
+@contextmanager
+def open_series(path: str) -> Iterator[SeriesFile | None]:
+    """Map a series file for reading; yields None if it doesn't exist."""
+    try:
+        f = open(path, "rb")  # noqa: SIM115 — closed below, once the mapping is set up
+    except FileNotFoundError:
+        yield None
+        return
+    with f:
+        stored = SeriesFile(f)
+    try:
+        yield stored
+    finally:
+        stored.close()
@@ -0,0 +1,490 @@
+"""
+Keep-alive HTTP client for the Environment Agency API.
+
+Shared by fetch_data.py and serve.py. Connections are pooled per
+(scheme, host, port) and reused across requests and threads, so a refresh
+made of many small requests pays for one TCP/TLS handshake per worker
+rather than one per request.
+
+Failures are raised as urllib's HTTPError/URLError, so callers' retry
+loops behave exactly as they did with urlopen().
+
+Responses can also be kept in an on-disk cache (see ResponseCache and
+enable_cache): readings for closed date ranges are kept indefinitely,
+everything else for a short TTL and then revalidated with ETag /
+Last-Modified where the API provides them.
+"""
+
+import csv
+import hashlib
+import http.client
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, date, datetime, timedelta
+from typing import Any, BinaryIO
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+IDLE_TIMEOUT: float = 30.0  # seconds — close pooled connections unused for longer
+MAX_IDLE_PER_HOST: int = 8
+MAX_REDIRECTS: int = 5
+USER_AGENT: str = "floodwatch"
+
+CACHE_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ea")
+CACHE_MAX_BYTES: int = 500 * 1024 * 1024
+OPEN_RANGE_TTL: float = 300.0  # seconds — responses that can still change
+CLOSED_AFTER_DAYS: int = 2  # a range ending this many days ago won't gain late readings
+
+type HostKey = tuple[str, str, int]
+type Connection = http.client.HTTPConnection
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections, keyed per host.
+
+    A connection is checked out by one thread for the duration of a request
+    and returned once its response has been read to the end. Connections
+    idle for longer than `idle_timeout` are closed rather than reused.
+    """
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST, idle_timeout: float = IDLE_TIMEOUT) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.connections_opened = 0
+        self._idle: dict[HostKey, list[tuple[Connection, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key: HostKey, timeout: float) -> tuple[Connection, bool]:
+        """Return (connection, reused) — an idle pooled connection or a new one."""
+        now = time.monotonic()
+        stale = []
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate, last_used = idle.pop()  # most recently used first
+                if now - last_used < self.idle_timeout:
+                    conn = candidate
+                    break
+                stale.append(candidate)
+            if conn is None:
+                self.connections_opened += 1
+        for c in stale:
+            c.close()
+
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout), False
+
+    def _release(self, key: HostKey, conn: Connection, resp: http.client.HTTPResponse) -> None:
+        """Return a connection to the pool, or close it if it can't be reused."""
+        if resp.length == 0:
+            # Streaming reads can stop at the end of the body without closing
+            # the response; close it so the connection can send again.
+            resp.close()
+        if resp.isclosed() and not resp.will_close:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append((conn, time.monotonic()))
+                    return
+        conn.close()
+
+    def _send(self, url: str, headers: dict[str, str], timeout: float) -> tuple[HostKey, Connection, http.client.HTTPResponse]:
+        """Send a GET and return its response headers, reconnecting if a pooled connection was reset."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise URLError(f"unsupported URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request("GET", path, headers=headers)
+                return key, conn, conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                # The server may close a keep-alive connection while it sits
+                # idle in the pool — retry on another connection.  A timeout
+                # is a real failure, so let the caller's retry loop handle it.
+                if reused and not isinstance(e, TimeoutError):
+                    continue
+                raise URLError(e) from e
+
+    @contextmanager
+    def request(self, url: str, headers: dict[str, str] | None = None, timeout: float = 60) -> Iterator[http.client.HTTPResponse]:
+        """GET `url` and yield the response, like `with urlopen(...) as resp`.
+
+        Redirects are followed. Status codes >= 400 raise HTTPError; 304 is
+        returned to the caller for conditional requests to handle.
+        """
+        request_headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        for _ in range(MAX_REDIRECTS + 1):
+            key, conn, resp = self._send(url, request_headers, timeout)
+            location = resp.getheader("Location")
+            if resp.status in (301, 302, 303, 307, 308) and location:
+                resp.read()
+                self._release(key, conn, resp)
+                url = urljoin(url, location)
+                continue
+            if resp.status >= 400:
+                body = resp.read()
+                self._release(key, conn, resp)
+                raise HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+            try:
+                yield resp
+            finally:
+                self._release(key, conn, resp)
+            return
+        raise URLError(f"too many redirects: {url}")
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle = [conn for conns in self._idle.values() for conn, _ in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+
+class _TeeReader(io.RawIOBase):
+    """Raw stream that copies everything read from `source` into `sink`."""
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO) -> None:
+        self.source = source
+        self.sink = sink
+        self.eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        n = self.source.readinto(b)
+        if n:
+            self.sink.write(memoryview(b)[:n])
+        else:
+            self.eof = True
+        return n
+
+
+class ResponseCache:
+    """On-disk cache of API response bodies, bounded by size with LRU eviction.
+
+    Entries are keyed by a SHA-256 of the URL and Accept header and stored
+    as ``<key>.body`` plus ``<key>.meta`` (JSON) under two-character shard
+    directories.  A body is written while the caller streams it and only
+    committed once it has been read to the end.  Each hit touches the body's
+    mtime, and when the cache grows past `max_bytes` the least recently
+    used entries are removed until it is back under 90% of the limit.
+
+    With `offline`, every entry is served regardless of age and a miss
+    raises URLError instead of touching the network.
+    """
+
+    def __init__(
+        self,
+        directory: str = CACHE_DIR,
+        max_bytes: int = CACHE_MAX_BYTES,
+        open_ttl: float = OPEN_RANGE_TTL,
+        offline: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.open_ttl = open_ttl
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> Iterator[tuple[float, str, int]]:
+        """Yield (last used, key path without suffix, bytes) for every entry."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".body"):
+                    base = os.path.join(root, name[:-5])
+                    try:
+                        body, meta = os.stat(base + ".body"), os.stat(base + ".meta")
+                    except OSError:
+                        continue
+                    yield body.st_mtime, base, body.st_size + meta.st_size
+
+    def _path(self, url: str, accept: str) -> str:
+        key = hashlib.sha256(f"{accept} {url}".encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def ttl_for(self, url: str) -> float | None:
+        """Seconds a response stays fresh; None for readings of a closed date range."""
+        query = parse_qs(urlsplit(url).query)
+        if "startdate" in query and "enddate" in query and "since" not in query:
+            try:
+                end = date.fromisoformat(query["enddate"][0])
+            except ValueError:
+                return self.open_ttl
+            if end <= datetime.now(UTC).date() - timedelta(days=CLOSED_AFTER_DAYS):
+                return None
+        return self.open_ttl
+
+    def lookup(self, url: str, accept: str) -> tuple[str, dict[str, Any] | None]:
+        """Return (entry path, metadata or None)."""
+        path = self._path(url, accept)
+        try:
+            with open(path + ".meta") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return path, None
+        return path, meta if os.path.exists(path + ".body") else None
+
+    def is_fresh(self, meta: dict[str, Any]) -> bool:
+        return self.offline or meta["ttl"] is None or time.time() - meta["stored"] < meta["ttl"]
+
+    def open_body(self, path: str) -> BinaryIO | None:
+        """Open a cached body for reading and mark it recently used; None if it has been evicted."""
+        f = None
+        try:
+            f = open(path + ".body", "rb")  # noqa: SIM115 — handed to the caller, who closes it
+            os.utime(path + ".body")
+        except OSError:
+            # Evicted before it could be opened, or between the open and the touch
+            if f is not None:
+                f.close()
+            return None
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def _write_meta(self, path: str, meta: dict[str, Any]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path + ".meta")
+
+    def touch(self, path: str, meta: dict[str, Any]) -> None:
+        """Restart an entry's TTL after a 304 Not Modified."""
+        self._write_meta(path, {**meta, "stored": time.time()})
+
+    @contextmanager
+    def store(self, path: str, url: str, resp: http.client.HTTPResponse) -> Iterator[BinaryIO]:
+        """Yield a reader over `resp` that saves the body as it is read.
+
+        The entry is committed only if the caller reads to the end without
+        raising; a partial body is discarded.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        sink = os.fdopen(fd, "wb")
+        tee = _TeeReader(resp, sink)
+        committed = False
+        try:
+            yield io.BufferedReader(tee)
+            if tee.eof:
+                sink.close()
+                os.replace(tmp, path + ".body")
+                meta = {
+                    "url": url,
+                    "stored": time.time(),
+                    "ttl": self.ttl_for(url),
+                    "etag": resp.getheader("ETag"),
+                    "last_modified": resp.getheader("Last-Modified"),
+                }
+                self._write_meta(path, meta)
+                committed = True
+        finally:
+            sink.close()
+            if not committed:
+                os.unlink(tmp)
+        if committed:
+            size = os.path.getsize(path + ".body") + os.path.getsize(path + ".meta")
+            with self._lock:
+                self.misses += 1
+                self._size += size
+                if self._size > self.max_bytes:
+                    self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until under 90% of max_bytes (lock held)."""
+        entries = sorted(self._entries())
+        self._size = sum(size for _, _, size in entries)
+        for _, base, size in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            for suffix in (".meta", ".body"):
+                try:
+                    os.remove(base + suffix)
+                except OSError:
+                    pass
+            self._size -= size
+
+
+_pool = ConnectionPool()
+_cache: ResponseCache | None = None
+
+
+def enable_cache(
+    directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES, open_ttl: float = OPEN_RANGE_TTL, offline: bool = False
+) -> ResponseCache:
+    """Route request() through an on-disk response cache (off by default)."""
+    global _cache
+    _cache = ResponseCache(directory, max_bytes=max_bytes, open_ttl=open_ttl, offline=offline)
+    return _cache
+
+
+@contextmanager
+def request(
+    url: str,
+    headers: dict[str, str] | None = None,
+    timeout: float = 60,
+    before_send: Callable[[], None] | None = None,
+    use_cache: bool = True,
+) -> Iterator[BinaryIO]:
+    """GET `url` over the shared connection pool (context manager).
+
+    `before_send` runs just before anything goes over the network — a rate
+    limiter, say — so cache hits don't wait for it.  With a cache enabled,
+    the yielded stream may be a cached body rather than the live response;
+    `use_cache=False` goes straight to the network and stores nothing.
+    """
+    headers = headers or {}
+    cache = _cache if use_cache else None
+    if cache is None:
+        if before_send:
+            before_send()
+        with _pool.request(url, headers=headers, timeout=timeout) as resp:
+            yield resp
+        return
+
+    path, meta = cache.lookup(url, headers.get("Accept", ""))
+    if meta is not None and cache.is_fresh(meta) and (cached := cache.open_body(path)) is not None:
+        with cached:
+            yield cached
+        return
+    if cache.offline:
+        raise URLError(f"offline and not cached: {url}")
+
+    conditional = {}
+    if meta is not None and meta.get("etag"):
+        conditional["If-None-Match"] = meta["etag"]
+    if meta is not None and meta.get("last_modified"):
+        conditional["If-Modified-Since"] = meta["last_modified"]
+    if before_send:
+        before_send()
+    with _pool.request(url, headers={**headers, **conditional}, timeout=timeout) as resp:
+        revalidated = resp.status == 304 and meta is not None
+        if revalidated:
+            resp.read()
+        else:
+            with cache.store(path, url, resp) as body:
+                yield body
+    if revalidated:
+        cached = cache.open_body(path)
+        if cached is None:
+            raise URLError(f"cached body evicted during revalidation: {url}")
+        cache.touch(path, meta)
+        with cached:
+            yield cached
+
+
+def iter_csv_readings(stream: BinaryIO) -> Iterator[dict[str, Any]]:
+    """Parse an EA `readings.csv` body row by row into {dateTime, value} readings.
+
+    `stream` is usually the response itself, read through a small buffer,
+    so the body never has to fit in memory. Values are converted to float
+    to match the JSON API.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        rows = csv.reader(text)
+        header = next(rows, [])
+        if "dateTime" not in header or "value" not in header:
+            return
+        dt_col, value_col = header.index("dateTime"), header.index("value")
+        for row in rows:
+            if len(row) <= max(dt_col, value_col) or not row[dt_col] or not row[value_col]:
+                continue
+            value: Any = row[value_col]
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+            yield {"dateTime": row[dt_col], "value": value}
+    finally:
+        # Detach so the wrapper doesn't close the response; the pool decides
+        # whether the connection can be reused.
+        text.detach()
+
+
+def group_by_measure(items: list[dict[str, Any]], measure_ids: Iterable[str]) -> dict[str, list[dict[str, Any]]]:
+    """Split readings from a multi-measure `/data/readings` response by measure ID.
+
+    Each item's `measure` is the measure's URL, ending in its ID. Only the
+    requested measures are kept, each reduced to {dateTime, value}; a
+    requested measure with no readings maps to an empty list.
+    """
+    groups: dict[str, list[dict[str, Any]]] = {m: [] for m in measure_ids}
+    for item in items:
+        readings = groups.get(str(item.get("measure", "")).rsplit("/", 1)[-1])
+        if readings is not None and item.get("dateTime"):
+            readings.append({"dateTime": item["dateTime"], "value": item.get("value", "")})
+    return groups
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _period_seconds(measure_id: str) -> int | None:
+    """The reading period of a measure, from the `<n>_min` in its ID."""
+    period = re.search(r"-(\d+)_min-", measure_id)
+    return int(period.group(1)) * 60 if period else None
+
+
+def in_latest_reach(measure_id: str, last_time: str, now: datetime | None = None) -> bool:
+    """Whether a `/data/readings?latest` response could account for a measure stored up to `last_time`.
+
+    The response holds one reading per measure, so it covers a measure
+    only if at most one reading has appeared since `last_time`.  With a
+    period's allowance for publication, that is when `now` is no more
+    than two periods past it; further behind (an hourly run is about
+    four), the measure needs its own `since` request anyway.
+    """
+    period = _period_seconds(measure_id)
+    now = now or datetime.now(UTC)
+    return period is not None and (now - _parse_time(last_time)).total_seconds() <= 2 * period
+
+
+def latest_batch(items: list[dict[str, Any]], last_times: dict[str, str]) -> dict[str, list[dict[str, Any]]]:
+    """New readings for the measures a `/data/readings?latest` response fully accounts for.
+
+    `last_times` maps measure IDs to the dateTime of each one's newest
+    stored reading.  A measure whose latest reading is no newer than that
+    has nothing new (an empty list); one whose latest reading is exactly
+    one reading period newer — the `<n>_min` in its ID — has just that
+    reading.  Measures missing from the response, or further ahead, are
+    left out for the caller to fetch on their own.
+    """
+    batch: dict[str, list[dict[str, Any]]] = {}
+    for measure_id, readings in group_by_measure(items, last_times).items():
+        if not readings:
+            continue
+        reading = max(readings, key=lambda r: r["dateTime"])
+        ahead = (_parse_time(reading["dateTime"]) - _parse_time(last_times[measure_id])).total_seconds()
+        if ahead <= 0:
+            batch[measure_id] = []
+        elif ahead == _period_seconds(measure_id):
+            batch[measure_id] = [reading]
+    return batch
@@ -10,12 +10,22 @@ import json
 import os
 import random
 import re
-import tempfile
+import threading
 import time
-from datetime import UTC, datetime, timedelta
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import UTC, date, datetime, timedelta
 from typing import Any
 from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+
+import atomicfile
+import colstore
+import ea_client
+import partitions
+import precompress
+import rollups
+import series
+import snapshot
 
 DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 
@@ -23,12 +33,49 @@ DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 # but all have at least these.
 type StationInfo = dict[str, Any]
 
-# River Taw level stations (upstream to downstream order by lat)
+# River Taw level stations (upstream to downstream order by lat); typicalRangeHigh (m)
+# as in js/floodwatch.js is the threshold data/latest.json reports status against
 LEVEL_STATIONS = [
-    {"id": "50149", "label": "Sticklepath", "rloi": "3100", "lat": 50.737824, "lon": -3.917597, "river": "River Taw", "type": "level"},
-    {"id": "50119", "label": "Taw Bridge", "rloi": "3123", "lat": 50.845457, "lon": -3.886253, "river": "River Taw", "type": "level"},
-    {"id": "50132", "label": "Newnham Bridge", "rloi": "3113", "lat": 50.939901, "lon": -3.907581, "river": "River Taw", "type": "level"},
-    {"id": "50140", "label": "Umberleigh", "rloi": "3106", "lat": 50.99542, "lon": -3.985089, "river": "River Taw", "type": "level"},
+    {
+        "id": "50149",
+        "label": "Sticklepath",
+        "rloi": "3100",
+        "lat": 50.737824,
+        "lon": -3.917597,
+        "river": "River Taw",
+        "type": "level",
+        "typicalRangeHigh": 1.8,
+    },
+    {
+        "id": "50119",
+        "label": "Taw Bridge",
+        "rloi": "3123",
+        "lat": 50.845457,
+        "lon": -3.886253,
+        "river": "River Taw",
+        "type": "level",
+        "typicalRangeHigh": 1.9,
+    },
+    {
+        "id": "50132",
+        "label": "Newnham Bridge",
+        "rloi": "3113",
+        "lat": 50.939901,
+        "lon": -3.907581,
+        "river": "River Taw",
+        "type": "level",
+        "typicalRangeHigh": 2.5,
+    },
+    {
+        "id": "50140",
+        "label": "Umberleigh",
+        "rloi": "3106",
+        "lat": 50.99542,
+        "lon": -3.985089,
+        "river": "River Taw",
+        "type": "level",
+        "typicalRangeHigh": 2.8,
+    },
     {
         "id": "50198",
         "label": "Barnstaple (Tidal)",
@@ -40,9 +87,36 @@ LEVEL_STATIONS = [
         "measure_id": "50198-level-tidal_level-i-15_min-mAOD",
     },
     # River Mole tributary stations (upstream to downstream)
-    {"id": "50135", "label": "North Molton", "rloi": "3110", "lat": 51.055152, "lon": -3.795036, "river": "River Mole", "type": "level"},
-    {"id": "50153", "label": "Mole Mills", "rloi": "3096", "lat": 51.016893, "lon": -3.822486, "river": "River Mole", "type": "level"},
-    {"id": "50115", "label": "Woodleigh", "rloi": "3127", "lat": 50.973061, "lon": -3.909695, "river": "River Mole", "type": "level"},
+    {
+        "id": "50135",
+        "label": "North Molton",
+        "rloi": "3110",
+        "lat": 51.055152,
+        "lon": -3.795036,
+        "river": "River Mole",
+        "type": "level",
+        "typicalRangeHigh": 1.1,
+    },
+    {
+        "id": "50153",
+        "label": "Mole Mills",
+        "rloi": "3096",
+        "lat": 51.016893,
+        "lon": -3.822486,
+        "river": "River Mole",
+        "type": "level",
+        "typicalRangeHigh": 1.0,
+    },
+    {
+        "id": "50115",
+        "label": "Woodleigh",
+        "rloi": "3127",
+        "lat": 50.973061,
+        "lon": -3.909695,
+        "river": "River Mole",
+        "type": "level",
+        "typicalRangeHigh": 1.7,
+    },
     # Little Dart River tributary station
     {
         "id": "50125",
@@ -52,10 +126,29 @@ LEVEL_STATIONS = [
         "lon": -3.863651,
         "river": "Little Dart River",
         "type": "level",
+        "typicalRangeHigh": 1.5,
     },
     # River Yeo tributary stations (upstream to downstream)
-    {"id": "50151", "label": "Lapford", "rloi": "3098", "lat": 50.857808, "lon": -3.810592, "river": "River Yeo", "type": "level"},
-    {"id": "50114", "label": "Collard Bridge", "rloi": "3128", "lat": 51.099972, "lon": -4.010005, "river": "River Yeo", "type": "level"},
+    {
+        "id": "50151",
+        "label": "Lapford",
+        "rloi": "3098",
+        "lat": 50.857808,
+        "lon": -3.810592,
+        "river": "River Yeo",
+        "type": "level",
+        "typicalRangeHigh": 2.3,
+    },
+    {
+        "id": "50114",
+        "label": "Collard Bridge",
+        "rloi": "3128",
+        "lat": 51.099972,
+        "lon": -4.010005,
+        "river": "River Yeo",
+        "type": "level",
+        "typicalRangeHigh": 1.1,
+    },
 ]
 
 # Nearby rainfall stations
@@ -74,35 +167,70 @@ RAINFALL_STATIONS = [
 
 API_BASE: str = "https://environment.data.gov.uk/flood-monitoring"
 
+# _limit per readings request; a full page means the range was truncated
+READINGS_LIMIT: int = 100_000
+
+# --recent first asks /data/readings?latest which stations have anything
+# new; a response that fills every page may be missing measures
+BATCH_PAGE_SIZE: int = 10_000
+MAX_BATCH_PAGES: int = 2
+
+# Bytes read per step when scanning a CSV backwards from its end
+TAIL_BLOCK_SIZE: int = 8192
+
 # Reading type — a single measurement from the API or loaded from CSV
 type Reading = dict[str, Any]
 
+# Progress logger — print, or list.append to buffer a station's output
+type LogFn = Callable[[str], None]
+
+
+class RateLimiter:
+    """Token bucket shared by every thread that talks to the API.
+
+    Each request takes one token; tokens refill at ``rate`` per second up to
+    ``burst``.  Callers reserve their token under the lock and sleep outside
+    it, so waiting threads are released in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate) - 1
+            self._updated = now
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+# Set by main(); None means unthrottled (tests, one-off imports)
+_rate_limiter: RateLimiter | None = None
+
+# Set by main(); "csv" streams readings.csv instead of decoding a JSON document
+_readings_format: str = "json"
+
 
 def _atomic_write_csv(filepath: str, write_fn) -> None:
-    """Write a CSV atomically: temp file, fsync, rename over target."""
-    dir_path = os.path.dirname(filepath) or "."
-    fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix=".tmp")
-    try:
-        with os.fdopen(fd, "w", newline="") as f:
-            write_fn(f)
-            f.flush()
-            os.fsync(f.fileno())
-        os.replace(tmp_path, filepath)
-    except BaseException:
-        try:
-            os.unlink(tmp_path)
-        except OSError:
-            pass
-        raise
+    """Write a CSV atomically (see atomicfile.py), then refresh its .gz/.br siblings."""
+    atomicfile.atomic_write_with(filepath, write_fn)
+    precompress.write_siblings(filepath)
 
 
-def api_get(url: str, retries: int = 3) -> dict[str, Any]:
-    """Fetch JSON from the API with retries."""
+def _api_request[T](url: str, accept: str, read: Callable[[Any], T], retries: int) -> T:
+    """Fetch a URL with retries and pass the open response to `read`."""
+    throttle = _rate_limiter.acquire if _rate_limiter else None
     for attempt in range(retries):
         try:
-            req = Request(url, headers={"Accept": "application/json"})
-            with urlopen(req, timeout=60) as resp:
-                return json.loads(resp.read().decode("utf-8"))
+            with ea_client.request(url, headers={"Accept": accept}, timeout=60, before_send=throttle) as resp:
+                return read(resp)
         except (HTTPError, URLError, TimeoutError) as e:
             print(f"  Attempt {attempt + 1}/{retries} failed for {url}: {e}")
             if attempt < retries - 1:
@@ -111,6 +239,16 @@ def api_get(url: str, retries: int = 3) -> dict[str, Any]:
                 raise
 
 
+def api_get(url: str, retries: int = 3) -> dict[str, Any]:
+    """Fetch JSON from the API with retries."""
+    return _api_request(url, "application/json", lambda resp: json.loads(resp.read().decode("utf-8")), retries)
+
+
+def api_get_csv_readings(url: str, retries: int = 3) -> list[Reading]:
+    """Fetch a readings.csv URL with retries, parsing rows as they stream in."""
+    return _api_request(url, "text/csv", lambda resp: list(ea_client.iter_csv_readings(resp)), retries)
+
+
 def get_measure_id(station: StationInfo) -> str:
     """Get the measure ID for a station."""
     if "measure_id" in station:
@@ -121,70 +259,308 @@ def get_measure_id(station: StationInfo) -> str:
         return f"{station['id']}-rainfall-tipping_bucket_raingauge-t-15_min-mm"
 
 
-def fetch_readings_batch(measure_id: str, start_date: str, end_date: str) -> list[Reading]:
-    """Fetch readings for a date range (API handles up to ~1 month well)."""
-    url = f"{API_BASE}/id/measures/{measure_id}/readings?startdate={start_date}&enddate={end_date}&_sorted&_limit=100000"
-    try:
-        data = api_get(url)
-        return data.get("items", [])
-    except Exception as e:
-        print(f"  Warning: Could not fetch {start_date} to {end_date}: {e}")
-        return []
+def fetch_readings_batch(
+    measure_id: str, start_date: str, end_date: str, log: LogFn = print, gaps: list[date] | None = None
+) -> list[Reading] | None:
+    """Fetch readings for a date range, splitting it in half if a request fails or hits the row limit.
 
+    Returns None if the range couldn't be fetched, as distinct from an empty list for a range with no readings.
+    With `gaps`, days that can't be fetched are appended to it instead (see series.fetch_bisecting).
+    """
 
-def fetch_all_readings(station: StationInfo, going_back_days: int = 365 * 2) -> list[Reading]:
-    """Fetch all available readings for a station, going back as far as possible."""
-    measure_id = get_measure_id(station)
+    def fetch(start: date, end: date) -> list[Reading] | None:
+        query = f"startdate={start}&enddate={end}&_sorted&_limit={READINGS_LIMIT}"
+        try:
+            if _readings_format == "csv":
+                readings = api_get_csv_readings(f"{API_BASE}/id/measures/{measure_id}/readings.csv?{query}")
+            else:
+                readings = api_get(f"{API_BASE}/id/measures/{measure_id}/readings?{query}").get("items", [])
+        except Exception as e:
+            log(f"  Warning: Could not fetch {start} to {end}: {e}")
+            return None
+        if len(readings) >= READINGS_LIMIT and start < end:
+            log(f"  Warning: {start} to {end} hit the {READINGS_LIMIT}-reading limit, splitting")
+            return None
+        return readings
+
+    return series.fetch_bisecting(fetch, date.fromisoformat(start_date), date.fromisoformat(end_date), gaps)
+
+
+JOURNAL_DIR: str = ".backfill"  # under DATA_DIR
+
+
+class ChunkJournal:
+    """Checkpoint journal for one station's full-history backfill.
+
+    A JSON-lines file under ``data/.backfill/``: a header with the planned
+    date range, then one line per completed chunk with its readings.  Each
+    line is flushed and fsynced as its chunk completes, so an interrupted
+    run loses at most the chunks in flight.  Only chunks that returned
+    readings in full are recorded — empty and failed windows, and windows
+    with days that couldn't be fetched, are fetched again on resume, in freshly sized chunks that fit between the recorded ones.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.planned: tuple[date, date] | None = None  # (end_date, start_limit)
+        self.done: dict[tuple[date, date], list[Reading]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path_for(filename: str) -> str:
+        return os.path.join(DATA_DIR, JOURNAL_DIR, os.path.splitext(filename)[0] + ".jsonl")
+
+    @classmethod
+    def open(cls, filename: str, resume: bool = False) -> "ChunkJournal":
+        """Open the journal for a station's CSV, loading recorded chunks if resuming."""
+        journal = cls(cls.path_for(filename))
+        if resume and os.path.exists(journal.path):
+            journal._load()
+        return journal
+
+    def _load(self) -> None:
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn write from a killed run
+                if "plan" in entry:
+                    self.planned = (date.fromisoformat(entry["plan"][0]), date.fromisoformat(entry["plan"][1]))
+                else:
+                    window = (date.fromisoformat(entry["start"]), date.fromisoformat(entry["end"]))
+                    self.done[window] = [{"dateTime": dt, "value": v} for dt, v in entry["readings"]]
+                good += len(line)
+        if good < os.path.getsize(self.path):
+            os.truncate(self.path, good)
+
+    def _append(self, entry: dict[str, Any], mode: str = "a") -> None:
+        with self._lock, open(self.path, mode) as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
 
-    all_readings = []
+    def plan(self, end_date: date, start_limit: date) -> date:
+        """Start the journal, or keep a resumed journal's range; return the start limit to fetch back to."""
+        if self.planned is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.planned = (end_date, start_limit)
+            self._append({"plan": [end_date.isoformat(), start_limit.isoformat()]}, mode="w")
+        return self.planned[1]
+
+    def covering(self, day: date) -> tuple[date, date] | None:
+        """The recorded window containing `day`, if any."""
+        return next((w for w in self.done if w[0] <= day <= w[1]), None)
+
+    def latest_end_before(self, day: date) -> date | None:
+        """The end of the newest recorded window that ends before `day`, if any."""
+        return max((w[1] for w in self.done if w[1] < day), default=None)
+
+    def record(self, window: tuple[date, date], readings: list[Reading]) -> None:
+        """Durably record a completed chunk (thread-safe)."""
+        rows = [[r["dateTime"], r["value"]] for r in readings]
+        self._append({"start": window[0].isoformat(), "end": window[1].isoformat(), "readings": rows})
+
+    @classmethod
+    def discard(cls, filename: str) -> None:
+        """Remove a station's journal once the backfill has finished."""
+        path = cls.path_for(filename)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def chunk_windows(
+    end_date: date,
+    start_limit: date,
+    sizer: series.ChunkSizer | None = None,
+    journal: ChunkJournal | None = None,
+) -> Iterator[tuple[date, date]]:
+    """Yield date ranges covering [start_limit, end_date], newest first.
+
+    Each window's length is read from `sizer` as the window is yielded, so
+    it reflects every chunk observed by then, and rounded down to a cell of
+    the calendar grid (see series.grid_start): the newest window runs from
+    the start of the cell holding end_date, and every older one is a whole
+    cell, so closed ranges repeat from run to run and hit the response
+    cache.  Windows recorded in `journal` are yielded as they were, and new
+    windows stop short of them.
+    """
+    if end_date <= start_limit:
+        return
+    sizer = sizer or series.ChunkSizer()
+    current_end = end_date
+    while current_end >= start_limit:
+        window = journal.covering(current_end) if journal is not None else None
+        if window is None:
+            floor = start_limit
+            recorded_end = journal.latest_end_before(current_end) if journal is not None else None
+            if recorded_end is not None:
+                floor = max(floor, recorded_end + timedelta(days=1))
+            start = series.grid_start(current_end, sizer.days, aligned=current_end != end_date)
+            window = (max(start, floor), current_end)
+        yield window
+        current_end = window[0] - timedelta(days=1)
+
+
+def _prefetch[T, R](executor: ThreadPoolExecutor | None, fn: Callable[[T], R], items: Iterable[T], lookahead: int) -> Iterator[R]:
+    """Yield fn(item) for each item in order, keeping up to `lookahead` items taken ahead.
+
+    `items` is consumed lazily: the next item is taken only when the caller
+    asks for the result `lookahead` places before it, so with or without an
+    executor each item is taken at the same point in the caller's loop.
+    With an executor the items taken ahead are fetched concurrently;
+    without one, fn runs on each item when its result is due.  Closing the
+    generator early cancels any calls that haven't started yet.
+    """
+    pending: list[tuple[T, Future[R] | None]] = []
+
+    def result(item: T, future: Future[R] | None) -> R:
+        return future.result() if future is not None else fn(item)
+
+    try:
+        for item in items:
+            pending.append((item, executor.submit(fn, item) if executor is not None else None))
+            if len(pending) >= lookahead:
+                yield result(*pending.pop(0))
+        while pending:
+            yield result(*pending.pop(0))
+    finally:
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+
+
+def fetch_all_readings(
+    station: StationInfo,
+    going_back_days: int = 365 * 2,
+    executor: ThreadPoolExecutor | None = None,
+    lookahead: int = 4,
+    log: LogFn = print,
+    journal: ChunkJournal | None = None,
+) -> list[Reading]:
+    """Fetch all available readings for a station, going back as far as possible.
+
+    Chunks grow or shrink as they are consumed, newest-first (see
+    series.ChunkSizer), and each window is sized `lookahead` chunks ahead
+    of the one being consumed, with or without an executor.  So the
+    windows, the empty-streak cutoff and the result don't depend on the
+    order concurrent chunks finish in: with an executor, up to `lookahead`
+    chunks are fetched concurrently, and the run matches a serial one.
+    With a journal, each chunk is checkpointed as it completes and chunks
+    it already holds are not fetched again.
+    """
+    measure_id = get_measure_id(station)
     end_date = datetime.now(UTC).date()
 
     # The API provides recent data (up to ~4 weeks) directly
-    # For older data, we use date ranges which the API supports
-    # We'll try going back in monthly chunks
-
-    current_end = end_date
-    chunk_days = 28  # ~1 month chunks
+    # For older data, we use date ranges which the API supports,
+    # in chunks sized to the station's reading density and response times
     start_limit = end_date - timedelta(days=going_back_days)
+    if journal is not None:
+        start_limit = journal.plan(end_date, start_limit)
+    sizer = series.ChunkSizer()
+    windows = chunk_windows(end_date, start_limit, sizer, journal)
+
+    log(f"  Fetching data from {start_limit} to {end_date}...")
+    if journal is not None and journal.done:
+        log(f"  Resuming: {len(journal.done)} chunks already in journal")
+
+    def fetch(window: tuple[date, date]) -> tuple[tuple[date, date], list[Reading] | None, float | None]:
+        if journal is not None and window in journal.done:
+            return window, journal.done[window], None
+        started = time.monotonic()
+        gaps: list[date] = []
+        readings = fetch_readings_batch(measure_id, window[0].isoformat(), window[1].isoformat(), log=log, gaps=gaps)
+        # A window with gaps isn't recorded, so a resumed backfill fetches it again
+        if gaps:
+            log(f"  Warning: {len(gaps)} day(s) of {window[0]} to {window[1]} could not be fetched: {', '.join(map(str, gaps))}")
+        elif journal is not None and readings:
+            journal.record(window, readings)
+        return window, readings, time.monotonic() - started
+
+    results = _prefetch(executor, fetch, windows, lookahead)
 
-    print(f"  Fetching data from {start_limit} to {current_end}...")
-
+    all_readings = []
     empty_chunks = 0
-    while current_end > start_limit and empty_chunks < 3:
-        current_start = current_end - timedelta(days=chunk_days)
-        if current_start < start_limit:
-            current_start = start_limit
-
-        readings = fetch_readings_batch(measure_id, current_start.isoformat(), current_end.isoformat())
-
-        if readings:
-            all_readings.extend(readings)
-            empty_chunks = 0
-            print(f"    {current_start} to {current_end}: {len(readings)} readings")
-        else:
-            empty_chunks += 1
-            print(f"    {current_start} to {current_end}: no data (empty streak: {empty_chunks})")
-
-        current_end = current_start - timedelta(days=1)
-        time.sleep(0.3)  # Be polite to the API
-
-    # Deduplicate by dateTime
-    seen = set()
-    unique = []
-    for r in all_readings:
-        dt = r.get("dateTime", "")
-        if dt and dt not in seen:
-            seen.add(dt)
-            unique.append(r)
-
-    # Sort by dateTime
-    unique.sort(key=lambda x: x.get("dateTime", ""))
-
-    return unique
+    try:
+        for (current_start, current_end), readings, seconds in results:
+            if readings is None:
+                # Neither evidence of the station's density nor of the end of its history
+                log(f"    {current_start} to {current_end}: failed, skipping")
+                continue
+            if seconds is not None:
+                sizer.observe((current_end - current_start).days + 1, len(readings), seconds)
+            if readings:
+                all_readings.extend(readings)
+                empty_chunks = 0
+                log(f"    {current_start} to {current_end}: {len(readings)} readings")
+            else:
+                empty_chunks += 1
+                log(f"    {current_start} to {current_end}: no data (empty streak: {empty_chunks})")
+                if empty_chunks >= 3:
+                    break
+    finally:
+        results.close()
+
+    # Chunks arrive newest-first and each is sorted newest-first by the API,
+    # so the whole list is one descending run and sorts in linear time
+    return merge_readings([], all_readings)
+
+
+def fetch_stations(
+    stations: list[StationInfo],
+    going_back_days: int,
+    workers: int = 1,
+    checkpoint: bool = False,
+    resume: bool = False,
+) -> Iterator[tuple[StationInfo, list[Reading]]]:
+    """Yield (station, readings) in station order.
+
+    With more than one worker, stations and their chunks are fetched
+    concurrently over a pool of `workers` HTTP threads.  Each station's
+    progress lines are buffered and printed when it is yielded, so the
+    output reads exactly as it does in serial mode.
+
+    With `checkpoint`, each station's chunks are journaled as they complete
+    (see ChunkJournal); `resume` picks up from an existing journal.
+    """
+
+    def open_journal(station: StationInfo) -> ChunkJournal | None:
+        return ChunkJournal.open(get_station_filename(station), resume=resume) if checkpoint else None
+
+    if workers <= 1:
+        for station in stations:
+            print(f"\nStation: {station['label']} ({station['id']})")
+            yield station, fetch_all_readings(station, going_back_days=going_back_days, journal=open_journal(station))
+        return
+
+    def fetch_buffered(station: StationInfo, http_pool: ThreadPoolExecutor) -> tuple[list[Reading], list[str]]:
+        lines: list[str] = []
+        readings = fetch_all_readings(
+            station,
+            going_back_days=going_back_days,
+            executor=http_pool,
+            log=lines.append,
+            journal=open_journal(station),
+        )
+        return readings, lines
+
+    # Station tasks only coordinate; every HTTP request runs on http_pool
+    with ThreadPoolExecutor(workers) as http_pool, ThreadPoolExecutor(workers) as station_pool:
+        futures = [station_pool.submit(fetch_buffered, station, http_pool) for station in stations]
+        for station, future in zip(stations, futures, strict=True):
+            print(f"\nStation: {station['label']} ({station['id']})")
+            readings, lines = future.result()
+            for line in lines:
+                print(line)
+            yield station, readings
 
 
 def load_existing_csv(filename: str) -> list[Reading]:
-    """Load existing readings from a CSV file as a list of dicts."""
+    """Load existing readings from a CSV file (or its monthly partitions) as a list of dicts."""
+    if partitions.is_partitioned(DATA_DIR, filename):
+        return [{"dateTime": row[0], "value": row[1]} for row in partitions.read_rows(partitions.directory_for(DATA_DIR, filename))]
     filepath = os.path.join(DATA_DIR, filename)
     if not os.path.exists(filepath):
         return []
@@ -196,24 +572,40 @@ def load_existing_csv(filename: str) -> list[Reading]:
     return readings
 
 
+def _reading_time(reading: Reading) -> str:
+    return reading.get("dateTime", "")
+
+
 def merge_readings(existing: list[Reading], new_readings: list[Reading]) -> list[Reading]:
-    """Merge existing and new readings, deduplicate, and sort."""
-    combined = existing + new_readings
-    seen = set()
-    unique = []
-    for r in combined:
-        dt = r.get("dateTime", "")
-        if dt and dt not in seen:
-            seen.add(dt)
-            unique.append(r)
-    unique.sort(key=lambda x: x.get("dateTime", ""))
-    return unique
+    """Merge new readings into existing ones by dateTime; a new reading replaces an existing one with the same time."""
+    return series.merge_sorted(existing, new_readings, key=_reading_time)
+
+
+def get_station_unit(station: StationInfo) -> str:
+    """Get the unit written alongside each reading for a station."""
+    return "mm" if station["type"] == "rainfall" else ("mAOD" if station["type"] == "tidal" else "m")
+
+
+def _reading_rows(station: StationInfo, readings: list[Reading]) -> list[list[str]]:
+    """CSV rows for readings that have both a time and a value."""
+    unit = get_station_unit(station)
+    return [
+        [r["dateTime"], str(r["value"]), unit, station["id"], station["label"]]
+        for r in readings
+        if r.get("dateTime") and r.get("value", "") != ""
+    ]
 
 
 def save_readings_csv(station: StationInfo, readings: list[Reading], filename: str) -> None:
-    """Save readings to a CSV file (atomic write)."""
+    """Save readings to a CSV file (atomic write), or to its monthly partitions once migrated."""
+    if partitions.is_partitioned(DATA_DIR, filename):
+        directory = partitions.directory_for(DATA_DIR, filename)
+        written = partitions.save(directory, _reading_rows(station, readings))
+        print(f"  Saved {len(readings)} readings to {directory}/ ({written} months changed)")
+        return
+
     filepath = os.path.join(DATA_DIR, filename)
-    unit = "mm" if station["type"] == "rainfall" else ("mAOD" if station["type"] == "tidal" else "m")
+    unit = get_station_unit(station)
 
     def write_fn(f):
         writer = csv.writer(f)
@@ -228,6 +620,146 @@ def save_readings_csv(station: StationInfo, readings: list[Reading], filename: s
     print(f"  Saved {len(readings)} readings to {filepath}")
 
 
+def read_csv_tail(filepath: str, since: str) -> tuple[list[list[str]], str | None]:
+    """Read the trailing rows of a sorted readings CSV, back to the first one older than `since`.
+
+    Blocks are read backwards from the end of the file, so the cost scales
+    with the number of rows at or after `since` rather than with the file's
+    history. Returns (rows, line_terminator); the terminator is None if the
+    file doesn't end with a complete line.
+    """
+    with open(filepath, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > 0:
+            step = min(TAIL_BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            # Stop once the first complete line in the buffer predates `since`
+            newline = buf.find(b"\n")
+            if 0 <= newline < len(buf) - 1 and buf[newline + 1 :].split(b",", 1)[0].decode() < since:
+                break
+
+    if pos > 0:
+        buf = buf[buf.find(b"\n") + 1 :]
+    terminator = None
+    if buf.endswith(b"\n"):
+        terminator = "\r\n" if buf.endswith(b"\r\n") else "\n"
+    rows = [row for row in csv.reader(buf.decode().splitlines()) if row and row[0] != "dateTime"]
+    return rows, terminator
+
+
+def _same_value(stored: str, value: Any) -> bool:
+    """Compare a CSV value string with a reading value from the API."""
+    try:
+        return float(stored) == float(value)
+    except (TypeError, ValueError):
+        return stored == str(value)
+
+
+def update_readings_csv(station: StationInfo, new_readings: list[Reading], filename: str) -> None:
+    """Add new readings to a station CSV, appending in place where possible.
+
+    Readings newer than the file's last row are appended without reading or
+    rewriting the rest of the file, and readings identical to ones already
+    stored are skipped. Only an out-of-order reading (filling a gap in the
+    history) or a revised value falls back to merging and rewriting the
+    whole file.  A partitioned station merges into the months the readings
+    fall in, normally just the current one.
+    """
+    filepath = os.path.join(DATA_DIR, filename)
+    fresh = [r for r in merge_readings([], new_readings) if r.get("value", "") != ""]
+    if not fresh:
+        print("  No new readings")
+        return
+    if partitions.is_partitioned(DATA_DIR, filename):
+        directory = partitions.directory_for(DATA_DIR, filename)
+        added = partitions.merge(directory, _reading_rows(station, fresh))
+        print(f"  Merged {added} new readings into {directory}/")
+        return
+    if not os.path.exists(filepath):
+        save_readings_csv(station, fresh, filename)
+        return
+
+    rows, terminator = read_csv_tail(filepath, fresh[0]["dateTime"])
+    stored = {row[0]: row[1] for row in rows if len(row) >= 2}
+    last_time = rows[-1][0] if rows else ""
+    to_append = [r for r in fresh if r["dateTime"] > last_time]
+    overlap = fresh[: len(fresh) - len(to_append)]
+
+    unchanged = all(r["dateTime"] in stored and _same_value(stored[r["dateTime"]], r["value"]) for r in overlap)
+    if terminator is None or not unchanged:
+        existing = load_existing_csv(filename)
+        readings = merge_readings(existing, new_readings)
+        print(f"  Out-of-order or revised readings — rewriting: {len(existing)} existing + {len(new_readings)} new = {len(readings)} total")
+        save_readings_csv(station, readings, filename)
+        return
+
+    if not to_append:
+        print(f"  No readings newer than {last_time}")
+        return
+
+    unit = get_station_unit(station)
+    with open(filepath, "a", newline="") as f:
+        writer = csv.writer(f, lineterminator=terminator)
+        for r in to_append:
+            writer.writerow([r["dateTime"], r["value"], unit, station["id"], station["label"]])
+        f.flush()
+        os.fsync(f.fileno())
+    print(f"  Appended {len(to_append)} readings to {filepath}")
+
+
+def last_stored_time(filename: str) -> str | None:
+    """Timestamp of a station's newest stored reading, without reading its history."""
+    if partitions.is_partitioned(DATA_DIR, filename):
+        return partitions.latest_time(partitions.directory_for(DATA_DIR, filename))
+    filepath = os.path.join(DATA_DIR, filename)
+    if not os.path.exists(filepath):
+        return None
+    rows, _ = read_csv_tail(filepath, "~")  # every timestamp sorts before "~", so only the last block is read
+    return rows[-1][0] if rows else None
+
+
+def fetch_recent_batch(stations: list[StationInfo]) -> dict[str, list[Reading]]:
+    """Cover the stations with nothing new, or one new reading, from the latest reading of every measure.
+
+    One `/data/readings?latest` query (paged if needed) gives each
+    measure's newest reading, which is compared with each station's last
+    stored reading (see ea_client.latest_batch).  The query is only made
+    for stations stored up to within a reading or so of now
+    (ea_client.in_latest_reach): the scheduled hourly run is about four
+    readings behind every station, so it skips the batch and makes just
+    the per-measure requests.  Returns {measure_id: readings} for the
+    stations it accounts for; the rest (no CSV yet, several new readings)
+    are left to the per-measure path.  Empty if the query is skipped,
+    fails, or fills MAX_BATCH_PAGES pages and so may be cut short.
+    """
+    last_times = {}
+    for station in stations:
+        last = last_stored_time(get_station_filename(station))
+        if last and ea_client.in_latest_reach(get_measure_id(station), last):
+            last_times[get_measure_id(station)] = last
+    if not last_times:
+        return {}
+
+    items: list[Reading] = []
+    try:
+        for page in range(MAX_BATCH_PAGES):
+            query = f"latest&_limit={BATCH_PAGE_SIZE}&_offset={page * BATCH_PAGE_SIZE}"
+            page_items = api_get(f"{API_BASE}/data/readings?{query}").get("items", [])
+            items.extend(page_items)
+            if len(page_items) < BATCH_PAGE_SIZE:
+                batch = ea_client.latest_batch(items, last_times)
+                print(f"Batch: latest readings cover {len(batch)} of {len(last_times)} stations in {page + 1} request(s)")
+                return batch
+    except Exception as e:
+        print(f"Warning: batch fetch failed, falling back to per-station requests: {e}")
+        return {}
+    print(f"Warning: more than {MAX_BATCH_PAGES * BATCH_PAGE_SIZE} latest readings, falling back to per-station requests")
+    return {}
+
+
 def save_stations_csv() -> None:
     """Save station metadata to CSV (atomic write)."""
     filepath = os.path.join(DATA_DIR, "stations.csv")
@@ -253,6 +785,90 @@ def get_station_filename(station: StationInfo) -> str:
     return f"level_{safe_id}_{safe_label}.csv"
 
 
+def save_series_file(filename: str, readings: list[Reading], replace: bool = False) -> None:
+    """Bring a station's binary columnar file (see colstore.py) up to date after its CSV was written.
+
+    With `replace`, `readings` is the station's full history.  Otherwise they
+    are merged in, or the file is built from the stored CSV if it's missing.
+    """
+    path = colstore.path_for(DATA_DIR, filename)
+    if not replace and os.path.exists(path):
+        colstore.merge(path, ((r["dateTime"], r.get("value")) for r in readings))
+        return
+    history = readings if replace else load_existing_csv(filename)
+    count = colstore.write(path, ((r["dateTime"], r.get("value")) for r in history))
+    print(f"  Wrote {count} readings to {path}")
+
+
+def save_rollups(station: StationInfo, filename: str, readings: list[Reading], replace: bool = False) -> None:
+    """Bring a station's hourly and daily rollups (see rollups.py) up to date after its CSV was written.
+
+    Only stations whose rollups have been built are kept up to date. With
+    `replace`, `readings` is the station's full history and the rollups are
+    rebuilt; otherwise only the days the readings fall in are recomputed,
+    from the stored rows for those days.
+    """
+    times = [r["dateTime"] for r in readings if r.get("dateTime")]
+    if not times or not rollups.exists(DATA_DIR, filename):
+        return
+    if replace:
+        rollups.rebuild(DATA_DIR, filename, station["type"], ([r["dateTime"], r.get("value")] for r in readings))
+        return
+    since = rollups.day_start(min(times))
+    if partitions.is_partitioned(DATA_DIR, filename):
+        rows = partitions.read_rows(partitions.directory_for(DATA_DIR, filename), start=since)
+    else:
+        rows, _ = read_csv_tail(os.path.join(DATA_DIR, filename), since)
+    rollups.update(DATA_DIR, filename, station["type"], since, rows)
+
+
+def rebuild_rollups(stations: list[StationInfo]) -> None:
+    """Build (or rebuild) each station's hourly and daily rollups from its stored readings."""
+    for station in stations:
+        filename = get_station_filename(station)
+        readings = load_existing_csv(filename)
+        if not readings:
+            print(f"{filename}: no data")
+            continue
+        days = rollups.rebuild(DATA_DIR, filename, station["type"], ([r["dateTime"], r["value"]] for r in readings))
+        print(f"{filename}: {len(readings)} readings rolled up into {days} days")
+
+
+def save_latest(stations: list[StationInfo]) -> None:
+    """Rebuild data/latest.json (see snapshot.py) from the tail of each station's stored readings."""
+    entries = {}
+    partitioned = []
+    for station in stations:
+        filename = get_station_filename(station)
+        if partitions.is_partitioned(DATA_DIR, filename):
+            partitioned.append(station["id"])
+        last = last_stored_time(filename)
+        rows = []
+        if last is not None:
+            # Twice the trend window, so a sparse last hour is still seen as part of a longer history
+            since = colstore.to_iso(colstore.to_epoch(last) - 2 * snapshot.TREND_HOURS * 3600)
+            if station["id"] in partitioned:
+                rows = partitions.read_rows(partitions.directory_for(DATA_DIR, filename), start=since)
+            else:
+                rows, _ = read_csv_tail(os.path.join(DATA_DIR, filename), since)
+        entries[station["id"]] = snapshot.entry(station, rows)
+    if snapshot.write(DATA_DIR, entries, partitioned):
+        print(f"Saved latest readings to {snapshot.path_for(DATA_DIR)}")
+
+
+def migrate_to_partitions(stations: list[StationInfo]) -> None:
+    """Convert each station's single CSV into monthly partitions."""
+    for station in stations:
+        filename = get_station_filename(station)
+        months = partitions.migrate(DATA_DIR, filename)
+        if months is not None:
+            print(f"{filename}: split into {months} monthly partitions")
+        elif partitions.is_partitioned(DATA_DIR, filename):
+            print(f"{filename}: already partitioned")
+        else:
+            print(f"{filename}: no data")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Fetch EA flood monitoring data")
     parser.add_argument(
@@ -263,7 +879,80 @@ def main() -> None:
         const=2,
         help="Only fetch recent data (default: 2 days) and merge with existing CSVs",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Fetch stations and chunks over N concurrent connections (default: 1, serial)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=3.0,
+        metavar="RPS",
+        help="Maximum API requests per second, shared by all workers (default: 3)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "csv"],
+        default="json",
+        help="Wire format for readings; csv is parsed row by row as it streams in (default: json)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=ea_client.CACHE_MAX_BYTES // (1024 * 1024),
+        metavar="MB",
+        help="Size limit for the on-disk response cache in .cache/ea/ (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always fetch from the API, bypassing the response cache",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve every request from the response cache, never the network (for testing)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Continue an interrupted full backfill, skipping chunks already recorded in data/{JOURNAL_DIR}/",
+    )
+    parser.add_argument(
+        "--binary",
+        action="store_true",
+        help="Also keep a compact binary columnar copy of each station (data/<station>.bin) for fast range reads",
+    )
+    parser.add_argument(
+        "--rollups",
+        action="store_true",
+        help="Build hourly and daily rollups for each station in data/rollups/ from stored data and exit",
+    )
+    parser.add_argument(
+        "--partition",
+        action="store_true",
+        help="Split each station's CSV into monthly files under data/<station>/ and exit (one-off migration)",
+    )
     args = parser.parse_args()
+    if args.partition:
+        migrate_to_partitions(LEVEL_STATIONS + RAINFALL_STATIONS)
+        save_latest(LEVEL_STATIONS + RAINFALL_STATIONS)  # its list of partitioned stations tells the frontend where to look
+        return
+    if args.rollups:
+        rebuild_rollups(LEVEL_STATIONS + RAINFALL_STATIONS)
+        return
+    if args.resume and args.recent:
+        parser.error("--resume only applies to a full backfill, not --recent")
+    if args.offline and args.no_cache:
+        parser.error("--offline needs the response cache")
+
+    global _rate_limiter, _readings_format
+    _rate_limiter = RateLimiter(args.rate, burst=max(1, args.workers))
+    _readings_format = args.format
+    cache = None if args.no_cache else ea_client.enable_cache(max_bytes=args.cache_size * 1024 * 1024, offline=args.offline)
 
     os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -278,23 +967,43 @@ def main() -> None:
     else:
         print(f"\n=== Full mode: fetching up to {going_back} days of history ===")
 
-    for station in all_stations:
-        print(f"\nStation: {station['label']} ({station['id']})")
+    remaining = all_stations
+    if args.recent:
+        batch = fetch_recent_batch(all_stations)
+        for station in all_stations:
+            readings = batch.get(get_measure_id(station))
+            if readings is not None:
+                print(f"\nStation: {station['label']} ({station['id']}) — {len(readings)} readings from batch")
+                update_readings_csv(station, readings, get_station_filename(station))
+                save_rollups(station, get_station_filename(station), readings)
+                if args.binary:
+                    save_series_file(get_station_filename(station), readings)
+        remaining = [s for s in all_stations if get_measure_id(s) not in batch]
+
+    stations = fetch_stations(remaining, going_back, workers=args.workers, checkpoint=not args.recent, resume=args.resume)
+    for station, new_readings in stations:
         filename = get_station_filename(station)
 
-        new_readings = fetch_all_readings(station, going_back_days=going_back)
-
         if args.recent:
-            existing = load_existing_csv(filename)
-            readings = merge_readings(existing, new_readings)
-            print(f"  Merged: {len(existing)} existing + {len(new_readings)} new = {len(readings)} total")
+            update_readings_csv(station, new_readings, filename)
         else:
-            readings = new_readings
+            save_readings_csv(station, new_readings, filename)
+        save_rollups(station, filename, new_readings, replace=not args.recent)
+        if args.binary:
+            save_series_file(filename, new_readings, replace=not args.recent)
 
-        save_readings_csv(station, readings, filename)
+    # Journals are kept until every station is saved, so a resumed run
+    # replays finished stations from disk instead of refetching them
+    if not args.recent:
+        for station in all_stations:
+            ChunkJournal.discard(get_station_filename(station))
+
+    save_latest(all_stations)
 
     print("\n=== Done ===")
     print(f"All data saved to {DATA_DIR}/")
+    if cache is not None:
+        print(f"Response cache: {cache.hits} served from {cache.directory}, {cache.misses} fetched and stored")
 
 
 if __name__ == "__main__":
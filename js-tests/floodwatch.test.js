@@ -277,6 +277,169 @@ describe('createStationMarker', () => {
 });
 
 
+// ============================================================
+// P1 — applyStationUpdate (readings pushed on /api/stream)
+// ============================================================
+
+describe('applyStationUpdate', () => {
+    test('appends new readings and updates the marker in place', () => {
+        const station = window.getStation('50140');
+        window.stationData['50140'] = {
+            readings: [{ dateTime: new Date('2026-02-10T10:00:00Z'), value: 1.0 }],
+            latest: { dateTime: new Date('2026-02-10T10:00:00Z'), value: 1.0 },
+        };
+        window.createStationMarker(station, 'level');
+        const marker = L.marker.mock.results[L.marker.mock.results.length - 1].value;
+        const markersCreated = L.marker.mock.calls.length;
+
+        window.applyStationUpdate({
+            id: '50140', type: 'level',
+            readings: [
+                { dateTime: '2026-02-10T10:00:00Z', value: 1.0 },
+                { dateTime: '2026-02-10T10:15:00Z', value: 1.25 },
+            ],
+        });
+
+        const data = window.stationData['50140'];
+        expect(data.readings.length).toBe(2);
+        expect(data.latest.value).toBe(1.25);
+        expect(marker.setIcon).toHaveBeenCalledTimes(1);
+        expect(marker.setIcon.mock.calls[0][0].html).toContain('1.25');
+        expect(L.marker.mock.calls.length).toBe(markersCreated);
+    });
+});
+
+
+// ============================================================
+// P1 — loadDeltas (incremental refresh from /api/readings/delta)
+// ============================================================
+
+describe('loadDeltas', () => {
+    test('asks once for everything newer than the oldest latest reading', async () => {
+        window.stationData['50140'] = {
+            readings: [{ dateTime: new Date('2026-02-10T10:00:00Z'), value: 1.0 }],
+            latest: { dateTime: new Date('2026-02-10T10:00:00Z'), value: 1.0 },
+        };
+        window.stationData['50149'] = {
+            readings: [{ dateTime: new Date('2026-02-10T09:00:00Z'), value: 0.5 }],
+            latest: { dateTime: new Date('2026-02-10T09:00:00Z'), value: 0.5 },
+        };
+        fetch.mockResolvedValueOnce({
+            ok: true,
+            json: () => Promise.resolve({ readings: {
+                '50140': [['2026-02-10T09:30:00Z', 0.9], ['2026-02-10T10:15:00Z', 1.25]],
+                '50149': [],
+            } }),
+        });
+
+        const added = await window.loadDeltas([window.getStation('50140'), window.getStation('50149')]);
+
+        expect(fetch.mock.calls.at(-1)[0]).toBe(
+            'api/readings/delta?since=2026-02-10T09%3A00%3A00.000Z&stations=50140,50149');
+        expect(added).toEqual({ '50140': 1, '50149': 0 });
+        expect(window.stationData['50140'].latest.value).toBe(1.25);
+    });
+});
+
+
+// ============================================================
+// P1 — fetchOverlay (versioned overlay URLs without a serial round trip)
+// ============================================================
+
+describe('fetchOverlay', () => {
+    const savedVersion = window.appVersion;
+
+    beforeEach(() => {
+        localStorage.removeItem('floodwatch_version');
+        window.appVersion = savedVersion;
+    });
+
+    test('requests the overlay at once under the remembered version', async () => {
+        localStorage.setItem('floodwatch_version', 'v1');
+        let resolveVersion;
+        window.appVersion = new Promise((r) => { resolveVersion = r; });
+        const calls = fetch.mock.calls.length;
+
+        const pending = window.fetchOverlay('river_taw.geojson');
+
+        // Already in flight while version.json is still outstanding
+        expect(fetch.mock.calls.slice(calls).map((c) => c[0])).toEqual(['data/river_taw.geojson?v=v1']);
+        resolveVersion('v1');
+        await pending;
+        expect(fetch.mock.calls.length).toBe(calls + 1);
+    });
+
+    test('waits for the version with none remembered, and re-requests after a deploy', async () => {
+        window.appVersion = Promise.resolve('v2');
+        let calls = fetch.mock.calls.length;
+        await window.fetchOverlay('tarka_line.geojson');
+        expect(fetch.mock.calls.slice(calls).map((c) => c[0])).toEqual(['data/tarka_line.geojson?v=v2']);
+
+        localStorage.setItem('floodwatch_version', 'v1');
+        calls = fetch.mock.calls.length;
+        await window.fetchOverlay('tarka_line.geojson');
+        expect(fetch.mock.calls.slice(calls).map((c) => c[0])).toEqual([
+            'data/tarka_line.geojson?v=v1',
+            'data/tarka_line.geojson?v=v2',
+        ]);
+    });
+});
+
+
+// ============================================================
+// P1 — loadLatest (markers from data/latest.json, histories on demand)
+// ============================================================
+
+describe('loadLatest', () => {
+    test('draws a marker from the snapshot without loading the history', async () => {
+        delete window.stationData['50140'];
+        window.stationData['50149'] = {
+            readings: [{ dateTime: new Date('2026-02-10T10:00:00Z'), value: 0.5 }],
+            latest: { dateTime: new Date('2026-02-10T10:00:00Z'), value: 0.5 },
+        };
+        fetch.mockResolvedValueOnce({
+            ok: true,
+            json: () => Promise.resolve({ stations: {
+                '50140': { type: 'level', dateTime: '2026-02-10T10:45:00Z', value: 2.1, trend: 'rising', status: 'high' },
+                '50149': { type: 'level', dateTime: '2026-02-10T10:45:00Z', value: 0.6, trend: 'steady', status: 'normal' },
+            } }),
+        });
+
+        expect(await window.loadLatest()).toBe(true);
+
+        const data = window.stationData['50140'];
+        expect(data.lazy).toBe(true);
+        expect(data.readings).toEqual([]);
+        expect(data.latest).toEqual({ dateTime: new Date('2026-02-10T10:45:00Z'), value: 2.1 });
+        expect(window.getTrend('50140', 'level')).toEqual({ direction: 'rising', symbol: '\u2191' });
+        expect(window.stationData['50149'].latest.value).toBe(0.5);  // history already loaded: kept
+
+        window.createStationMarker(window.getStation('50140'), 'level');
+        const html = L.divIcon.mock.calls[L.divIcon.mock.calls.length - 1][0].html;
+        expect(html).toContain('2.10');
+        expect(html).toContain('high-level');
+        expect(html).toContain('trend-badge rising');
+    });
+
+    test('loads only listed stations from partitions, without probing the rest for index.json', async () => {
+        fetch.mockResolvedValueOnce({
+            ok: true,
+            json: () => Promise.resolve({ stations: {}, partitioned: ['50149'] }),
+        });
+        await window.loadLatest();
+
+        fetch.mockClear();
+        await window.loadStationReadings(window.getStation('50140'), new Date());
+        expect(fetch.mock.calls.map(call => call[0])).toEqual(['data/' + window.getStation('50140').file]);
+
+        fetch.mockClear();
+        fetch.mockResolvedValueOnce({ ok: true, json: () => Promise.resolve({ months: {} }) });
+        await window.loadStationReadings(window.getStation('50149'), new Date());
+        expect(fetch.mock.calls[0][0]).toBe('data/level_50149_sticklepath/index.json');
+    });
+});
+
+
 // ============================================================
 // P2 — Canvas loading states (fillText coordinates)
 // ============================================================
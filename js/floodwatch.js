@@ -76,9 +76,10 @@ const FLOOD_SEVERITY = {
 // Globals
 // ============================================================
 let map;
-let stationData = {}; // stationId -> { readings: [...], latest: {...} }
+let stationData = {}; // stationId -> { readings: [...], latest: {...} }, or { readings: [], latest, trend, lazy: true } from data/latest.json
 let activePopupChart = null;
 let activePopupStation = null;
+const stationMarkers = {}; // stationId -> Leaflet marker
 let hasBackend = false; // detected at startup
 
 // ============================================================
@@ -127,6 +128,45 @@ function initMap() {
     addLegend();
 }
 
+// The deployed version, from version.json (updated on every commit).  The
+// GeoJSON overlays are requested with it as ?v=, which serve.py answers
+// with a year-long immutable max-age: they only change with a deploy, and
+// a deploy changes their URLs.  The version is requested once, at startup,
+// and remembered so the next visit needn't wait for it.
+const VERSION_KEY = 'floodwatch_version';
+
+function rememberedVersion() {
+    try {
+        return localStorage.getItem(VERSION_KEY) || '';
+    } catch {
+        return '';
+    }
+}
+
+const appVersion = fetch('version.json', { cache: 'no-cache' })
+    .then(r => r.json())
+    .then(data => data.version || '')
+    .catch(() => '') // non-critical
+    .then(version => {
+        try {
+            if (version) localStorage.setItem(VERSION_KEY, version);
+        } catch { /* private mode: just wait for it next time */ }
+        return version;
+    });
+
+// With a version remembered from the last visit the overlay is requested
+// at once, alongside version.json; only if a deploy has changed the
+// version since is it requested again under the new URL.  Without one,
+// the first visit waits for version.json.
+function fetchOverlay(file) {
+    const url = version => DATA_BASE + file + (version ? '?v=' + encodeURIComponent(version) : '');
+    const known = rememberedVersion();
+    if (!known) return appVersion.then(version => fetch(url(version)));
+    const early = fetch(url(known));
+    early.catch(() => {}); // handled below, once the version is known
+    return appVersion.then(version => (version && version !== known ? fetch(url(version)) : early));
+}
+
 // ============================================================
 // River Overlay
 // ============================================================
@@ -142,7 +182,7 @@ const RIVERS = [
 
 function loadRiverOverlay() {
     for (const river of RIVERS) {
-        fetch(DATA_BASE + river.file)
+        fetchOverlay(river.file)
             .then(r => { if (!r.ok) throw new Error(r.status); return r.json(); })
             .then(geojson => {
                 L.geoJSON(geojson, {
@@ -240,7 +280,7 @@ function addLabel(lat, lon, text, color) {
 // ============================================================
 function loadTarkaLine() {
     // Load track
-    fetch(DATA_BASE + 'tarka_line.geojson')
+    fetchOverlay('tarka_line.geojson')
         .then(r => r.json())
         .then(geojson => {
             L.geoJSON(geojson, {
@@ -256,7 +296,7 @@ function loadTarkaLine() {
         .catch(e => console.warn('Could not load Tarka Line track:', e));
 
     // Load stations
-    fetch(DATA_BASE + 'tarka_stations.geojson')
+    fetchOverlay('tarka_stations.geojson')
         .then(r => r.json())
         .then(geojson => {
             L.geoJSON(geojson, {
@@ -300,7 +340,7 @@ function loadTarkaLine() {
 // ============================================================
 function loadDartmoorLine() {
     // Load track (only the unique section from Coleford Junction to Okehampton)
-    fetch(DATA_BASE + 'dartmoor_line.geojson')
+    fetchOverlay('dartmoor_line.geojson')
         .then(r => r.json())
         .then(geojson => {
             L.geoJSON(geojson, {
@@ -316,7 +356,7 @@ function loadDartmoorLine() {
         .catch(e => console.warn('Could not load Dartmoor Line track:', e));
 
     // Load station (Okehampton only -- shared stations already on Tarka Line)
-    fetch(DATA_BASE + 'dartmoor_stations.geojson')
+    fetchOverlay('dartmoor_stations.geojson')
         .then(r => r.json())
         .then(geojson => {
             L.geoJSON(geojson, {
@@ -400,47 +440,212 @@ function addLegend() {
 // ============================================================
 // Data Loading
 // ============================================================
-function loadCSV(file) {
-    return new Promise((resolve, reject) => {
-        // Cache-bust: append timestamp so the browser always fetches fresh CSVs
-        const url = DATA_BASE + file + '?t=' + Date.now();
-        Papa.parse(url, {
-            download: true,
+async function loadCSV(file) {
+    // no-cache: the browser revalidates its copy every time, so an unchanged
+    // CSV costs a 304 (serve.py sends an ETag) and a changed one is never stale
+    const resp = await fetch(DATA_BASE + file, { cache: 'no-cache' });
+    if (!resp.ok) throw new Error(`${file}: ${resp.status}`);
+    const text = await resp.text();
+    return new Promise(resolve => {
+        Papa.parse(text, {
             header: true,
             dynamicTyping: true,
             skipEmptyLines: true,
-            complete: result => resolve(result.data),
-            error: err => reject(err)
+            complete: result => resolve(result.data)
         });
     });
 }
 
+function parseReadings(rows) {
+    return rows
+        .filter(r => r.dateTime && r.value !== null && r.value !== '')
+        .map(r => ({
+            dateTime: new Date(r.dateTime),
+            value: parseFloat(r.value)
+        }))
+        .filter(r => !isNaN(r.value))
+        .sort((a, b) => a.dateTime - b.dateTime);
+}
+
+// Partitioned stations (fetch_data.py --partition) keep one CSV per month
+// under data/<station>/, listed in index.json, and data/latest.json lists
+// which stations they are.  Only the months covering the last
+// INITIAL_HISTORY_DAYS are loaded up front; older months are fetched when
+// a longer time range is picked.
+const INITIAL_HISTORY_DAYS = 31; // covers every preset range except "All"
+const partitionIndexes = {}; // station id -> { "YYYY-MM": {...} }, or null for a single CSV
+let partitionedStations = null; // Set of station ids from data/latest.json, or null before it loads
+const historyLoads = {}; // station id -> pending loadOlderHistory promise
+
+function partitionDir(station) {
+    return station.file.replace(/\.csv$/, '');
+}
+
+function monthKey(date) {
+    return date.toISOString().slice(0, 7);
+}
+
+async function loadPartitionIndex(station) {
+    try {
+        // Revalidated like the CSVs, so an unchanged index costs a 304
+        const resp = await fetch(DATA_BASE + partitionDir(station) + '/index.json', { cache: 'no-cache' });
+        return resp.ok ? (await resp.json()).months || null : null;
+    } catch {
+        return null;
+    }
+}
+
+async function loadMonths(station, months) {
+    const parts = await Promise.all(months.map(m => loadCSV(`${partitionDir(station)}/${m}.csv`)));
+    return parseReadings(parts.flat());
+}
+
+// Load a station's readings from `since` onwards.  Returns { readings,
+// loadedFrom }: loadedFrom is the start of the oldest month loaded when
+// older months remain on the server, or null when the full history is in.
+async function loadStationReadings(station, since) {
+    let index = null;
+    if (partitionedStations?.has(station.id)) {
+        index = await loadPartitionIndex(station);
+    } else {
+        try {
+            partitionIndexes[station.id] = null;
+            return { readings: parseReadings(await loadCSV(station.file)), loadedFrom: null };
+        } catch (err) {
+            // No list yet, or one older than the migration: a missing CSV may mean the station was partitioned
+            index = await loadPartitionIndex(station);
+            if (!index) throw err;
+        }
+    }
+    partitionIndexes[station.id] = index;
+    if (!index) {
+        return { readings: parseReadings(await loadCSV(station.file)), loadedFrom: null };
+    }
+    const months = Object.keys(index).sort();
+    const first = monthKey(since);
+    const readings = await loadMonths(station, months.filter(m => m >= first));
+    return { readings, loadedFrom: months[0] < first ? new Date(first + '-01T00:00:00Z') : null };
+}
+
+// Fetch the monthly partitions a `hours` time range needs (0 = all) that
+// aren't loaded yet.  Resolves true if older readings were added.
+function loadOlderHistory(stationId, hours) {
+    const pending = historyLoads[stationId] || Promise.resolve(false);
+    const next = pending.then(async () => {
+        const data = stationData[stationId];
+        const index = partitionIndexes[stationId];
+        const cutoff = hours > 0 ? new Date(Date.now() - hours * 3600 * 1000) : null;
+        if (!data?.loadedFrom || !index || (cutoff && cutoff >= data.loadedFrom)) return false;
+
+        const months = Object.keys(index).sort();
+        const first = cutoff ? monthKey(cutoff) : '';
+        const older = await loadMonths(getStation(stationId), months.filter(m => m >= first && m < monthKey(data.loadedFrom)));
+        data.readings = older.concat(data.readings);
+        data.loadedFrom = months[0] < first ? new Date(first + '-01T00:00:00Z') : null;
+        return older.length > 0;
+    });
+    historyLoads[stationId] = next.catch(() => false);
+    return next;
+}
+
+// Add readings newer than a station's last to its data; returns how many.
+function appendReadings(stationId, readings) {
+    const data = stationData[stationId];
+    const last = data.readings.length > 0 ? data.readings[data.readings.length - 1].dateTime : null;
+    const fresh = readings.filter(r => !last || r.dateTime > last);
+    if (fresh.length > 0) {
+        data.readings = data.readings.concat(fresh);
+        data.latest = data.readings[data.readings.length - 1];
+    }
+    return fresh.length;
+}
+
+// Fetch the readings the server has beyond what we hold for each station,
+// in one request to serve.py's delta API rather than a CSV per station.
+// Resolves to { stationId: readings added } for the stations it covered
+// (those with a history loaded), or null where there's no delta API.
+async function loadDeltas(stations) {
+    const known = stations.filter(s => stationData[s.id]?.latest && !stationData[s.id].lazy);
+    if (known.length === 0) return null;
+    const since = new Date(Math.min(...known.map(s => stationData[s.id].latest.dateTime)));
+    const query = `since=${encodeURIComponent(since.toISOString())}&stations=${known.map(s => s.id).join(',')}`;
+    try {
+        const resp = await fetch(`api/readings/delta?${query}`);
+        if (!resp.ok) return null;
+        const body = await resp.json();
+        const added = {};
+        for (const station of known) {
+            const readings = (body.readings[station.id] || []).map(([dateTime, value]) => ({ dateTime: new Date(dateTime), value }));
+            added[station.id] = appendReadings(station.id, readings);
+        }
+        return added;
+    } catch {
+        return null;
+    }
+}
+
+// Load a station's recent history, replacing whatever it had.
+async function loadStation(station) {
+    const since = new Date(Date.now() - INITIAL_HISTORY_DAYS * 86400000);
+    try {
+        const { readings, loadedFrom } = await loadStationReadings(station, since);
+
+        stationData[station.id] = {
+            readings,
+            latest: readings.length > 0 ? readings[readings.length - 1] : null,
+            loadedFrom
+        };
+    } catch (e) {
+        console.warn(`Could not load data for ${station.label}:`, e);
+        if (!stationData[station.id]?.lazy) stationData[station.id] = { readings: [], latest: null };
+    }
+}
+
 async function loadAllData() {
     const allStations = [...STATIONS.level, ...STATIONS.rainfall, ...STATIONS.tidal];
+    await Promise.all(allStations.map(loadStation));
+}
 
-    const promises = allStations.map(async station => {
-        try {
-            const data = await loadCSV(station.file);
-            const readings = data
-                .filter(r => r.dateTime && r.value !== null && r.value !== '')
-                .map(r => ({
-                    dateTime: new Date(r.dateTime),
-                    value: parseFloat(r.value)
-                }))
-                .filter(r => !isNaN(r.value))
-                .sort((a, b) => a.dateTime - b.dateTime);
+// data/latest.json, written by fetch_data.py and serve.py, holds every
+// station's latest reading, trend and threshold status: all the markers
+// need, in one small file.  Stations get just that (marked lazy) and load
+// their history when their popup opens.  Stations whose history is
+// already loaded are left alone.  Resolves false if there's no snapshot.
+const LATEST_FILE = 'latest.json';
+const TREND_SYMBOLS = { rising: '\u2191', falling: '\u2193', steady: '\u2192' };
+const historyRequests = {}; // station id -> pending loadHistory promise
 
+async function loadLatest() {
+    try {
+        const resp = await fetch(DATA_BASE + LATEST_FILE, { cache: 'no-cache' });
+        if (!resp.ok) return false;
+        const snapshot = await resp.json();
+        if (!snapshot?.stations) return false;
+        partitionedStations = new Set(snapshot.partitioned || []);
+        for (const station of [...STATIONS.level, ...STATIONS.rainfall, ...STATIONS.tidal]) {
+            if (stationData[station.id] && !stationData[station.id].lazy) continue;
+            const entry = snapshot.stations[station.id];
             stationData[station.id] = {
-                readings,
-                latest: readings.length > 0 ? readings[readings.length - 1] : null
+                readings: [],
+                latest: entry ? { dateTime: new Date(entry.dateTime), value: entry.value } : null,
+                trend: entry?.trend || null,
+                lazy: true
             };
-        } catch (e) {
-            console.warn(`Could not load data for ${station.label}:`, e);
-            stationData[station.id] = { readings: [], latest: null };
         }
-    });
+        return true;
+    } catch {
+        return false;
+    }
+}
 
-    await Promise.all(promises);
+// Load a lazy station's history (once, however many times it's asked for),
+// with any readings cached in localStorage on top.
+function loadHistory(station) {
+    if (!stationData[station.id]?.lazy) return Promise.resolve();
+    historyRequests[station.id] ||= loadStation(station)
+        .then(() => loadFromLocalStorage([station.id]))
+        .finally(() => { delete historyRequests[station.id]; });
+    return historyRequests[station.id];
 }
 
 // ============================================================
@@ -463,7 +668,7 @@ function createMarkers() {
     }
 }
 
-function createStationMarker(station, type) {
+function stationIcon(station, type) {
     const data = stationData[station.id];
     const latestValue = data?.latest ? data.latest.value : '?';
     const displayValue = typeof latestValue === 'number' ? latestValue.toFixed(type === 'rainfall' ? 1 : 2) : '?';
@@ -478,17 +683,20 @@ function createStationMarker(station, type) {
     const highClass = isHighLevel ? ' high-level' : '';
 
     const size = 36;
-    const icon = L.divIcon({
+    return L.divIcon({
         html: `<div class="station-marker ${type}${highClass}"><span class="marker-value">${displayValue}</span>${trendHtml}</div>`,
         className: '',
         iconSize: [size, size],
         iconAnchor: [size / 2, size / 2],
         popupAnchor: [0, -size / 2]
     });
+}
 
-    const marker = L.marker([station.lat, station.lon], { icon, zIndexOffset: 500 }).addTo(map);
+function createStationMarker(station, type) {
+    const marker = L.marker([station.lat, station.lon], { icon: stationIcon(station, type), zIndexOffset: 500 }).addTo(map);
+    stationMarkers[station.id] = marker;
 
-    marker.on('click', () => openPopup(marker, station, type));
+    marker.on('click', () => loadHistory(station).then(() => openPopup(marker, station, type)));
 }
 
 // ============================================================
@@ -603,6 +811,12 @@ function setTimeRange(stationId, hours, type, btn) {
     const tsEl = document.getElementById(`timestamp-${stationId}`);
     if (tsEl) tsEl.textContent = tsEl.dataset.original;
     renderChart(stationId, hours, type);
+    // Redraw once any older monthly partitions the range needs have loaded
+    loadOlderHistory(stationId, hours)
+        .then(loaded => {
+            if (loaded && activePopupStation === stationId && btn.classList.contains('active')) renderChart(stationId, hours, type);
+        })
+        .catch(e => console.warn(`Could not load older data for ${stationId}:`, e));
 }
 
 // ============================================================
@@ -1343,6 +1557,40 @@ function removeLogProgress() {
 // ============================================================
 // Data Refresh
 // ============================================================
+const REFRESH_POLL_INTERVAL = 1000; // ms between refresh job status requests
+
+// Ask the backend to refresh every station.  serve.py starts a background
+// job (202 Accepted) whose status we poll, logging each station as it
+// finishes; refresh.php does the work within the request and answers 200
+// with the same per-station details.  Resolves to those details.
+async function refreshOnServer(total) {
+    const resp = await fetch('refresh.php', { method: 'POST' });
+    if (!resp.ok) throw new Error(`Backend refresh: ${resp.status}`);
+    let job = await resp.json();
+    const logged = new Set();
+    const logDetails = () => {
+        for (const detail of job.details || []) {
+            if (logged.has(detail.id)) continue;
+            logged.add(detail.id);
+            if (detail.error || detail.status === 'error') addLogEntry(`${detail.label}: failed`, 'error');
+            else if (detail.new_readings > 0) addLogEntry(`${detail.label}: +${detail.new_readings} readings`, 'success');
+            else addLogEntry(`${detail.label}: up to date`, 'success');
+        }
+        setLogProgress(logged.size, total, 'stations');
+    };
+
+    logDetails();
+    while (resp.status === 202 && (job.status === 'queued' || job.status === 'running')) {
+        await new Promise(r => setTimeout(r, REFRESH_POLL_INTERVAL));
+        const poll = await fetch(job.url);
+        if (!poll.ok) throw new Error(`Refresh status: ${poll.status}`);
+        job = await poll.json();
+        logDetails();
+    }
+    if (job.status === 'failed') throw new Error(job.error || 'Refresh job failed');
+    return job.details || [];
+}
+
 async function refreshData() {
     forecastCache = {};
     dischargeCache = {};
@@ -1365,8 +1613,40 @@ async function refreshData() {
         let stationsFailed = 0;
 
         let useCSVFallback = false;
+        let deltas = null; // stationId -> readings added from the server's delta API
+
+        // With a backend, the server fetches and stores the readings while we
+        // follow its progress, then fetch just the new rows of the stations it
+        // updated (their CSVs where there's no delta API).  The browser only
+        // calls the EA API itself if that fails.
+        let refreshedOnServer = false;
+        if (hasBackend) {
+            try {
+                const details = await refreshOnServer(total);
+                stationsFailed += details.filter(d => d.error || d.status === 'error').length;
+                const updated = details.filter(d => d.new_readings > 0 && getStation(d.id));
+                const added = await loadDeltas(updated.map(d => getStation(d.id)));
+                // Stations still lazy need only their new latest reading and trend
+                const snapshotLoaded = updated.some(d => stationData[d.id]?.lazy) && await loadLatest();
+                await Promise.all(updated.map(async detail => {
+                    const station = getStation(detail.id);
+                    if (!(added && station.id in added) && !(snapshotLoaded && stationData[station.id].lazy)) {
+                        await loadStation(station);
+                    }
+                    totalNew += detail.new_readings;
+                    stationsUpdated++;
+                }));
+                refreshedOnServer = true;
+            } catch (e) {
+                addLogEntry('Server refresh failed \u2014 fetching in the browser', 'warn');
+                console.warn('Server refresh failed:', e);
+            }
+        }
+
+        // Fetching in the browser merges into each station's history
+        if (!refreshedOnServer) await Promise.all(allStations.map(loadHistory));
 
-        for (let i = 0; i < allStations.length; i++) {
+        for (let i = 0; i < allStations.length && !refreshedOnServer; i++) {
             const station = allStations[i];
             setLogProgress(i + 1, total, 'stations');
             addLogEntry(`Fetching ${station.label}\u2026`, 'info');
@@ -1448,7 +1728,7 @@ async function refreshData() {
                     }
 
                     merged.sort((a, b) => a.dateTime - b.dateTime);
-                    stationData[station.id] = { readings: merged, latest: merged[merged.length - 1] };
+                    stationData[station.id] = { ...stationData[station.id], readings: merged, latest: merged[merged.length - 1] };
 
                     if (newCount > 0) {
                         totalNew += newCount;
@@ -1461,23 +1741,28 @@ async function refreshData() {
                     addLogEntry(`${station.label}: no new data`, 'success');
                 }
             } catch (e) {
-                // EA API failed (likely CORS) — fall back to reloading CSV
+                // EA API failed (likely CORS) — fall back to the server's copy:
+                // one delta request for the new rows of every station left,
+                // or, without a delta API, each station's CSV
                 if (!useCSVFallback) {
                     useCSVFallback = true;
                     addLogEntry('EA API unavailable \u2014 using cached data (updated hourly)', 'warn');
+                    if (hasBackend) deltas = await loadDeltas(allStations.slice(i));
+                }
+                if (deltas && station.id in deltas) {
+                    if (deltas[station.id] > 0) { totalNew += deltas[station.id]; stationsUpdated++; }
+                    addLogEntry(`${station.label}: loaded cached data`, 'success');
+                    continue;
                 }
                 try {
-                    const data = await loadCSV(station.file);
-                    const readings = data
-                        .filter(r => r.dateTime && r.value !== null && r.value !== '')
-                        .map(r => ({ dateTime: new Date(r.dateTime), value: parseFloat(r.value) }))
-                        .filter(r => !isNaN(r.value))
-                        .sort((a, b) => a.dateTime - b.dateTime);
+                    const since = new Date(Date.now() - INITIAL_HISTORY_DAYS * 86400000);
+                    const { readings, loadedFrom } = await loadStationReadings(station, since);
 
                     const oldCount = stationData[station.id]?.readings?.length || 0;
                     stationData[station.id] = {
                         readings,
-                        latest: readings.length > 0 ? readings[readings.length - 1] : null
+                        latest: readings.length > 0 ? readings[readings.length - 1] : null,
+                        loadedFrom
                     };
                     const diff = readings.length - oldCount;
                     if (diff > 0) { totalNew += diff; stationsUpdated++; }
@@ -1505,7 +1790,9 @@ async function refreshData() {
         // even if the browser serves stale CSVs from its HTTP cache.
         cacheToLocalStorage();
 
-        if (hasBackend) {
+        if (refreshedOnServer) {
+            addLogEntry('Saved on the server', 'success');
+        } else if (hasBackend) {
             addLogEntry('Syncing to backend\u2026', 'info');
             try {
                 const syncResp = await fetch('refresh.php', { method: 'POST' });
@@ -1543,6 +1830,59 @@ async function refreshData() {
     }
 }
 
+// ============================================================
+// Live Updates (serve.py /api/stream)
+// ============================================================
+const STREAM_URL = 'api/stream';
+const STREAM_RECONNECT_DELAY = 5000; // ms before reopening a stream the server turned away
+
+// Add readings pushed by the server to a station and update its marker in
+// place, so an open popup stays open.
+function applyStationUpdate(update) {
+    const data = stationData[update.id];
+    const station = getStation(update.id);
+    if (!data || !station) return;
+    if (data.lazy) {
+        // No history yet: just move the latest reading and trend on
+        const latest = update.latest && { dateTime: new Date(update.latest.dateTime), value: update.latest.value };
+        if (!latest || (data.latest && latest.dateTime <= data.latest.dateTime)) return;
+        data.latest = latest;
+        data.trend = update.trend;
+    } else if (appendReadings(update.id, parseReadings(update.readings)) === 0) {
+        return;
+    }
+    stationMarkers[update.id]?.setIcon(stationIcon(station, update.type));
+    document.getElementById('last-updated').textContent = `Data from ${formatTime(data.latest.dateTime)}`;
+}
+
+// serve.py pushes each station's new readings as soon as a refresh stores
+// them, so an open page stays current without polling or re-downloading
+// CSVs.  EventSource reconnects by itself and resumes after the last event
+// it saw; a `reset` means the events it missed are gone, so everything is
+// reloaded.  Hosts without the stream (static files, refresh.php) fail the
+// first connection and are left alone.
+function subscribeToUpdates() {
+    if (typeof EventSource === 'undefined') return;
+    const source = new EventSource(STREAM_URL);
+    let opened = false;
+    source.addEventListener('open', () => { opened = true; });
+    source.addEventListener('error', () => {
+        if (!opened) source.close();
+        else if (source.readyState === EventSource.CLOSED) setTimeout(subscribeToUpdates, STREAM_RECONNECT_DELAY);
+    });
+    source.addEventListener('readings', e => applyStationUpdate(JSON.parse(e.data)));
+    source.addEventListener('reset', async () => {
+        const loaded = [...STATIONS.level, ...STATIONS.rainfall, ...STATIONS.tidal].filter(s => !stationData[s.id]?.lazy);
+        await Promise.all([loadLatest(), ...loaded.map(loadStation)]);
+        map.eachLayer(layer => {
+            if (layer instanceof L.Marker && layer.options.zIndexOffset === 500) {
+                map.removeLayer(layer);
+            }
+        });
+        createMarkers();
+    });
+}
+
 // ============================================================
 // Helpers
 // ============================================================
@@ -1553,6 +1893,7 @@ function formatTime(date) {
 function getTrend(stationId, type) {
     if (type === 'rainfall') return null;
     const data = stationData[stationId];
+    if (data?.lazy) return data.trend ? { direction: data.trend, symbol: TREND_SYMBOLS[data.trend] } : null;
     if (!data?.readings?.length) return null;
     return FloodwatchCore.getTrend(data.readings, type);
 }
@@ -1695,7 +2036,14 @@ const CACHE_FINGERPRINT = FloodwatchCore.computeCacheFingerprint(STATIONS);
 function cacheToLocalStorage() {
     try {
         const cache = { version: CACHE_VERSION, fingerprint: CACHE_FINGERPRINT, timestamp: new Date().toISOString(), stations: {} };
+        // Lazy stations have no history loaded to cache, so keep what they had
+        let previous = {};
+        try {
+            const old = JSON.parse(localStorage.getItem(CACHE_KEY));
+            if (old?.version === CACHE_VERSION && old.fingerprint === CACHE_FINGERPRINT) previous = old.stations || {};
+        } catch { /* start afresh */ }
         for (const [id, data] of Object.entries(stationData)) {
+            if (data.lazy && previous[id]) cache.stations[id] = previous[id];
             if (!data.readings?.length) continue;
             // Only store readings newer than the CSV data would have
             // to keep localStorage small. Store the last 7 days max.
@@ -1712,7 +2060,9 @@ function cacheToLocalStorage() {
     }
 }
 
-function loadFromLocalStorage() {
+// Merge cached readings into the given stations (default all) with a
+// history loaded; lazy stations get theirs when the history loads.
+function loadFromLocalStorage(ids = null) {
     try {
         const raw = localStorage.getItem(CACHE_KEY);
         if (!raw) return;
@@ -1721,9 +2071,9 @@ function loadFromLocalStorage() {
 
         let merged = 0;
         for (const [id, entries] of Object.entries(cache.stations)) {
-            if (!entries?.length) continue;
+            if (!entries?.length || (ids && !ids.includes(id))) continue;
             const existing = stationData[id];
-            if (!existing) continue;
+            if (!existing || existing.lazy) continue;
 
             const existingTimes = new Set(existing.readings.map(r => r.dateTime.toISOString()));
             let added = 0;
@@ -1775,7 +2125,9 @@ async function init() {
     loadRiverOverlay();
     loadTarkaLine();
     loadDartmoorLine();
-    await loadAllData();
+    // Markers from the latest-readings snapshot, histories as popups open;
+    // without a snapshot, every station's history up front
+    if (!(await loadLatest())) await loadAllData();
     loadFromLocalStorage(); // merge any cached data on top of CSVs
     createMarkers();
 
@@ -1797,13 +2149,11 @@ async function init() {
     // Flood warnings, backend detection, version tag run in parallel — non-blocking
     fetchFloodWarnings();
     detectBackend().then(result => { hasBackend = result; });
-    fetch('version.json')
-        .then(r => r.json())
-        .then(data => {
-            const el = document.getElementById('version-tag');
-            if (el && data.version) el.textContent = '(' + data.version + ')';
-        })
-        .catch(() => {}); // non-critical
+    subscribeToUpdates();
+    appVersion.then(version => {
+        const el = document.getElementById('version-tag');
+        if (el && version) el.textContent = '(' + version + ')';
+    });
 }
 
 init();
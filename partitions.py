@@ -0,0 +1,185 @@
+"""
+Monthly partitioned station storage shared by fetch_data.py and serve.py.
+
+A station stored as one CSV (data/level_50149_sticklepath.csv) is rewritten
+by every refresh and downloaded whole by every page load.  Partitioned, the
+same rows live in data/level_50149_sticklepath/YYYY-MM.csv — one file per
+calendar month (UTC), each with the usual header — plus index.json, which
+lists every month with its first and last timestamp and row count.  A
+refresh rewrites only the months its readings fall in, normally just the
+current one, and readers load only the months covering the range they show.
+
+A station is partitioned once its index.json exists: migrate() converts a
+single-file station, and the writers keep it partitioned from then on.
+"""
+
+import csv
+import io
+import json
+import os
+from collections.abc import Iterable
+from itertools import groupby
+from operator import itemgetter
+from typing import Any
+
+import atomicfile
+import precompress
+import series
+
+type Row = list[str]
+
+HEADER: Row = ["dateTime", "value", "unit", "station_id", "station_label"]
+INDEX_FILE: str = "index.json"
+
+_row_time = itemgetter(0)
+
+
+def directory_for(data_dir: str, filename: str) -> str:
+    """Partition directory for a station's single-file CSV name."""
+    return os.path.join(data_dir, filename.removesuffix(".csv"))
+
+
+def is_partitioned(data_dir: str, filename: str) -> bool:
+    return os.path.exists(os.path.join(directory_for(data_dir, filename), INDEX_FILE))
+
+
+def month_of(timestamp: str) -> str:
+    """Partition key ("YYYY-MM") for an ISO 8601 timestamp."""
+    return timestamp[:7]
+
+
+def load_index(directory: str) -> dict[str, dict[str, Any]]:
+    """Return {month: {"first", "last", "rows"}}, empty if the station isn't partitioned."""
+    try:
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            return json.load(f)["months"]
+    except FileNotFoundError:
+        return {}
+
+
+def _atomic_write(path: str, text: str) -> None:
+    """Write a file atomically, then refresh its compressed siblings."""
+    atomicfile.atomic_write(path, text)
+    precompress.write_siblings(path)
+
+
+def _save_index(directory: str, index: dict[str, dict[str, Any]]) -> None:
+    _atomic_write(os.path.join(directory, INDEX_FILE), json.dumps({"months": dict(sorted(index.items()))}, indent=2) + "\n")
+
+
+def read_month(directory: str, month: str) -> list[Row]:
+    try:
+        with open(os.path.join(directory, f"{month}.csv"), newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # skip header
+            return [row for row in reader if len(row) >= 2]
+    except FileNotFoundError:
+        return []
+
+
+def read_rows(directory: str, start: str = "", end: str = "~") -> list[Row]:
+    """Rows with start <= dateTime <= end, reading only the partitions that overlap the range."""
+    months = [m for m in sorted(load_index(directory)) if month_of(start) <= m <= month_of(end)]
+    return [row for m in months for row in read_month(directory, m) if start <= row[0] <= end]
+
+
+def latest_time(directory: str) -> str | None:
+    """Timestamp of the newest stored row, from the index alone."""
+    index = load_index(directory)
+    return index[max(index)]["last"] if index else None
+
+
+def row_count(directory: str) -> int:
+    return sum(entry["rows"] for entry in load_index(directory).values())
+
+
+def _write_month(directory: str, month: str, rows: list[Row]) -> bool:
+    """Write one partition unless it already holds exactly these rows; True if written."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(HEADER)
+    writer.writerows(rows)
+    path = os.path.join(directory, f"{month}.csv")
+    try:
+        with open(path, newline="") as f:
+            if f.read() == buf.getvalue():
+                return False
+    except FileNotFoundError:
+        pass
+    _atomic_write(path, buf.getvalue())
+    return True
+
+
+def _by_month(rows: Iterable[Row]) -> dict[str, list[Row]]:
+    run, _ = series.sorted_run(rows, key=_row_time)
+    return {month: list(group) for month, group in groupby(run, key=lambda row: month_of(row[0]))}
+
+
+def _entry(rows: list[Row]) -> dict[str, Any]:
+    return {"first": rows[0][0], "last": rows[-1][0], "rows": len(rows)}
+
+
+def save(directory: str, rows: Iterable[Row]) -> int:
+    """Replace a station's stored history with `rows`; returns the number of partitions rewritten.
+
+    Months whose content is unchanged are left alone, so re-saving a full
+    backfill only touches the months that actually differ.  The index is
+    written last, after every partition it describes, and whenever any
+    partition was written, even if its entries are the same: readers
+    (serve.py's series cache) watch the index for changes to the station.
+    """
+    os.makedirs(directory, exist_ok=True)
+    months = _by_month(rows)
+    old_index = load_index(directory)
+    written = sum(_write_month(directory, month, month_rows) for month, month_rows in months.items())
+    for month in old_index.keys() - months.keys():
+        os.remove(os.path.join(directory, f"{month}.csv"))
+        precompress.remove_siblings(os.path.join(directory, f"{month}.csv"))
+    index = {month: _entry(month_rows) for month, month_rows in months.items()}
+    if written or index != old_index or not os.path.exists(os.path.join(directory, INDEX_FILE)):
+        _save_index(directory, index)
+    return written
+
+
+def merge(directory: str, rows: Iterable[Row]) -> int:
+    """Merge new rows into their monthly partitions; returns how many new timestamps were added.
+
+    Only the months the rows fall in are read and rewritten, and a month is
+    written only if a row is new or its value was revised.
+    """
+    os.makedirs(directory, exist_ok=True)
+    index = load_index(directory)
+    added = 0
+    changed = False
+    for month, new_rows in _by_month(rows).items():
+        existing = read_month(directory, month)
+        merged = series.merge_sorted(existing, new_rows, key=_row_time)
+        added += len(merged) - len(existing)
+        if merged != existing:
+            _write_month(directory, month, merged)
+            index[month] = _entry(merged)
+            changed = True
+    if changed or not os.path.exists(os.path.join(directory, INDEX_FILE)):
+        _save_index(directory, index)
+    return added
+
+
+def migrate(data_dir: str, filename: str) -> int | None:
+    """Split a station's single CSV into monthly partitions and remove it.
+
+    Returns the number of partitions, or None if there was no single-file
+    CSV to convert.  Safe to re-run after an interruption: the single file
+    is only removed once the index covering its rows has been written.
+    """
+    path = os.path.join(data_dir, filename)
+    if not os.path.exists(path):
+        return None
+    directory = directory_for(data_dir, filename)
+    if not is_partitioned(data_dir, filename):
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # skip header
+            save(directory, [row for row in reader if len(row) >= 2])
+    os.remove(path)
+    precompress.remove_siblings(path)
+    return len(load_index(directory))
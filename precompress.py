@@ -0,0 +1,83 @@
+"""
+Precompressed siblings for the data files the frontend downloads.
+
+Station CSVs compress about 10x, so every writer leaves a .gz (and, when
+the optional `brotli` package is installed, a .br) next to the file it
+has just written: data/level_50149_sticklepath.csv.gz.  Each sibling is
+stamped with its source's mtime, which is how serve.py tells a current
+sibling from one left behind by a writer that doesn't produce them
+(refresh.php) — a sibling whose mtime differs is ignored.
+"""
+
+import gzip
+import os
+
+import atomicfile
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Server preference order, best first
+SUFFIXES: dict[str, str] = {"br": ".br", "gzip": ".gz"} if brotli else {"gzip": ".gz"}
+COMPRESSIBLE: tuple[str, ...] = (".csv", ".geojson", ".json")
+MIN_SIZE: int = 1024  # smaller files aren't worth a sibling or a Content-Encoding
+BROTLI_QUALITY: int = 9  # 10-11 shave another few percent at several times the cost
+
+
+def is_compressible(path: str) -> bool:
+    return path.endswith(COMPRESSIBLE)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Best encoding we can produce for an Accept-Encoding header, or None for identity.
+
+    Honours q-values (q=0 refuses an encoding) and `*`; ties go to the
+    server's preference order in SUFFIXES.
+    """
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name.strip():
+            accepted[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in SUFFIXES:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def remove_siblings(path: str) -> None:
+    for suffix in (".gz", ".br"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def write_siblings(path: str) -> None:
+    """Write compressed siblings for a file that has just been written; removes them if it's too small."""
+    with open(path, "rb") as f:
+        mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        data = f.read()
+    if len(data) < MIN_SIZE:
+        remove_siblings(path)
+        return
+    for encoding, suffix in SUFFIXES.items():
+        atomicfile.atomic_write(path + suffix, compress(data, encoding), "wb", mtime_ns)
@@ -9,6 +9,140 @@ header('Access-Control-Allow-Origin: https://tawriver.watch');
 
 $dataDir = __DIR__ . '/data';
 $apiBase = 'https://environment.data.gov.uk/flood-monitoring';
+$csvHeader = ['dateTime', 'value', 'unit', 'station_id', 'station_label'];
+
+// Write rows to a CSV atomically (temp file, flush, rename)
+function writeCsvAtomic($csvFile, $header, $rows) {
+    $tmpFile = tempnam(dirname($csvFile), '.tmp_');
+    $handle = fopen($tmpFile, 'w');
+    fputcsv($handle, $header);
+    foreach ($rows as $row) {
+        fputcsv($handle, $row);
+    }
+    fflush($handle);
+    fclose($handle);
+    rename($tmpFile, $csvFile);
+}
+
+function readCsvRows($csvFile) {
+    $rows = [];
+    if (file_exists($csvFile)) {
+        $handle = fopen($csvFile, 'r');
+        fgetcsv($handle); // header
+        while (($row = fgetcsv($handle)) !== false) {
+            if (count($row) >= 2) {
+                $rows[] = $row;
+            }
+        }
+        fclose($handle);
+    }
+    return $rows;
+}
+
+// Stations migrated with `fetch_data.py --partition` keep one CSV per month
+// in data/<station>/YYYY-MM.csv, listed in index.json; returns that list
+// (month => first/last/rows), or null for a single-file station.
+function loadPartitionIndex($partitionDir) {
+    $indexFile = $partitionDir . '/index.json';
+    if (!file_exists($indexFile)) {
+        return null;
+    }
+    $index = json_decode(file_get_contents($indexFile), true);
+    $months = $index['months'] ?? [];
+    ksort($months);
+    return $months;
+}
+
+// The rows of a sorted CSV from $seconds before its last row, read back from
+// the end a block at a time rather than parsing the whole history
+function readCsvTail($csvFile, $seconds) {
+    if (!file_exists($csvFile)) {
+        return [];
+    }
+    $handle = fopen($csvFile, 'r');
+    $pos = fstat($handle)['size'];
+    $buffer = '';
+    $rows = [];
+    $since = null;
+    while ($pos > 0) {
+        $step = min(8192, $pos);
+        $pos -= $step;
+        fseek($handle, $pos);
+        $buffer = fread($handle, $step) . $buffer;
+        $lines = explode("\n", rtrim($buffer, "\r\n"));
+        if ($pos > 0) {
+            array_shift($lines); // may start mid-line
+        }
+        $rows = [];
+        foreach ($lines as $line) {
+            $row = str_getcsv(rtrim($line, "\r"));
+            if (count($row) >= 2 && $row[0] !== 'dateTime') {
+                $rows[] = $row;
+            }
+        }
+        if ($rows) {
+            $since = gmdate('Y-m-d\\TH:i:s\\Z', strtotime(end($rows)[0]) - $seconds);
+            if (strcmp($rows[0][0], $since) < 0) {
+                break;
+            }
+        }
+    }
+    fclose($handle);
+    return array_values(array_filter($rows, function($row) use ($since) {
+        return strcmp($row[0], $since) >= 0;
+    }));
+}
+
+// A station's entry in data/latest.json from its sorted tail rows, by the
+// rules of snapshot.py: the newest numeric reading, the least-squares trend
+// over the hour up to the last row (at least 4 rows and 3 readings in that
+// hour; none for rainfall), and high/normal against 70% of
+// typicalRangeHigh for level stations. Null without a numeric reading.
+function snapshotEntry($station, $rows) {
+    $latest = null;
+    for ($i = count($rows) - 1; $i >= 0; $i--) {
+        if (is_numeric($rows[$i][1])) {
+            $latest = $rows[$i];
+            break;
+        }
+    }
+    if ($latest === null) {
+        return null;
+    }
+    $value = (float)$latest[1];
+
+    $trend = null;
+    if ($station['type'] !== 'rainfall' && count($rows) >= 4) {
+        $end = strtotime(end($rows)[0]);
+        $points = [];
+        foreach ($rows as $row) {
+            $t = strtotime($row[0]);
+            if ($t >= $end - 3600 && is_numeric($row[1])) {
+                $points[] = [($t - $end) / 3600, (float)$row[1]];
+            }
+        }
+        if (count($points) >= 3) {
+            $n = count($points);
+            $sumX = $sumY = $sumXY = $sumXX = 0.0;
+            foreach ($points as [$x, $y]) {
+                $sumX += $x;
+                $sumY += $y;
+                $sumXY += $x * $y;
+                $sumXX += $x * $x;
+            }
+            $denominator = $n * $sumXX - $sumX * $sumX;
+            $rate = $denominator ? ($n * $sumXY - $sumX * $sumY) / $denominator : 0.0;
+            $trend = $rate > 0.01 ? 'rising' : ($rate < -0.01 ? 'falling' : 'steady');
+        }
+    }
+
+    $status = null;
+    if ($station['type'] === 'level' && !empty($station['typicalRangeHigh'])) {
+        $status = $value >= 0.7 * $station['typicalRangeHigh'] ? 'high' : 'normal';
+    }
+
+    return ['type' => $station['type'], 'dateTime' => $latest[0], 'value' => $value, 'trend' => $trend, 'status' => $status];
+}
 
 // Rate limiting: minimum 5 minutes between refreshes
 $rateLimitFile = $dataDir . '/.last_refresh';
@@ -33,20 +167,20 @@ rename($tmpRate, $rateLimitFile);
 // Station definitions matching our CSV structure
 $stations = [
     // Level stations
-    ['id' => '50149', 'label' => 'Sticklepath', 'type' => 'level', 'measureId' => '50149-level-stage-i-15_min-m', 'file' => 'level_50149_sticklepath.csv'],
-    ['id' => '50119', 'label' => 'Taw Bridge', 'type' => 'level', 'measureId' => '50119-level-stage-i-15_min-m', 'file' => 'level_50119_taw_bridge.csv'],
-    ['id' => '50132', 'label' => 'Newnham Bridge', 'type' => 'level', 'measureId' => '50132-level-stage-i-15_min-m', 'file' => 'level_50132_newnham_bridge.csv'],
-    ['id' => '50140', 'label' => 'Umberleigh', 'type' => 'level', 'measureId' => '50140-level-stage-i-15_min-m', 'file' => 'level_50140_umberleigh.csv'],
+    ['id' => '50149', 'label' => 'Sticklepath', 'type' => 'level', 'measureId' => '50149-level-stage-i-15_min-m', 'file' => 'level_50149_sticklepath.csv', 'typicalRangeHigh' => 1.8],
+    ['id' => '50119', 'label' => 'Taw Bridge', 'type' => 'level', 'measureId' => '50119-level-stage-i-15_min-m', 'file' => 'level_50119_taw_bridge.csv', 'typicalRangeHigh' => 1.9],
+    ['id' => '50132', 'label' => 'Newnham Bridge', 'type' => 'level', 'measureId' => '50132-level-stage-i-15_min-m', 'file' => 'level_50132_newnham_bridge.csv', 'typicalRangeHigh' => 2.5],
+    ['id' => '50140', 'label' => 'Umberleigh', 'type' => 'level', 'measureId' => '50140-level-stage-i-15_min-m', 'file' => 'level_50140_umberleigh.csv', 'typicalRangeHigh' => 2.8],
     ['id' => '50198', 'label' => 'Barnstaple (Tidal)', 'type' => 'tidal', 'measureId' => '50198-level-tidal_level-i-15_min-mAOD', 'file' => 'level_50198_barnstaple_(tidal).csv'],
     // River Mole tributary stations
-    ['id' => '50135', 'label' => 'North Molton', 'type' => 'level', 'measureId' => '50135-level-stage-i-15_min-m', 'file' => 'level_50135_north_molton.csv'],
-    ['id' => '50153', 'label' => 'Mole Mills', 'type' => 'level', 'measureId' => '50153-level-stage-i-15_min-m', 'file' => 'level_50153_mole_mills.csv'],
-    ['id' => '50115', 'label' => 'Woodleigh', 'type' => 'level', 'measureId' => '50115-level-stage-i-15_min-m', 'file' => 'level_50115_woodleigh.csv'],
+    ['id' => '50135', 'label' => 'North Molton', 'type' => 'level', 'measureId' => '50135-level-stage-i-15_min-m', 'file' => 'level_50135_north_molton.csv', 'typicalRangeHigh' => 1.1],
+    ['id' => '50153', 'label' => 'Mole Mills', 'type' => 'level', 'measureId' => '50153-level-stage-i-15_min-m', 'file' => 'level_50153_mole_mills.csv', 'typicalRangeHigh' => 1.0],
+    ['id' => '50115', 'label' => 'Woodleigh', 'type' => 'level', 'measureId' => '50115-level-stage-i-15_min-m', 'file' => 'level_50115_woodleigh.csv', 'typicalRangeHigh' => 1.7],
     // Little Dart River tributary station
-    ['id' => '50125', 'label' => 'Chulmleigh', 'type' => 'level', 'measureId' => '50125-level-stage-i-15_min-m', 'file' => 'level_50125_chulmleigh.csv'],
+    ['id' => '50125', 'label' => 'Chulmleigh', 'type' => 'level', 'measureId' => '50125-level-stage-i-15_min-m', 'file' => 'level_50125_chulmleigh.csv', 'typicalRangeHigh' => 1.5],
     // River Yeo tributary stations
-    ['id' => '50151', 'label' => 'Lapford', 'type' => 'level', 'measureId' => '50151-level-stage-i-15_min-m', 'file' => 'level_50151_lapford.csv'],
-    ['id' => '50114', 'label' => 'Collard Bridge', 'type' => 'level', 'measureId' => '50114-level-stage-i-15_min-m', 'file' => 'level_50114_collard_bridge.csv'],
+    ['id' => '50151', 'label' => 'Lapford', 'type' => 'level', 'measureId' => '50151-level-stage-i-15_min-m', 'file' => 'level_50151_lapford.csv', 'typicalRangeHigh' => 2.3],
+    ['id' => '50114', 'label' => 'Collard Bridge', 'type' => 'level', 'measureId' => '50114-level-stage-i-15_min-m', 'file' => 'level_50114_collard_bridge.csv', 'typicalRangeHigh' => 1.1],
     // Rainfall stations - East of Taw
     ['id' => '50199', 'label' => 'Lapford Bowerthy', 'type' => 'rainfall', 'measureId' => '50199-rainfall-tipping_bucket_raingauge-t-15_min-mm', 'file' => 'rainfall_50199.csv'],
     ['id' => 'E85220', 'label' => 'Molland Sindercombe', 'type' => 'rainfall', 'measureId' => 'E85220-rainfall-tipping_bucket_raingauge-t-15_min-mm', 'file' => 'rainfall_E85220.csv'],
@@ -68,11 +202,18 @@ foreach ($stations as $station) {
     try {
         // Read existing CSV to get existing timestamps and find the latest one
         $csvFile = $dataDir . '/' . $station['file'];
+        $partitionDir = $dataDir . '/' . preg_replace('/\.csv$/', '', $station['file']);
+        $partitionIndex = loadPartitionIndex($partitionDir);
         $existingTimes = [];
         $existingLines = [];
         $latestTime = null;
 
-        if (file_exists($csvFile)) {
+        if ($partitionIndex !== null) {
+            // Partitioned: the index gives the latest time without reading any month
+            if ($partitionIndex) {
+                $latestTime = end($partitionIndex)['last'];
+            }
+        } elseif (file_exists($csvFile)) {
             $handle = fopen($csvFile, 'r');
             $header = fgetcsv($handle);
             while (($row = fgetcsv($handle)) !== false) {
@@ -155,6 +296,51 @@ foreach ($stations as $station) {
         $unit = $station['type'] === 'rainfall' ? 'mm' : ($station['type'] === 'tidal' ? 'mAOD' : 'm');
         $newCount = 0;
 
+        if ($partitionIndex !== null) {
+            // Merge into the months the new readings fall in; other months are untouched
+            $byMonth = [];
+            foreach ($items as $item) {
+                $dt = $item['dateTime'] ?? '';
+                $val = $item['value'] ?? '';
+                if ($dt && $val !== '') {
+                    $byMonth[substr($dt, 0, 7)][] = [$dt, $val, $unit, $station['id'], $station['label']];
+                }
+            }
+            foreach ($byMonth as $month => $monthItems) {
+                $monthFile = $partitionDir . '/' . $month . '.csv';
+                $monthLines = readCsvRows($monthFile);
+                $monthTimes = array_fill_keys(array_column($monthLines, 0), true);
+                $added = 0;
+                foreach ($monthItems as $line) {
+                    if (!isset($monthTimes[$line[0]])) {
+                        $monthLines[] = $line;
+                        $monthTimes[$line[0]] = true;
+                        $added++;
+                    }
+                }
+                if ($added > 0) {
+                    usort($monthLines, function($a, $b) {
+                        return strcmp($a[0], $b[0]);
+                    });
+                    writeCsvAtomic($monthFile, $csvHeader, $monthLines);
+                    $partitionIndex[$month] = ['first' => $monthLines[0][0], 'last' => end($monthLines)[0], 'rows' => count($monthLines)];
+                    $newCount += $added;
+                }
+            }
+            if ($newCount > 0) {
+                // Index last, after every partition it describes
+                ksort($partitionIndex);
+                $tmpIndex = tempnam($partitionDir, '.tmp_');
+                file_put_contents($tmpIndex, json_encode(['months' => $partitionIndex], JSON_PRETTY_PRINT | JSON_UNESCAPED_SLASHES) . "\n");
+                rename($tmpIndex, $partitionDir . '/index.json');
+                $updated++;
+            }
+            $stationResult['new_readings'] = $newCount;
+            $stationResult['total_readings'] = array_sum(array_column($partitionIndex, 'rows'));
+            $results[] = $stationResult;
+            continue;
+        }
+
         foreach ($items as $item) {
             $dt = $item['dateTime'] ?? '';
             $val = $item['value'] ?? '';
@@ -172,15 +358,7 @@ foreach ($stations as $station) {
             });
 
             // Write back (atomic: temp file, flush, rename)
-            $tmpFile = tempnam(dirname($csvFile), '.tmp_');
-            $handle = fopen($tmpFile, 'w');
-            fputcsv($handle, ['dateTime', 'value', 'unit', 'station_id', 'station_label']);
-            foreach ($existingLines as $line) {
-                fputcsv($handle, $line);
-            }
-            fflush($handle);
-            fclose($handle);
-            rename($tmpFile, $csvFile);
+            writeCsvAtomic($csvFile, $csvHeader, $existingLines);
             $updated++;
         }
 
@@ -195,6 +373,53 @@ foreach ($stations as $station) {
     $results[] = $stationResult;
 }
 
+// Rebuild the latest-readings snapshot (see snapshot.py) from the tail of
+// each station's data, two hours back from its last reading, so the markers
+// match the CSVs just written
+$snapshotStations = [];
+$partitioned = [];
+foreach ($stations as $station) {
+    $partitionDir = $dataDir . '/' . preg_replace('/\.csv$/', '', $station['file']);
+    $partitionIndex = loadPartitionIndex($partitionDir);
+    if ($partitionIndex === null) {
+        $rows = readCsvTail($dataDir . '/' . $station['file'], 7200);
+    } else {
+        $partitioned[] = $station['id'];
+        $rows = [];
+        if ($partitionIndex) {
+            $since = gmdate('Y-m-d\\TH:i:s\\Z', strtotime(end($partitionIndex)['last']) - 7200);
+            foreach (array_keys($partitionIndex) as $month) {
+                if (strcmp($month, substr($since, 0, 7)) >= 0) {
+                    foreach (readCsvRows($partitionDir . '/' . $month . '.csv') as $row) {
+                        if (strcmp($row[0], $since) >= 0) {
+                            $rows[] = $row;
+                        }
+                    }
+                }
+            }
+        }
+    }
+    $entry = snapshotEntry($station, $rows);
+    if ($entry !== null) {
+        $snapshotStations[$station['id']] = $entry;
+    }
+}
+sort($partitioned, SORT_STRING);
+$snapshotFile = $dataDir . '/latest.json';
+$snapshotBody = json_encode(
+    ['stations' => (object)$snapshotStations, 'partitioned' => $partitioned],
+    JSON_UNESCAPED_SLASHES | JSON_PRESERVE_ZERO_FRACTION
+) . "\n";
+if (!file_exists($snapshotFile) || file_get_contents($snapshotFile) !== $snapshotBody) {
+    $tmpSnapshot = tempnam($dataDir, '.tmp_');
+    file_put_contents($tmpSnapshot, $snapshotBody);
+    rename($tmpSnapshot, $snapshotFile);
+    // Compressed siblings are written by the Python scripts; drop the stale ones
+    foreach (['.gz', '.br'] as $suffix) {
+        @unlink($snapshotFile . $suffix);
+    }
+}
+
 echo json_encode([
     'success' => true,
     'timestamp' => date('c'),
@@ -0,0 +1,171 @@
+"""
+Hourly and daily rollups of station readings, kept in side files.
+
+Answering "what was the daily maximum?" or "how much rain fell each hour?"
+from raw 15-minute readings means a pass over the whole history.  Rollups
+keep those answers precomputed, one CSV per station and period:
+
+    data/rollups/level_50149_sticklepath.hourly.csv
+    data/rollups/level_50149_sticklepath.daily.csv
+
+Level and tidal stations store `period,count,min,max,mean`; rainfall
+stations store `period,count,total`.  Hourly periods are labelled by the
+start of the hour (2026-02-10T10:00:00Z), daily ones by the UTC date.
+
+A station has rollups once they have been built (rebuild(), run by
+`fetch_data.py --rollups` or on first use by serve.py); from then on the
+writers keep them current with update(), which recomputes only the days
+the new readings fall in and rewrites just those rows at the end of each
+file, in place, so a refresh costs the same however long the history is.
+"""
+
+import csv
+import io
+import os
+from collections.abc import Iterable
+from itertools import groupby
+from typing import BinaryIO
+
+import atomicfile
+import precompress
+import series
+
+type Row = list[str]
+
+DIRECTORY: str = "rollups"
+PERIODS: dict[str, int] = {"hourly": 13, "daily": 10}  # period -> timestamp prefix length
+TAIL_BLOCK_SIZE: int = 8192  # bytes read per step when looking back from the end of a rollup file
+LEVEL_HEADER: Row = ["period", "count", "min", "max", "mean"]
+RAINFALL_HEADER: Row = ["period", "count", "total"]
+
+
+def path_for(data_dir: str, filename: str, period: str) -> str:
+    """Rollup file for a station's CSV name: data/rollups/level_50149_sticklepath.hourly.csv."""
+    return os.path.join(data_dir, DIRECTORY, f"{filename.removesuffix('.csv')}.{period}.csv")
+
+
+def exists(data_dir: str, filename: str) -> bool:
+    return all(os.path.exists(path_for(data_dir, filename, period)) for period in PERIODS)
+
+
+def header_for(station_type: str) -> Row:
+    return RAINFALL_HEADER if station_type == "rainfall" else LEVEL_HEADER
+
+
+def day_start(timestamp: str) -> str:
+    """Start of the UTC day a reading falls in — the earliest period a new reading can change."""
+    return timestamp[:10] + "T00:00:00Z"
+
+
+def _label(prefix: str) -> str:
+    return prefix + ":00:00Z" if len(prefix) == PERIODS["hourly"] else prefix
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.6g}"
+
+
+def aggregate(rows: Iterable[Row], station_type: str, period: str) -> list[Row]:
+    """Roll (dateTime, value, ...) rows up into one row per period, skipping non-numeric values."""
+    width = PERIODS[period]
+    run, _ = series.sorted_run(rows, key=lambda row: row[0])
+    out = []
+    for prefix, group in groupby(run, key=lambda row: row[0][:width]):
+        values = []
+        for row in group:
+            try:
+                values.append(float(row[1]))
+            except (IndexError, TypeError, ValueError):
+                continue
+        if not values:
+            continue
+        total = sum(values)
+        if station_type == "rainfall":
+            out.append([_label(prefix), str(len(values)), _fmt(total)])
+        else:
+            out.append([_label(prefix), str(len(values)), _fmt(min(values)), _fmt(max(values)), _fmt(total / len(values))])
+    return out
+
+
+def read(data_dir: str, filename: str, period: str, start: str = "", end: str = "~") -> list[Row]:
+    """Rollup rows for the periods overlapping [start, end]; empty if the station has none."""
+    width = PERIODS[period]
+    first, last = _label(start[:width]), _label(end[:width])
+    try:
+        with open(path_for(data_dir, filename, period), newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # skip header
+            return [row for row in reader if row and first <= row[0] <= last]
+    except FileNotFoundError:
+        return []
+
+
+def _write(path: str, header: Row, rows: list[Row]) -> None:
+    """Write a rollup file atomically, then its compressed siblings."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    writer.writerows(rows)
+    atomicfile.atomic_write(path, buf.getvalue())
+    precompress.write_siblings(path)
+
+
+def _tail_offset(f: BinaryIO, cut: str) -> int:
+    """Byte offset of the first row for period `cut` or later in a rollup file, read back from its end."""
+    pos = f.seek(0, os.SEEK_END)
+    buf = b""
+    while pos > 0:
+        step = min(TAIL_BLOCK_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        # Stop once the first complete line in the buffer is an earlier period
+        newline = buf.find(b"\n")
+        if 0 <= newline < len(buf) - 1 and buf[newline + 1 :].split(b",", 1)[0].decode() < cut:
+            break
+    # The buffer starts with a partial line, or the header at the start of the file
+    offset = pos + buf.find(b"\n") + 1
+    for line in buf[offset - pos :].splitlines(keepends=True):
+        if line.split(b",", 1)[0].decode() >= cut:
+            break
+        offset += len(line)
+    return offset
+
+
+def rebuild(data_dir: str, filename: str, station_type: str, rows: Iterable[Row]) -> int:
+    """Build a station's rollups from its full history; returns the number of days."""
+    rows = list(rows)
+    built = {period: aggregate(rows, station_type, period) for period in PERIODS}
+    for period, rollup in built.items():
+        _write(path_for(data_dir, filename, period), header_for(station_type), rollup)
+    return len(built["daily"])
+
+
+def update(data_dir: str, filename: str, station_type: str, since: str, rows: Iterable[Row]) -> bool:
+    """Recompute a station's rollups from `since` (a day start) onwards.
+
+    `rows` must be every stored reading at or after `since` — the caller
+    passes the tail of the history it has just written.  Each file is cut
+    back, in place, to its last period before `since`, found by reading
+    back from the end, and the recomputed periods are appended, so the
+    cost depends on the new readings, not on the length of the history.
+    The compressed siblings would cost a pass over the whole file, so they
+    are removed rather than rewritten.  Returns False, changing nothing,
+    if the station has no rollups yet.
+    """
+    if not exists(data_dir, filename):
+        return False
+    rows = [row for row in rows if row[0] >= since]
+    for period, width in PERIODS.items():
+        path = path_for(data_dir, filename, period)
+        buf = io.StringIO()
+        csv.writer(buf).writerows(aggregate(rows, station_type, period))
+        with open(path, "r+b") as f:
+            f.truncate(_tail_offset(f, _label(since[:width])))
+            f.seek(0, os.SEEK_END)
+            f.write(buf.getvalue().encode())
+            f.flush()
+            os.fsync(f.fileno())
+        precompress.remove_siblings(path)
+    return True
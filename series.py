@@ -0,0 +1,234 @@
+"""
+Time-series helpers shared by fetch_data.py and serve.py.
+
+Station histories are kept sorted by dateTime, and new readings from the
+EA API arrive as (nearly) sorted runs, so merging them never needs a full
+sort of the combined history.
+
+History is fetched in date-range chunks sized to the station: ChunkSizer
+adapts the chunk length to the readings and latency seen so far,
+grid_start lines chunks up on a fixed calendar grid so the same ranges are
+requested (and cached) run after run, and fetch_bisecting splits a range
+that fails rather than dropping it.
+
+Long ranges are reduced for charting with lttb (Largest-Triangle-Three-
+Buckets), which keeps the peaks that matter on a river level chart.
+"""
+
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+from datetime import date, timedelta
+from operator import lt
+from typing import Any
+
+type KeyFn = Callable[[Any], str]
+
+CHUNK_DAYS: int = 32  # starting chunk length
+MIN_CHUNK_DAYS: int = 1
+MAX_CHUNK_DAYS: int = 256
+TARGET_CHUNK_ROWS: int = 10_000  # ~100 days of 15-minute readings
+TARGET_CHUNK_SECONDS: float = 10.0
+GRID_DAYS: tuple[int, ...] = tuple(2**i for i in range(9))  # chunk lengths on the calendar grid, 1 to 256
+
+
+def _is_clean_run(keys: list[str]) -> bool:
+    """True if keys are non-empty and strictly ascending (sorted, no duplicates)."""
+    return not keys or (bool(keys[0]) and all(map(lt, keys, keys[1:])))
+
+
+def sorted_run(items: Sequence[Any], key: KeyFn) -> tuple[list[Any], list[str]]:
+    """Return (items, keys) as a strictly ascending run with last-writer-wins dedup.
+
+    Already-clean input is returned as-is after one linear check. Anything
+    else — descending API pages, overlapping chunks, stray duplicates — is
+    stable-sorted (near-linear for runs that are mostly in order) and
+    deduplicated so the later of two equal timestamps wins. Items with an
+    empty key are dropped.
+    """
+    items = list(items)
+    keys = list(map(key, items))
+    if _is_clean_run(keys):
+        return items, keys
+
+    order = sorted(range(len(items)), key=keys.__getitem__)
+    run: list[Any] = []
+    run_keys: list[str] = []
+    for i in order:
+        k = keys[i]
+        if not k:
+            continue
+        if run_keys and run_keys[-1] == k:
+            run[-1] = items[i]
+        else:
+            run.append(items[i])
+            run_keys.append(k)
+    return run, run_keys
+
+
+def merge_sorted(existing: Sequence[Any], new: Sequence[Any], key: KeyFn) -> list[Any]:
+    """Merge two runs of readings by timestamp, with `new` winning on equal keys.
+
+    The untouched prefix of `existing` (everything before the first new
+    timestamp) is copied in one slice, so a typical refresh — a handful of
+    readings at the end of a long history — costs a binary search plus a
+    short merge of the overlapping tail.
+    """
+    a, a_keys = sorted_run(existing, key)
+    b, b_keys = sorted_run(new, key)
+    if not b:
+        return a
+    if not a:
+        return b
+
+    start = bisect_left(a_keys, b_keys[0])
+    merged = a[:start]
+    i, j = start, 0
+    while i < len(a) and j < len(b):
+        if a_keys[i] < b_keys[j]:
+            merged.append(a[i])
+            i += 1
+        else:
+            if a_keys[i] == b_keys[j]:
+                i += 1  # replaced by the newer reading
+            merged.append(b[j])
+            j += 1
+    merged.extend(a[i:])
+    merged.extend(b[j:])
+    return merged
+
+
+class ChunkSizer:
+    """Chooses how many days each date-range request should cover.
+
+    After each chunk, the length is rescaled towards `target_rows` readings
+    per request, and shrunk further if the request took longer than
+    `target_seconds`.  Each step changes the length by at most 4x down or
+    2x up, so one odd chunk can't swing it wildly.  Sparse gauges quickly
+    grow to long chunks; dense ones stay well under the API's row limit.
+    Thread-safe, so concurrent chunks of one station can share it.
+    """
+
+    def __init__(
+        self,
+        days: int = CHUNK_DAYS,
+        target_rows: int = TARGET_CHUNK_ROWS,
+        target_seconds: float = TARGET_CHUNK_SECONDS,
+        min_days: int = MIN_CHUNK_DAYS,
+        max_days: int = MAX_CHUNK_DAYS,
+    ) -> None:
+        self.days = days
+        self.target_rows = target_rows
+        self.target_seconds = target_seconds
+        self.min_days = min_days
+        self.max_days = max_days
+        self._lock = threading.Lock()
+
+    def observe(self, days: int, rows: int, seconds: float) -> None:
+        """Record that a `days`-long chunk returned `rows` readings in `seconds`.
+
+        Only chunks that were actually fetched should be observed: a failed
+        chunk says nothing about the station's reading density.  A chunk
+        under both targets never shortens the length, so one cut short by
+        the grid or the end of the range doesn't drag it down.
+        """
+        scale = self.target_rows / rows if rows else 2.0
+        if seconds > self.target_seconds:
+            scale = min(scale, self.target_seconds / seconds)
+        scale = min(max(scale, 0.25), 2.0)
+        new_days = min(max(round(days * scale), self.min_days), self.max_days)
+        with self._lock:
+            self.days = max(self.days, new_days) if scale >= 1 else new_days
+
+
+def grid_start(end: date, days: int, aligned: bool = True) -> date:
+    """Start of the longest calendar-grid cell of at most `days` days that contains `end`.
+
+    Cells of each length in GRID_DAYS tile the calendar from 0001-01-01, so
+    a cell's dates don't depend on the day a fetch runs.  Each length
+    divides the next, so every cell is two cells of the length below and a
+    window that ends on a cell boundary ends on one of every shorter length
+    too: when ChunkSizer shrinks, the next window is still a whole cell of
+    the new length.  With `aligned`, only cells that
+    end on `end` qualify, falling back to a single day; without, the cell
+    may run past `end`, as the newest chunk's does past today.
+    """
+    for length in reversed(GRID_DAYS):
+        offset = (end.toordinal() - 1) % length
+        if length <= days and (not aligned or offset == length - 1):
+            return end - timedelta(days=offset)
+    return end
+
+
+def fetch_bisecting[T](
+    fetch: Callable[[date, date], list[T] | None], start: date, end: date, gaps: list[date] | None = None
+) -> list[T] | None:
+    """Fetch readings for [start, end], splitting the range in half when a request fails.
+
+    `fetch` returns None on failure, and so does fetch_bisecting if the range
+    couldn't be fetched, so callers can tell it from a range with no
+    readings.  Failed ranges are split depth-first, newer half first, down
+    to single days, so a range that is merely too big to serve in time
+    still comes back in pieces.  A single day that still fails can't be
+    resolved: the range is None, unless the caller passes `gaps`, in which
+    case the day is appended to it and the rest of the range is returned —
+    a range with gaps is incomplete and must not be treated as fetched.
+    A day that fails before any request has succeeded means the API itself
+    is failing, not the range size, so the whole range is given up (None)
+    after about log2(days) requests instead of one per day.
+    """
+    succeeded = False
+
+    def get(a: date, b: date) -> list[T] | None:
+        nonlocal succeeded
+        items = fetch(a, b)
+        if items is not None:
+            succeeded = True
+            return items
+        if a >= b:
+            if succeeded and gaps is not None:
+                gaps.append(a)
+                return []
+            return None
+        mid = a + (b - a) // 2
+        newer = get(mid + timedelta(days=1), b)
+        older = get(a, mid) if newer is not None else None
+        return None if older is None else newer + older
+
+    return get(start, end)
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> list[int]:
+    """Indices of `threshold` points picked by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept.  The rest are split into
+    threshold - 2 equal buckets, and from each bucket LTTB keeps the point
+    forming the largest triangle with the point kept from the previous
+    bucket and the average of the next one — so a peak or trough survives
+    where plain striding would step over it.  Series no longer than
+    `threshold` are returned whole.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for bucket in range(threshold - 2):
+        lo = int(bucket * every) + 1
+        hi = int((bucket + 1) * every) + 1
+        next_hi = min(int((bucket + 2) * every) + 1, n)
+        avg_x = sum(xs[hi:next_hi]) / (next_hi - hi)
+        avg_y = sum(ys[hi:next_hi]) / (next_hi - hi)
+        ax, ay = xs[a], ys[a]
+        # Twice the triangle's area; the constant factor doesn't change the argmax
+        dx, dy = ax - avg_x, avg_y - ay
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            area = abs(dx * (ys[i] - ay) - (ax - xs[i]) * dy)
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
@@ -6,33 +6,83 @@ Usage:
     python serve.py              # Start on port 8080 (localhost only)
     python serve.py 3000         # Start on custom port
     python serve.py --bind ::    # Listen on all interfaces
+    python serve.py --format csv # Stream readings from the EA API as CSV
+    python serve.py --no-cache   # Don't keep API responses in .cache/ea/
+    python serve.py --binary     # Also keep binary columnar copies (data/*.bin)
     python serve.py --stop       # Stop running server
 
 Serves the static site and handles refresh.php requests
 by proxying directly to the EA Flood Monitoring API.
 """
 
+import asyncio
 import csv
+import email.utils
+import io
 import json
 import os
+import queue
 import random
+import secrets
 import signal
 import socket
 import sys
-import tempfile
+import threading
 import time as _time
 import urllib.error
+import urllib.parse
 import urllib.request
-from datetime import UTC, datetime, timedelta
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import UTC, date, datetime, timedelta
 from http.server import HTTPServer, SimpleHTTPRequestHandler
-from typing import Any, TypedDict
+from operator import itemgetter
+from typing import Any, NotRequired, TypedDict
+
+import atomicfile
+import colstore
+import ea_client
+import partitions
+import precompress
+import rollups
+import series
+import snapshot
 
 PORT: int = 8080
 PID_FILE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.server.pid')
-_last_refresh: float = 0
-_REFRESH_MIN_INTERVAL: int = 300  # 5 minutes
+_REFRESH_FRESH_FOR: int = 300  # seconds a finished refresh is handed to new callers instead of starting another
+WORKERS: int = 8  # request threads (--threads N); 0 serves one request at a time
+REQUEST_QUEUE_SIZE: int = 32  # connections waiting for a worker; beyond this they get 503
+REQUEST_TIMEOUT: int = 30  # seconds a connection may stall mid-request before it's dropped
+REFRESH_JOBS_KEPT: int = 20  # finished refresh jobs whose status stays available at /refresh/<id>
+REFRESH_WORKERS: int = 6  # stations refreshed at once; 1 refreshes them one after another
+MAX_REQUESTS_PER_HOST: int = 4  # concurrent requests to any one API host, however many stations are refreshing
+POLL_INTERVAL: float = 0  # seconds between background refreshes of a station (--poll-interval 15m); 0 = off
+POLL_JITTER: float = 0.1  # each wait is randomised by up to ±10%, so polls don't fall into lockstep
+POLL_ACTIVE_FACTOR: float = 0.25  # rising stations, or those above snapshot.HIGH_LEVEL_FRACTION, are polled 4x as often
+POLL_QUIET_FACTOR: float = 4  # rainfall gauges dry for QUIET_RAIN_HOURS are polled 4x less often
+QUIET_RAIN_HOURS: int = 6
+STREAM_HEARTBEAT: float = 15  # seconds between keep-alive comments on /api/stream, inside proxies' idle timeouts
+STREAM_RETRY: int = 5000  # ms a disconnected EventSource waits before reconnecting
+STREAM_HISTORY: int = 256  # recent events kept for subscribers resuming with Last-Event-ID
+STREAM_MAX_BUFFER: int = 1 << 20  # bytes queued for a subscriber that isn't reading before it's dropped
 DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 API_BASE: str = 'https://environment.data.gov.uk/flood-monitoring'
+READINGS_FORMAT: str = 'json'  # 'csv' streams readings.csv instead of decoding a JSON document
+BATCH_PAGE_SIZE: int = 10000  # /data/readings?latest items per page
+MAX_BATCH_PAGES: int = 2  # a response filling every page may be missing measures, so the batch is dropped
+BATCH_MIN_STATIONS: int = 10  # fewer are cheaper as their own since= queries than the England-wide ?latest feed
+BINARY_STORE: bool = False  # also keep data/<station>.bin up to date (see colstore.py)
+IMMUTABLE_MAX_AGE: int = 365 * 86400  # for GeoJSON overlays requested with ?v=<version>, which change only with a deploy
+_bodies: dict[tuple[str, str | None], tuple[int, int, bytes]] = {}  # (path, encoding) -> (mtime_ns, size, body); see data_body
+DOWNSAMPLE_CACHE_SIZE: int = 256
+_downsampled: dict[tuple[str, str | None, str | None, int], tuple[tuple[int, int], list[tuple[str, float]]]] = {}
+_downsampled_lock = threading.Lock()
+_rollups_lock = threading.Lock()  # rollup files are read, modified and rewritten
+_host_slots: dict[str, threading.BoundedSemaphore] = {}  # API host -> MAX_REQUESTS_PER_HOST slots
+_host_slots_lock = threading.Lock()
 
 
 class StationDict(TypedDict):
@@ -41,6 +91,7 @@ class StationDict(TypedDict):
     type: str
     measureId: str
     file: str
+    typicalRangeHigh: NotRequired[float]  # level stations; the EA's 95th-percentile level, as in js/floodwatch.js
 
 
 STATIONS: list[StationDict] = [
@@ -51,6 +102,7 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50149-level-stage-i-15_min-m',
         'file': 'level_50149_sticklepath.csv',
+        'typicalRangeHigh': 1.8,
     },
     {
         'id': '50119',
@@ -58,6 +110,7 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50119-level-stage-i-15_min-m',
         'file': 'level_50119_taw_bridge.csv',
+        'typicalRangeHigh': 1.9,
     },
     {
         'id': '50132',
@@ -65,6 +118,7 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50132-level-stage-i-15_min-m',
         'file': 'level_50132_newnham_bridge.csv',
+        'typicalRangeHigh': 2.5,
     },
     {
         'id': '50140',
@@ -72,6 +126,7 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50140-level-stage-i-15_min-m',
         'file': 'level_50140_umberleigh.csv',
+        'typicalRangeHigh': 2.8,
     },
     {
         'id': '50198',
@@ -87,6 +142,7 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50135-level-stage-i-15_min-m',
         'file': 'level_50135_north_molton.csv',
+        'typicalRangeHigh': 1.1,
     },
     {
         'id': '50153',
@@ -94,6 +150,7 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50153-level-stage-i-15_min-m',
         'file': 'level_50153_mole_mills.csv',
+        'typicalRangeHigh': 1.0,
     },
     {
         'id': '50115',
@@ -101,6 +158,7 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50115-level-stage-i-15_min-m',
         'file': 'level_50115_woodleigh.csv',
+        'typicalRangeHigh': 1.7,
     },
     # Little Dart
     {
@@ -109,15 +167,24 @@ STATIONS: list[StationDict] = [
         'type': 'level',
         'measureId': '50125-level-stage-i-15_min-m',
         'file': 'level_50125_chulmleigh.csv',
+        'typicalRangeHigh': 1.5,
     },
     # River Yeo
-    {'id': '50151', 'label': 'Lapford', 'type': 'level', 'measureId': '50151-level-stage-i-15_min-m', 'file': 'level_50151_lapford.csv'},
+    {
+        'id': '50151',
+        'label': 'Lapford',
+        'type': 'level',
+        'measureId': '50151-level-stage-i-15_min-m',
+        'file': 'level_50151_lapford.csv',
+        'typicalRangeHigh': 2.3,
+    },
     {
         'id': '50114',
         'label': 'Collard Bridge',
         'type': 'level',
         'measureId': '50114-level-stage-i-15_min-m',
         'file': 'level_50114_collard_bridge.csv',
+        'typicalRangeHigh': 1.1,
     },
     # Rainfall - East
     {
@@ -181,149 +248,934 @@ STATIONS: list[StationDict] = [
 
 
 def _atomic_write_csv(filepath: str, write_fn) -> None:
-    """Write a CSV atomically: temp file, fsync, rename over target."""
-    dir_path = os.path.dirname(filepath) or "."
-    fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix=".tmp")
-    try:
-        with os.fdopen(fd, "w", newline="") as f:
-            write_fn(f)
-            f.flush()
-            os.fsync(f.fileno())
-        os.replace(tmp_path, filepath)
-    except BaseException:
-        try:
-            os.unlink(tmp_path)
-        except OSError:
-            pass
-        raise
+    """Write a CSV atomically (see atomicfile.py), then refresh its .gz/.br siblings."""
+    atomicfile.atomic_write_with(filepath, write_fn)
+    precompress.write_siblings(filepath)
 
 
-def api_get(url: str, timeout: int = 60, retries: int = 3) -> dict[str, Any] | None:
-    """Fetch JSON from the EA API with retries and exponential backoff."""
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    """The semaphore capping concurrent requests to a URL's host at MAX_REQUESTS_PER_HOST."""
+    host = urllib.parse.urlsplit(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+        return slot
+
+
+def _cacheable(url: str) -> bool:
+    """False for `since` and `latest` queries, which ask what's new right now and are asked again every round."""
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query, keep_blank_values=True)
+    return 'since' not in query and 'latest' not in query
+
+
+def _api_request[T](url: str, accept: str, read: Callable[[Any], T], timeout: int, retries: int) -> T | None:
+    """Fetch a URL with retries and exponential backoff, passing the open response to `read`.
+
+    Each attempt holds one of its host's slots (see _host_slot) until the
+    response has been read; backoff sleeps don't, so a struggling request
+    doesn't hold up the others.  `since` and `latest` queries skip the
+    response cache: a cached answer up to ea_client.OPEN_RANGE_TTL old would hide
+    readings from the refresh, or the poller round, that asked for them.
+    """
+    use_cache = _cacheable(url)
     for attempt in range(retries):
-        req = urllib.request.Request(url, headers={'Accept': 'application/json'})
         try:
-            with urllib.request.urlopen(req, timeout=timeout) as resp:
-                return json.loads(resp.read().decode())
-        except (urllib.error.URLError, TimeoutError, json.JSONDecodeError) as e:
+            with _host_slot(url), ea_client.request(url, headers={'Accept': accept}, timeout=timeout, use_cache=use_cache) as resp:
+                return read(resp)
+        except (urllib.error.URLError, TimeoutError, ValueError, csv.Error) as e:
             print(f'  API error (attempt {attempt + 1}/{retries}): {e}')
             if attempt < retries - 1:
                 _time.sleep(2**attempt + random.uniform(0, 1))
     return None
 
 
-def refresh_station(station: StationDict) -> dict[str, Any]:
-    """Fetch new readings for a station since the last known timestamp."""
-    csv_path = os.path.join(DATA_DIR, station['file'])
-    existing_times = set()
-    existing_rows = []
-    latest_time = None
+def api_get(url: str, timeout: int = 60, retries: int = 3) -> dict[str, Any] | None:
+    """Fetch JSON from the EA API with retries and exponential backoff."""
+    return _api_request(url, 'application/json', lambda resp: json.loads(resp.read().decode()), timeout, retries)
+
+
+def api_get_csv_readings(url: str, timeout: int = 60, retries: int = 3) -> list[dict[str, Any]] | None:
+    """Fetch a readings.csv URL with retries, parsing rows as they stream in."""
+    return _api_request(url, 'text/csv', lambda resp: list(ea_client.iter_csv_readings(resp)), timeout, retries)
+
+
+def _fetch_readings(measure_id: str, query: str) -> list[dict[str, Any]] | None:
+    """Fetch readings for a measure in READINGS_FORMAT; None on failure."""
+    if READINGS_FORMAT == 'csv':
+        return api_get_csv_readings(f'{API_BASE}/id/measures/{measure_id}/readings.csv?{query}')
+    data = api_get(f'{API_BASE}/id/measures/{measure_id}/readings?{query}')
+    return data.get('items', []) if data else None
+
+
+def fetch_readings(measure_id: str, query: str) -> list[dict[str, Any]]:
+    """Fetch readings for a measure in READINGS_FORMAT; empty on failure."""
+    return _fetch_readings(measure_id, query) or []
+
+
+def fetch_readings_range(measure_id: str, start: date, end: date) -> list[dict[str, Any]] | None:
+    """Fetch readings for a date range, splitting it in half if a request fails; None if it can't be fetched."""
+
+    def fetch(a: date, b: date) -> list[dict[str, Any]] | None:
+        return _fetch_readings(measure_id, f'startdate={a}&enddate={b}&_sorted&_limit=100000')
+
+    return series.fetch_bisecting(fetch, start, end)
+
+
+class StationSeries:
+    """A station's stored rows, parsed once, sorted by dateTime, with a parallel list of timestamps.
+
+    `stamp` is the (inode, mtime_ns, size) of the station's CSV or partition
+    index.json when the rows were read.  For a CSV, `tail` is its last line
+    as bytes, which lets rows appended in place be read on their own; for a
+    partitioned station, `months` maps each month to its file's (mtime_ns,
+    size), so only months that changed are re-read.
+    """
+
+    __slots__ = ('months', 'rows', 'stamp', 'tail', 'times')
+
+    def __init__(self, rows: list[list[str]], times: list[str], stamp: tuple[int, int, int] | None = None) -> None:
+        self.rows = rows
+        self.times = times
+        self.stamp = stamp
+        self.tail = b''
+        self.months: dict[str, tuple[int, int]] = {}
+
+
+_series_cache: dict[str, StationSeries] = {}  # station id -> its stored series (see station_series)
+
+
+def _stamp(st: os.stat_result) -> tuple[int, int, int]:
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
 
-    # Read existing CSV
-    if os.path.exists(csv_path):
-        with open(csv_path, newline='') as f:
+def _stored_rows(station: StationDict) -> list[list[str]]:
+    """Every stored row for a station, from its partitions or its CSV."""
+    if partitions.is_partitioned(DATA_DIR, station['file']):
+        return partitions.read_rows(partitions.directory_for(DATA_DIR, station['file']))
+    try:
+        with open(os.path.join(DATA_DIR, station['file']), newline='') as f:
             reader = csv.reader(f)
             next(reader, None)  # skip header
-            for row in reader:
-                if len(row) >= 2:
-                    existing_times.add(row[0])
-                    existing_rows.append(row)
-                    if latest_time is None or row[0] > latest_time:
-                        latest_time = row[0]
+            return [row for row in reader if len(row) >= 2]
+    except FileNotFoundError:
+        return []
+
+
+def _csv_tail(path: str) -> bytes:
+    """The last line of a file, terminator included."""
+    with open(path, 'rb') as f:
+        f.seek(max(0, f.seek(0, os.SEEK_END) - 4096))
+        lines = f.read().splitlines(keepends=True)
+    return lines[-1] if lines else b''
+
+
+def _month_stamps(directory: str) -> dict[str, tuple[int, int]]:
+    stamps = {}
+    for month in partitions.load_index(directory):
+        try:
+            st = os.stat(os.path.join(directory, f'{month}.csv'))
+        except FileNotFoundError:
+            continue
+        stamps[month] = (st.st_mtime_ns, st.st_size)
+    return stamps
+
+
+def _remember_series(station: StationDict, rows: list[list[str]]) -> StationSeries:
+    """Cache rows the caller has just written (or read) as the station's series, stamped with the files as they are now."""
+    partition_dir = partitions.directory_for(DATA_DIR, station['file'])
+    rows, times = series.sorted_run(rows, key=itemgetter(0))
+    cached = StationSeries(rows, times)
+    try:
+        if partitions.is_partitioned(DATA_DIR, station['file']):
+            cached.stamp = _stamp(os.stat(os.path.join(partition_dir, partitions.INDEX_FILE)))
+            cached.months = _month_stamps(partition_dir)
+        else:
+            csv_path = os.path.join(DATA_DIR, station['file'])
+            cached.stamp = _stamp(os.stat(csv_path))
+            cached.tail = _csv_tail(csv_path)
+    except FileNotFoundError:
+        cached.stamp = None
+    _series_cache[station['id']] = cached
+    return cached
+
+
+def _read_appended(path: str, cached: StationSeries) -> list[list[str]] | None:
+    """Rows appended to a CSV in place since it was cached, or None if it was changed any other way."""
+    offset = cached.stamp[2]
+    with open(path, 'rb') as f:
+        f.seek(offset - len(cached.tail))
+        if f.read(len(cached.tail)) != cached.tail:
+            return None
+        appended = f.read()
+    if not appended.endswith(b'\n'):
+        return None  # a write still in progress; read it whole next time
+    rows = [row for row in csv.reader(io.StringIO(appended.decode())) if len(row) >= 2]
+    if not rows:
+        return rows
+    if cached.times and rows[0][0] <= cached.times[-1]:
+        return None  # out of order: not a plain append
+    if series.sorted_run(rows, key=itemgetter(0))[0] != rows:
+        return None
+    return rows
+
+
+def _extend_appended(station: StationDict, cached: StationSeries, path: str, stamp: tuple[int, int, int]) -> StationSeries | None:
+    """The cached series plus rows appended to its CSV in place (same inode, larger), or None to reload."""
+    ino, _, size = cached.stamp
+    if stamp[0] != ino or stamp[2] <= size or (appended := _read_appended(path, cached)) is None:
+        return None
+    grown = StationSeries(cached.rows + appended, cached.times + [row[0] for row in appended], stamp)
+    grown.tail = _csv_tail(path) if appended else cached.tail
+    _series_cache[station['id']] = grown
+    return grown
+
+
+def _refresh_months(station: StationDict, cached: StationSeries, stamp: tuple[int, int, int]) -> StationSeries | None:
+    """The cached series with the months whose partition files changed re-read, or None to reload."""
+    partition_dir = partitions.directory_for(DATA_DIR, station['file'])
+    months = _month_stamps(partition_dir)
+    if not cached.months.keys() <= months.keys():
+        return None  # a month was removed
+    changed = sorted(m for m, s in months.items() if cached.months.get(m) != s)
+    if not changed:
+        # Only the index was rewritten: the same rows under a new stamp, swapped in whole like any other entry
+        fresh = StationSeries(cached.rows, cached.times, stamp)
+        fresh.months = cached.months
+        _series_cache[station['id']] = fresh
+        return fresh
+    keep = bisect_left(cached.times, changed[0])
+    return _remember_series(station, cached.rows[:keep] + partitions.read_rows(partition_dir, start=changed[0]))
+
+
+def station_series(station: StationDict) -> StationSeries:
+    """A station's stored series from the process-wide cache, brought up to date with the files first.
+
+    An unchanged CSV or partition index costs one stat.  Rows appended to
+    a CSV in place (fetch_data.py --recent) are read on their own, and a
+    partitioned station re-reads only the months whose files changed.
+    Anything else — an atomic rewrite, a truncation — reloads the station.
+    refresh_station() replaces the entry with the rows it writes, so a
+    refresh never re-reads what it has just written.
+    """
+    partitioned = partitions.is_partitioned(DATA_DIR, station['file'])
+    if partitioned:
+        path = os.path.join(partitions.directory_for(DATA_DIR, station['file']), partitions.INDEX_FILE)
+    else:
+        path = os.path.join(DATA_DIR, station['file'])
+    try:
+        stamp = _stamp(os.stat(path))
+    except FileNotFoundError:
+        _series_cache.pop(station['id'], None)
+        return StationSeries([], [])
+    cached = _series_cache.get(station['id'])
+    if cached is not None and cached.stamp == stamp:
+        return cached
+
+    updated = None
+    if cached is not None and cached.stamp is not None:
+        if partitioned and cached.months:
+            updated = _refresh_months(station, cached, stamp)
+        elif not partitioned and not cached.months:
+            updated = _extend_appended(station, cached, path, stamp)
+    return updated or _remember_series(station, _stored_rows(station))
+
+
+def load_series_cache() -> int:
+    """Load every station's series into the cache (at startup); returns the number of readings."""
+    return sum(len(station_series(station).rows) for station in STATIONS)
+
+
+def _latest_time(station: StationDict) -> str | None:
+    """Timestamp of a station's newest stored row, from the series cache."""
+    times = station_series(station).times
+    return times[-1] if times else None
+
+
+def fetch_batch_readings(stations: list[StationDict]) -> dict[str, list[dict[str, Any]]]:
+    """Cover the stations with nothing new, or one new reading, from the latest reading of every measure.
+
+    One `/data/readings?latest` query (paged if needed) gives each
+    measure's newest reading, which is compared with each station's last
+    stored reading (see ea_client.latest_batch).  It is only made for
+    stations stored up to within a reading or so of now
+    (ea_client.in_latest_reach), as stations polled every period are.  Returns
+    {measureId: readings} for the stations it accounts for; the rest (no
+    data, several new readings) are left to the per-measure path.  Empty
+    if the query is skipped, fails, or fills MAX_BATCH_PAGES pages and so
+    may be cut short.
+    """
+    last_times = {}
+    for station in stations:
+        latest_time = _latest_time(station)
+        if latest_time and ea_client.in_latest_reach(station['measureId'], latest_time):
+            last_times[station['measureId']] = latest_time
+    if not last_times:
+        return {}
+
+    items = []
+    for page in range(MAX_BATCH_PAGES):
+        data = api_get(f'{API_BASE}/data/readings?latest&_limit={BATCH_PAGE_SIZE}&_offset={page * BATCH_PAGE_SIZE}')
+        if data is None:
+            return {}
+        page_items = data.get('items', [])
+        items.extend(page_items)
+        if len(page_items) < BATCH_PAGE_SIZE:
+            return ea_client.latest_batch(items, last_times)
+    print(f'  Batch: more than {MAX_BATCH_PAGES * BATCH_PAGE_SIZE} latest readings, refreshing every station on its own')
+    return {}
+
+
+def refresh_station(station: StationDict, batch_items: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+    """Fetch new readings for a station since the last known timestamp.
+
+    `batch_items` are readings already fetched by fetch_batch_readings,
+    covering everything since this station's last stored reading.  A
+    partitioned station only rewrites the months that change, and the
+    series cache is updated with the merged rows rather than re-read.
+    """
+    csv_path = os.path.join(DATA_DIR, station['file'])
+    partition_dir = partitions.directory_for(DATA_DIR, station['file']) if partitions.is_partitioned(DATA_DIR, station['file']) else None
+
+    # Stored rows come from the series cache, which only reads what changed on disk since it last looked
+    existing_rows = station_series(station).rows
+    latest_time = existing_rows[-1][0] if existing_rows else None
 
     now = datetime.now(UTC)
     items = []
 
-    if latest_time:
+    if latest_time and batch_items is not None:
+        items = batch_items
+    elif latest_time:
         last_dt = datetime.fromisoformat(latest_time.replace('Z', '+00:00'))
         gap_days = (now - last_dt).days
 
         if gap_days <= 5:
-            url = f"{API_BASE}/id/measures/{station['measureId']}/readings?since={urllib.request.quote(latest_time)}&_sorted&_limit=10000"
-            data = api_get(url)
-            if data:
-                items = data.get('items', [])
+            items = fetch_readings(station['measureId'], f'since={urllib.request.quote(latest_time)}&_sorted&_limit=10000')
         else:
-            # Fetch in 28-day chunks
+            # Fetch in chunks sized to the station's reading density and response times
+            sizer = series.ChunkSizer()
             chunk_end = now
             start_limit = last_dt
             while chunk_end > start_limit:
-                chunk_start = chunk_end - timedelta(days=28)
+                chunk_start = chunk_end - timedelta(days=sizer.days)
                 if chunk_start < start_limit:
                     chunk_start = start_limit
-                url = (
-                    f"{API_BASE}/id/measures/{station['measureId']}/readings"
-                    f"?startdate={chunk_start.strftime('%Y-%m-%d')}"
-                    f"&enddate={chunk_end.strftime('%Y-%m-%d')}"
-                    f"&_sorted&_limit=100000"
-                )
-                data = api_get(url)
-                if data:
-                    items.extend(data.get('items', []))
+                started = _time.monotonic()
+                chunk = fetch_readings_range(station['measureId'], chunk_start.date(), chunk_end.date())
+                if chunk is not None:
+                    sizer.observe((chunk_end - chunk_start).days, len(chunk), _time.monotonic() - started)
+                    items.extend(chunk)
                 chunk_end = chunk_start - timedelta(days=1)
     else:
         # No existing data
         start_date = now - timedelta(days=28)
-        url = (
-            f"{API_BASE}/id/measures/{station['measureId']}/readings"
-            f"?startdate={start_date.strftime('%Y-%m-%d')}"
-            f"&enddate={now.strftime('%Y-%m-%d')}"
-            f"&_sorted&_limit=100000"
-        )
-        data = api_get(url)
-        if data:
-            items = data.get('items', [])
+        query = f"startdate={start_date.strftime('%Y-%m-%d')}&enddate={now.strftime('%Y-%m-%d')}&_sorted&_limit=100000"
+        items = fetch_readings(station['measureId'], query)
 
     # Merge new readings
     unit = 'mm' if station['type'] == 'rainfall' else ('mAOD' if station['type'] == 'tidal' else 'm')
-    new_count = 0
-    for item in items:
-        dt = item.get('dateTime', '')
-        val = item.get('value', '')
-        if dt and val != '' and dt not in existing_times:
-            existing_rows.append([dt, str(val), unit, station['id'], station['label']])
-            existing_times.add(dt)
-            new_count += 1
-
-    if new_count > 0:
-        existing_rows.sort(key=lambda r: r[0])
+    new_rows = [
+        [item['dateTime'], str(item['value']), unit, station['id'], station['label']]
+        for item in items
+        if item.get('dateTime') and item.get('value', '') != ''
+    ]
+    merged = series.merge_sorted(existing_rows, new_rows, key=itemgetter(0))
+    # The binary file only needs touching when the readings changed (or it has yet to be built)
+    update_binary = BINARY_STORE and (merged != existing_rows or not os.path.exists(colstore.path_for(DATA_DIR, station['file'])))
+
+    if partition_dir:
+        new_count = partitions.merge(partition_dir, new_rows)
+        stored = _remember_series(station, merged).rows
+        _forget_downsampled(station['id'])
+        update_rollups(station, new_rows, lambda since: stored[bisect_left(stored, since, key=itemgetter(0)) :])
+        if update_binary:
+            update_series_file(station, new_rows)
+        return {'id': station['id'], 'label': station['label'], 'new_readings': new_count, 'total': len(stored)}
+
+    new_count = max(0, len(merged) - len(existing_rows))
+
+    # Revised values replace stored ones, so write on any change, not just new rows
+    if merged != existing_rows:
 
         def write_fn(f):
             writer = csv.writer(f)
             writer.writerow(['dateTime', 'value', 'unit', 'station_id', 'station_label'])
-            writer.writerows(existing_rows)
+            writer.writerows(merged)
 
         _atomic_write_csv(csv_path, write_fn)
+        _remember_series(station, merged)
+        _forget_downsampled(station['id'])
+        update_rollups(station, new_rows, lambda since: merged[bisect_left(merged, since, key=itemgetter(0)) :])
+    if update_binary:
+        update_series_file(station, new_rows)
+
+    return {'id': station['id'], 'label': station['label'], 'new_readings': new_count, 'total': len(merged)}
+
+
+def update_series_file(station: StationDict, new_rows: list[list[str]]) -> None:
+    """Merge refreshed rows into the station's binary columnar file, building it from the CSV if missing."""
+    path = colstore.path_for(DATA_DIR, station['file'])
+    if os.path.exists(path):
+        colstore.merge(path, (row[:2] for row in new_rows))
+    elif partitions.is_partitioned(DATA_DIR, station['file']) or os.path.exists(os.path.join(DATA_DIR, station['file'])):
+        colstore.write(path, (row[:2] for row in station_series(station).rows))
+
+
+def _storage_stamp(station: StationDict) -> tuple[int, int, float] | None:
+    """(mtime_ns, size, mtime) of the file every write to a station replaces: its partition index or its CSV."""
+    if partitions.is_partitioned(DATA_DIR, station['file']):
+        path = os.path.join(partitions.directory_for(DATA_DIR, station['file']), partitions.INDEX_FILE)
+    else:
+        path = os.path.join(DATA_DIR, station['file'])
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_mtime
+
+
+def readings_in_range(station: StationDict, start: str | None = None, end: str | None = None) -> list[tuple[str, float]]:
+    """A station's (dateTime, value) readings with start <= dateTime <= end.
+
+    The bounds are found by binary search: in the memory-mapped binary file
+    when BINARY_STORE keeps one at least as new as the CSV, otherwise in
+    the station's cached series (see station_series).  Either way the cost
+    depends on the rows returned, not on the length of the history.
+    """
+    stamp = _storage_stamp(station)
+    if stamp is None:
+        return []
+    bin_path = colstore.path_for(DATA_DIR, station['file'])
+    if BINARY_STORE and os.path.exists(bin_path) and os.path.getmtime(bin_path) >= stamp[2]:
+        with colstore.open_series(bin_path) as stored:
+            return [(r['dateTime'], r['value']) for r in stored.readings(start, end)]
+
+    cached = station_series(station)
+    i = bisect_left(cached.times, start) if start else 0
+    j = bisect_right(cached.times, end) if end else len(cached.times)
+    readings = []
+    for row in cached.rows[i:j]:
+        try:
+            readings.append((row[0], float(row[1])))
+        except ValueError:
+            continue
+    return readings
+
 
-    return {'id': station['id'], 'label': station['label'], 'new_readings': new_count, 'total': len(existing_rows)}
+def readings_since(station: StationDict, since: str) -> list[tuple[str, float]]:
+    """A station's readings newer than `since` — what a client holding everything up to it is missing."""
+    return [reading for reading in readings_in_range(station, since) if reading[0] > since]
+
+
+def downsampled_range(station: StationDict, start: str | None, end: str | None, points: int) -> list[tuple[str, float]]:
+    """readings_in_range reduced to at most `points` readings by LTTB, which keeps peaks.
+
+    Results are cached per (station, range, points) until refresh_station
+    writes the station, or its CSV changes underneath us.
+    """
+    stamp = _storage_stamp(station)
+    if stamp is None:
+        return []
+    key = (station['id'], start, end, points)
+    cached = _downsampled.get(key)
+    if cached and cached[0] == stamp[:2]:
+        return cached[1]
+    readings = readings_in_range(station, start, end)
+    if len(readings) > points:
+        keep = series.lttb([colstore.to_epoch(t) for t, _ in readings], [v for _, v in readings], points)
+        readings = [readings[i] for i in keep]
+    with _downsampled_lock:
+        if len(_downsampled) >= DOWNSAMPLE_CACHE_SIZE:
+            del _downsampled[next(iter(_downsampled))]  # oldest first
+        _downsampled[key] = (stamp[:2], readings)
+    return readings
+
+
+def _forget_downsampled(station_id: str) -> None:
+    with _downsampled_lock:
+        for key in [k for k in _downsampled if k[0] == station_id]:
+            del _downsampled[key]
+
+
+def update_rollups(station: StationDict, new_rows: list[list[str]], stored_tail: Callable[[str], list[list[str]]]) -> None:
+    """Recompute the days new rows fall in, if the station has rollups; `stored_tail(since)` gives the stored rows from `since`."""
+    if new_rows and rollups.exists(DATA_DIR, station['file']):
+        since = rollups.day_start(min(row[0] for row in new_rows))
+        with _rollups_lock:
+            rollups.update(DATA_DIR, station['file'], station['type'], since, stored_tail(since))
+
+
+def station_rollups(station: StationDict, period: str, start: str | None, end: str | None) -> list[list[Any]]:
+    """A station's hourly or daily rollup rows overlapping [start, end], numbers parsed.
+
+    Rollups are built on first use, and rebuilt if the station's data was
+    rewritten by something that doesn't maintain them (fetch_data.py runs
+    before they existed, refresh.php).
+    """
+    stamp = _storage_stamp(station)
+    if stamp is None:
+        return []
+    path = rollups.path_for(DATA_DIR, station['file'], period)
+    if not rollups.exists(DATA_DIR, station['file']) or os.path.getmtime(path) < stamp[2]:
+        with _rollups_lock:
+            if not rollups.exists(DATA_DIR, station['file']) or os.path.getmtime(path) < stamp[2]:
+                rollups.rebuild(DATA_DIR, station['file'], station['type'], station_series(station).rows)
+    # Updates rewrite the end of the file in place, so read under the same lock
+    with _rollups_lock:
+        rows = rollups.read(DATA_DIR, station['file'], period, start or '', end or '~')
+    return [[row[0], int(row[1]), *map(float, row[2:])] for row in rows]
+
+
+def _query_time(value: str) -> str:
+    """Normalise an ISO 8601 query parameter to the stored form (UTC, ...Z); naive times are UTC."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return dt.astimezone(UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def refresh_all(on_result: Callable[[dict[str, Any]], None] | None = None, stations: list[StationDict] | None = None) -> dict[str, Any]:
+    """Refresh every station (or just `stations`); `on_result` is called with each station's result as it completes.
+
+    Stations are refreshed REFRESH_WORKERS at a time, so a refresh takes
+    about as long as its slowest stations rather than the sum of them all;
+    `details` stays in station order whatever order they finish in.
+    The ?latest batch is only fetched for BATCH_MIN_STATIONS or more; a
+    poll of the one or two stations that fall due together makes their
+    own small requests.
+    """
+    stations = STATIONS if stations is None else stations
+    batch = fetch_batch_readings(stations) if len(stations) >= BATCH_MIN_STATIONS else {}
+    if batch:
+        print(f'  Batch: {sum(map(len, batch.values()))} readings for {len(batch)} stations from /data/readings?latest')
+
+    def refresh(station: StationDict) -> dict[str, Any]:
+        since = _latest_time(station)
+        try:
+            result = refresh_station(station, batch.get(station['measureId']))
+        except Exception as e:
+            print(f'  {station["label"]}: error: {e}')
+            return {'id': station['id'], 'label': station['label'], 'error': str(e)}
+        if result['new_readings'] > 0:
+            print(f'  {station["label"]}: +{result["new_readings"]} readings ({result["total"]} total)')
+            publish_update(station, since)
+        else:
+            print(f'  {station["label"]}: no new data')
+        return result
+
+    results: list[dict[str, Any] | None] = [None] * len(stations)
+    with ThreadPoolExecutor(max(1, min(REFRESH_WORKERS, len(stations))), thread_name_prefix='refresh') as pool:
+        futures = {pool.submit(refresh, station): i for i, station in enumerate(stations)}
+        for future in as_completed(futures):
+            result = results[futures[future]] = future.result()
+            if on_result:
+                on_result(result)
+
+    details = [result for result in results if result is not None]
+    updated = sum(1 for result in details if result.get('new_readings', 0) > 0)
+    if updated:
+        save_latest()
+    return {'success': True, 'timestamp': datetime.now(UTC).isoformat(), 'stations_updated': updated, 'details': details}
 
 
 def handle_refresh() -> str:
     """Run refresh for all stations, return JSON result."""
-    results = []
-    updated = 0
-    for station in STATIONS:
-        print(f'  Refreshing {station["label"]}...')
+    return json.dumps(refresh_all(), indent=2)
+
+
+class RefreshJob:
+    """A refresh running in the background, with each station's result as it completes."""
+
+    def __init__(self, stations: list[StationDict] | None = None) -> None:
+        self.id = secrets.token_hex(8)
+        self.stations = STATIONS if stations is None else stations
+        self.status = 'queued'  # -> running -> done | failed
+        self.started = datetime.now(UTC).isoformat()
+        self.finished: str | None = None
+        self.finished_at: float | None = None  # time.monotonic()
+        self.error: str | None = None
+        self._results: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.done = threading.Event()
+
+    def record(self, result: dict[str, Any]) -> None:
+        with self._lock:
+            self._results[result['id']] = result
+
+    def run(self) -> None:
+        self.status = 'running'
         try:
-            result = refresh_station(station)
-            results.append(result)
-            if result['new_readings'] > 0:
-                updated += 1
-                print(f'    +{result["new_readings"]} readings ({result["total"]} total)')
-            else:
-                print('    No new data')
+            refresh_all(self.record, self.stations)
+            self.status = 'done'
         except Exception as e:
-            print(f'    Error: {e}')
-            results.append({'id': station['id'], 'label': station['label'], 'error': str(e)})
+            print(f'  Refresh job {self.id} failed: {e}')
+            self.error = str(e)
+            self.status = 'failed'
+        self.finished = datetime.now(UTC).isoformat()
+        self.finished_at = _time.monotonic()
+        self.done.set()
+
+    def to_dict(self) -> dict[str, Any]:
+        """Progress so far, `details` in station order whatever order the stations finish in."""
+        with self._lock:
+            details = [self._results[s['id']] for s in self.stations if s['id'] in self._results]
+        status = {
+            'id': self.id,
+            'status': self.status,
+            'url': f'/refresh/{self.id}',
+            'started': self.started,
+            'finished': self.finished,
+            'total': len(self.stations),
+            'completed': len(details),
+            'stations_updated': sum(1 for d in details if d.get('new_readings', 0) > 0),
+            'details': details,
+        }
+        if self.error:
+            status['error'] = self.error
+        return status
 
-    return json.dumps(
-        {'success': True, 'timestamp': datetime.now(UTC).isoformat(), 'stations_updated': updated, 'details': results}, indent=2
-    )
+
+_jobs: dict[str, RefreshJob] = {}  # job id -> job, oldest first
+_jobs_lock = threading.Lock()
+_job_queue: queue.Queue[RefreshJob] = queue.Queue()
+_job_worker: threading.Thread | None = None
+_latest_refresh: RefreshJob | None = None  # the most recent refresh of every station, running or finished
+_refresh_lock = threading.Lock()  # makes request_refresh single-flight
+
+
+def _run_jobs() -> None:
+    while True:
+        _job_queue.get().run()
+
+
+def submit_refresh(stations: list[StationDict] | None = None) -> RefreshJob:
+    """Queue a refresh of every station (or just `stations`) for the background worker, which runs one job at a time."""
+    global _job_worker
+    job = RefreshJob(stations)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        finished = [j for j in _jobs.values() if j.finished]
+        for old in finished[: max(0, len(finished) - REFRESH_JOBS_KEPT)]:
+            del _jobs[old.id]
+        if _job_worker is None or not _job_worker.is_alive():
+            _job_worker = threading.Thread(target=_run_jobs, name='refresh-worker', daemon=True)
+            _job_worker.start()
+    _job_queue.put(job)
+    return job
+
+
+def request_refresh() -> tuple[RefreshJob, bool]:
+    """The refresh of every station a caller should follow — single-flight — and whether it had already finished.
+
+    While a refresh is queued or running, every caller gets that job, so
+    the EA API sees one refresh however many people press the button.  A
+    refresh that finished successfully within _REFRESH_FRESH_FOR is handed
+    out as it is, results included.  Only after that (or a failure) does
+    a caller start a new one.
+    """
+    global _latest_refresh
+    with _refresh_lock:
+        job = _latest_refresh
+        if job is None or job.status == 'failed' or (job.finished_at and _time.monotonic() - job.finished_at >= _REFRESH_FRESH_FOR):
+            job = _latest_refresh = submit_refresh()
+            print(f'Refresh requested... (job {job.id})')
+            return job, False
+        return job, job.done.is_set()
+
+
+def parse_duration(value: str) -> float:
+    """Seconds in a duration like `90s`, `15m` or `1h`; a bare number is seconds."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if value[-1:] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def station_trend(station: StationDict) -> str | None:
+    """'rising', 'falling' or 'steady' over the last hour, as the frontend's trend badge; None without one."""
+    return snapshot.trend(station['type'], station_series(station).rows)
+
+
+def latest_entries() -> dict[str, dict[str, Any] | None]:
+    """Every station's latest reading, trend and threshold status (see snapshot.py), from the series cache."""
+    return {s['id']: snapshot.entry(s, station_series(s).rows) for s in STATIONS}
+
+
+def partitioned_ids() -> list[str]:
+    """Ids of the stations stored as monthly partitions, for the snapshot's `partitioned` list."""
+    return [s['id'] for s in STATIONS if partitions.is_partitioned(DATA_DIR, s['file'])]
+
+
+def save_latest() -> None:
+    """Bring data/latest.json up to date with the series cache; it's rewritten only if it changed."""
+    snapshot.write(DATA_DIR, latest_entries(), partitioned_ids())
+
+
+def station_activity(station: StationDict) -> str:
+    """How busy a station is, from its stored readings: 'active', 'quiet' or 'normal'.
+
+    A level station is active when its latest reading is above
+    snapshot.HIGH_LEVEL_FRACTION of its typical range high or it rose by
+    more than snapshot.RISING_THRESHOLD m/hr over the last hour.  (Tidal levels rise with
+    every tide, so only the threshold would count for them, and they have
+    none.)  A rainfall gauge is quiet when it recorded no rain in the
+    QUIET_RAIN_HOURS up to its latest reading.
+    """
+    rows = station_series(station).rows
+    if not rows:
+        return 'normal'
+    recent = snapshot.recent(rows, QUIET_RAIN_HOURS if station['type'] == 'rainfall' else 1)
+    if station['type'] == 'rainfall':
+        return 'normal' if any(value > 0 for _, value in recent) else 'quiet'
+    high = station.get('typicalRangeHigh')
+    if high and recent and recent[-1][1] > snapshot.HIGH_LEVEL_FRACTION * high:
+        return 'active'
+    if station['type'] == 'level' and len(recent) >= 3 and snapshot.slope(recent) > snapshot.RISING_THRESHOLD:
+        return 'active'
+    return 'normal'
+
+
+class StationPoller(threading.Thread):
+    """Refreshes stations in the background, each on its own jittered schedule (--poll-interval).
+
+    After each poll a station's next one is set by station_activity: active
+    stations come round after POLL_ACTIVE_FACTOR times the interval, quiet
+    rainfall gauges after POLL_QUIET_FACTOR times it, the rest after the
+    interval itself.  Stations that fall due together are refreshed as one
+    job on the refresh worker, so polls never overlap each other or a
+    refresh someone asked for.
+    """
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(name='station-poller', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        start = _time.monotonic()
+        # The first round goes out within one jitter's width of startup
+        self.due = {s['id']: start + random.uniform(0, POLL_JITTER * interval) for s in STATIONS}
+
+    def next_poll(self, station: StationDict) -> float:
+        factor = {'active': POLL_ACTIVE_FACTOR, 'quiet': POLL_QUIET_FACTOR}.get(station_activity(station), 1)
+        return self.interval * factor * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+    def poll_due(self) -> RefreshJob | None:
+        """Refresh the stations that are due, wait for it, and schedule their next polls."""
+        due = [s for s in STATIONS if self.due[s['id']] <= _time.monotonic()]
+        if not due:
+            return None
+        print(f'Polling {len(due)} station(s)...')
+        job = submit_refresh(due)
+        job.done.wait()
+        now = _time.monotonic()
+        for station in due:
+            self.due[station['id']] = now + self.next_poll(station)
+        return job
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            if self.poll_due() is None:
+                self.stopped.wait(max(0.0, min(self.due.values()) - _time.monotonic()))
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def station_update(station: StationDict, since: str | None) -> dict[str, Any]:
+    """A station's readings after `since`, with its latest value and trend — the data of a /api/stream `readings` event."""
+    cached = station_series(station)
+    readings = []
+    for row in cached.rows[bisect_right(cached.times, since) if since else 0 :]:
+        try:
+            readings.append({'dateTime': row[0], 'value': float(row[1])})
+        except (IndexError, ValueError):
+            continue
+    return {
+        'id': station['id'],
+        'label': station['label'],
+        'type': station['type'],
+        'readings': readings,
+        'latest': readings[-1] if readings else None,
+        'trend': station_trend(station),
+    }
+
+
+class StreamHub:
+    """Pushes events to /api/stream subscribers from an asyncio event loop on its own thread.
+
+    The request worker that opens a stream sends the response headers and
+    hands the socket over (subscribe), so an open dashboard costs a socket
+    and a few buffers rather than a worker thread, and thousands can stay
+    connected while the pool serves everything else.  Each event is
+    formatted once and written to every subscriber, so pushing an update
+    costs the same however the page is being watched.  Events are
+    numbered; the last STREAM_HISTORY are kept so a browser reconnecting
+    with Last-Event-ID gets what it missed, or a `reset` when that has gone.
+    """
+
+    def __init__(self) -> None:
+        self.epoch = secrets.token_hex(4)  # event ids from an earlier run of the server can't be resumed
+        self.loop = asyncio.new_event_loop()
+        # Everything below belongs to the loop's thread
+        self._clients: set[asyncio.StreamWriter] = set()
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=STREAM_HISTORY)
+        self._last_id = 0
+        self._thread = threading.Thread(target=self._run, name='stream-hub', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._heartbeat())
+        self.loop.run_forever()
+
+    def subscribe(self, sock: socket.socket, last_event_id: str | None = None) -> None:
+        """Take over a connection whose response headers have been sent; safe from any thread."""
+        asyncio.run_coroutine_threadsafe(self._serve(sock, last_event_id), self.loop)
+
+    def publish(self, event: str, data: dict[str, Any]) -> None:
+        """Send an event to every subscriber; safe from any thread."""
+        self.loop.call_soon_threadsafe(self._broadcast, event, json.dumps(data))
+
+    def clients(self) -> int:
+        return len(self._clients)
+
+    def close(self) -> None:
+        """Disconnect every subscriber and stop the loop."""
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def _message(self, event_id: int, event: str, data: str) -> bytes:
+        return f'id: {self.epoch}-{event_id}\nevent: {event}\ndata: {data}\n\n'.encode()
+
+    def _missed(self, last_event_id: str | None) -> bytes:
+        """The events after `last_event_id`, or a `reset` if they aren't all in the history any more."""
+        if not last_event_id:
+            return b''
+        epoch, _, n = last_event_id.partition('-')
+        seen = int(n) if n.isdigit() else -1
+        oldest = self._history[0][0] if self._history else self._last_id + 1
+        if epoch != self.epoch or not oldest - 1 <= seen <= self._last_id:
+            return self._message(self._last_id, 'reset', '{}')
+        return b''.join(message for event_id, message in self._history if event_id > seen)
+
+    def _send(self, message: bytes) -> None:
+        for writer in list(self._clients):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > STREAM_MAX_BUFFER:
+                # Gone, or too far behind to catch up: it can reconnect and resume from its last event
+                self._clients.discard(writer)
+                writer.close()
+            else:
+                writer.write(message)
+
+    def _broadcast(self, event: str, data: str) -> None:
+        self._last_id += 1
+        message = self._message(self._last_id, event, data)
+        self._history.append((self._last_id, message))
+        self._send(message)
+
+    async def _heartbeat(self) -> None:
+        # A comment line every STREAM_HEARTBEAT keeps proxies from timing out idle streams
+        while True:
+            await asyncio.sleep(STREAM_HEARTBEAT)
+            self._send(b': heartbeat\n\n')
+
+    async def _serve(self, sock: socket.socket, last_event_id: str | None) -> None:
+        try:
+            reader, writer = await asyncio.open_connection(sock=sock)
+        except OSError:
+            sock.close()
+            return
+        writer.write(f'retry: {STREAM_RETRY}\n\n'.encode() + self._missed(last_event_id))
+        self._clients.add(writer)
+        try:
+            while await reader.read(4096):
+                pass  # subscribers have nothing to say; EOF means they've gone
+        except OSError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _shutdown(self) -> None:
+        for writer in self._clients:
+            writer.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_stream_hub: StreamHub | None = None
+_stream_lock = threading.Lock()
+
+
+def stream_hub() -> StreamHub:
+    """The hub behind /api/stream, started by the first subscriber."""
+    global _stream_hub
+    with _stream_lock:
+        if _stream_hub is None:
+            _stream_hub = StreamHub()
+        return _stream_hub
+
+
+def close_stream() -> None:
+    global _stream_hub
+    with _stream_lock:
+        hub, _stream_hub = _stream_hub, None
+    if hub:
+        hub.close()
+
+
+def publish_update(station: StationDict, since: str | None) -> None:
+    """Push a station's readings after `since` to /api/stream, if anyone has opened it."""
+    hub = _stream_hub
+    if hub is None:
+        return
+    update = station_update(station, since)
+    if update['readings']:
+        hub.publish('readings', update)
+
+
+def _etag(st: os.stat_result, encoding: str | None) -> str:
+    """Strong ETag for a data file in an encoding: changes whenever the file's mtime or size does."""
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}{"-" + encoding if encoding else ""}"'
+
+
+def data_body(path: str, encoding: str | None = None) -> tuple[bytes, float, str]:
+    """Return (body, mtime, ETag) for a data file, as stored or in the given Content-Encoding.
+
+    Bodies are held in memory until the file's mtime or size changes, so a
+    repeat request costs one stat.  An encoded body comes from the
+    precompressed sibling when its mtime matches the file's, and is
+    otherwise compressed in-process.
+    """
+    st = os.stat(path)
+    cached = _bodies.get((path, encoding))
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2], st.st_mtime, _etag(st, encoding)
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        body = None
+        if encoding:
+            try:
+                with open(path + precompress.SUFFIXES[encoding], 'rb') as sibling:
+                    if os.fstat(sibling.fileno()).st_mtime_ns == st.st_mtime_ns:
+                        body = sibling.read()
+            except FileNotFoundError:
+                pass
+        if body is None:
+            body = precompress.compress(f.read(), encoding) if encoding else f.read()
+    _bodies[(path, encoding)] = (st.st_mtime_ns, st.st_size, body)
+    return body, st.st_mtime, _etag(st, encoding)
 
 
 class FloodwatchHandler(SimpleHTTPRequestHandler):
     """Serve static files + handle refresh.php endpoint."""
 
+    timeout = REQUEST_TIMEOUT  # per-connection socket timeout, so a stalled client can't hold a worker
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=os.path.dirname(os.path.abspath(__file__)), **kwargs)
 
@@ -347,35 +1199,219 @@ class FloodwatchHandler(SimpleHTTPRequestHandler):
     def end_headers(self):
         # CSP on all responses
         self.send_header('Content-Security-Policy', self.CSP)
-        # Prevent browser caching of data files so refreshes are always fresh
-        path = self.path.split('?')[0]  # strip query string
-        if path.endswith('.csv') or path.endswith('.geojson'):
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
+        # Data files are revalidated on every use (ETag / If-None-Match, see send_head), so an
+        # unchanged one costs a 304 and a refreshed one is never stale.  Versioned GeoJSON
+        # overlays change only with a deploy, which changes their URLs, so they're never asked about again.
+        url = urllib.parse.urlsplit(self.path)
+        path = url.path
+        if path.endswith('.geojson') and 'v' in urllib.parse.parse_qs(url.query):
+            self.send_header('Cache-Control', f'public, max-age={IMMUTABLE_MAX_AGE}, immutable')
+        elif precompress.is_compressible(path):
+            self.send_header('Cache-Control', 'no-cache')
+        if precompress.is_compressible(path):
+            self.send_header('Vary', 'Accept-Encoding')
         super().end_headers()
 
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/api/readings':
+            self.send_readings(urllib.parse.parse_qs(url.query))
+        elif url.path == '/api/readings/delta':
+            self.send_delta(urllib.parse.parse_qs(url.query))
+        elif url.path == '/api/rollups':
+            self.send_rollups(urllib.parse.parse_qs(url.query))
+        elif url.path == '/api/latest':
+            self.send_body(
+                200, 'application/json', json.dumps(snapshot.build(latest_entries(), partitioned_ids()), separators=(',', ':')).encode()
+            )
+        elif url.path == '/api/stream':
+            self.open_stream(urllib.parse.parse_qs(url.query))
+        elif url.path.startswith('/refresh/'):
+            job = _jobs.get(url.path.removeprefix('/refresh/'))
+            if job is None:
+                self.send_json_error(404, 'Unknown refresh job')
+            else:
+                self.send_body(200, 'application/json', json.dumps(job.to_dict()).encode())
+        else:
+            super().do_GET()
+
+    def send_body(self, status: int, content_type: str, body: bytes) -> None:
+        """Send an API response, compressed if the client accepts it and it's worth it."""
+        encoding = precompress.negotiate(self.headers.get('Accept-Encoding', '')) if len(body) >= precompress.MIN_SIZE else None
+        if encoding:
+            body = precompress.compress(body, encoding)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_error(self, status: int, error: str) -> None:
+        self.send_body(status, 'application/json', json.dumps({'success': False, 'error': error}).encode())
+
+    def station_range(self, query: dict[str, list[str]]) -> tuple[StationDict, str | None, str | None] | None:
+        """The station and optional from/to times of an API query, or None once an error has been sent."""
+        station_id = query.get('station', [''])[0]
+        station = next((s for s in STATIONS if s['id'] == station_id), None)
+        if station is None:
+            self.send_json_error(404 if station_id else 400, f'Unknown station: {station_id}' if station_id else 'Missing station')
+            return None
+        try:
+            start = _query_time(query['from'][0]) if 'from' in query else None
+            end = _query_time(query['to'][0]) if 'to' in query else None
+        except ValueError as e:
+            self.send_json_error(400, f'Invalid time: {e}')
+            return None
+        return station, start, end
+
+    def send_table(self, query: dict[str, list[str]], header: list[str], rows: list, payload: dict[str, Any]) -> None:
+        """Send `rows` as CSV under `header` if the query asks for format=csv, otherwise `payload` as compact JSON."""
+        if query.get('format', ['json'])[0] == 'csv':
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(header)
+            writer.writerows(rows)
+            self.send_body(200, 'text/csv; charset=utf-8', buf.getvalue().encode())
+        else:
+            self.send_body(200, 'application/json', json.dumps(payload, separators=(',', ':')).encode())
+
+    def send_readings(self, query: dict[str, list[str]]) -> None:
+        """GET /api/readings?station=ID&from=ISO&to=ISO[&points=N][&format=csv] — one station's readings in a time range."""
+        if (parsed := self.station_range(query)) is None:
+            return
+        station, start, end = parsed
+        try:
+            points = int(query['points'][0]) if 'points' in query else None
+        except ValueError:
+            points = 0
+        if points is not None and points < 3:
+            self.send_json_error(400, 'points must be a whole number, at least 3')
+            return
+        readings = downsampled_range(station, start, end, points) if points else readings_in_range(station, start, end)
+        self.send_table(query, ['dateTime', 'value'], readings, {'station': station['id'], 'from': start, 'to': end, 'readings': readings})
+
+    def send_delta(self, query: dict[str, list[str]]) -> None:
+        """GET /api/readings/delta?since=ISO[&stations=ID,ID,...][&format=csv] — every reading newer than `since`, for all or some stations.
+
+        One response brings a page up to date, from the series cache; JSON
+        is {"since", "readings": {station id: [[dateTime, value], ...]}}.
+        """
+        if 'since' not in query:
+            self.send_json_error(400, 'Missing since')
+            return
+        try:
+            since = _query_time(query['since'][0])
+        except ValueError as e:
+            self.send_json_error(400, f'Invalid time: {e}')
+            return
+        ids = [station_id for value in query.get('stations', []) for station_id in value.split(',') if station_id]
+        known = {s['id'] for s in STATIONS}
+        if unknown := [station_id for station_id in ids if station_id not in known]:
+            self.send_json_error(404, f'Unknown station: {unknown[0]}')
+            return
+        readings = {s['id']: readings_since(s, since) for s in STATIONS if not ids or s['id'] in ids}
+        rows = [(station_id, *reading) for station_id, station_readings in readings.items() for reading in station_readings]
+        self.send_table(query, ['station', 'dateTime', 'value'], rows, {'since': since, 'readings': readings})
+
+    def send_rollups(self, query: dict[str, list[str]]) -> None:
+        """GET /api/rollups?station=ID&period=hourly|daily&from=ISO&to=ISO[&format=csv] — precomputed hourly or daily stats."""
+        if (parsed := self.station_range(query)) is None:
+            return
+        station, start, end = parsed
+        period = query.get('period', ['daily'])[0]
+        if period not in rollups.PERIODS:
+            self.send_json_error(400, f'period must be one of: {", ".join(rollups.PERIODS)}')
+            return
+        rows = station_rollups(station, period, start, end)
+        header = rollups.header_for(station['type'])
+        payload = {'station': station['id'], 'period': period, 'from': start, 'to': end, 'columns': header, 'rows': rows}
+        self.send_table(query, header, rows, payload)
+
+    def open_stream(self, query: dict[str, list[str]]) -> None:
+        """Start a Server-Sent Events response and hand the connection to the stream hub.
+
+        The hub resumes after the Last-Event-ID header (or `lastEventId`
+        parameter) when there is one; this worker is free again at once.
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')  # nginx: pass events through as they're written
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.flush()
+        last_event_id = self.headers.get('Last-Event-ID') or query.get('lastEventId', [None])[0]
+        self.close_connection = True
+        # Detached, the socket outlives this request: shutdown_request finds nothing left to close
+        stream_hub().subscribe(socket.socket(fileno=self.connection.detach()), last_event_id)
+
+    def not_modified(self, etag: str, mtime: float) -> bool:
+        """True if a conditional GET shows the client's copy is current: If-None-Match when sent, else If-Modified-Since."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is None:
+            return self.not_modified_since(mtime)
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+
+    def not_modified_since(self, mtime: float) -> bool:
+        """True if If-Modified-Since shows the client's copy is current (as SimpleHTTPRequestHandler decides)."""
+        if 'If-Modified-Since' not in self.headers or 'If-None-Match' in self.headers:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(self.headers['If-Modified-Since'])
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=UTC)
+        return int(mtime) <= since.timestamp()
+
+    def send_head(self):
+        # Data files are served from memory (see data_body), gzip/br-encoded when the client accepts it
+        path = self.translate_path(self.path)
+        if not precompress.is_compressible(path) or not os.path.isfile(path):
+            return super().send_head()
+        encoding = None
+        if os.path.getsize(path) >= precompress.MIN_SIZE:
+            encoding = precompress.negotiate(self.headers.get('Accept-Encoding', ''))
+        try:
+            body, mtime, etag = data_body(path, encoding)
+        except OSError:
+            self.send_error(404, 'File not found')
+            return None
+        if self.not_modified(etag, mtime):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', self.date_time_string(mtime))
+            self.end_headers()
+            return None
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(mtime))
+        self.end_headers()
+        return io.BytesIO(body)
+
     def do_POST(self):
-        global _last_refresh
         if self.path == '/refresh.php' or self.path == '/refresh':
-            now = _time.time()
-            elapsed = now - _last_refresh
-            if _last_refresh and elapsed < _REFRESH_MIN_INTERVAL:
-                self.send_response(429)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                retry_after = int(_REFRESH_MIN_INTERVAL - elapsed)
-                self.wfile.write(json.dumps({'success': False, 'error': 'Too many requests', 'retry_after': retry_after}).encode())
-                return
-            _last_refresh = now
-            print('Refresh requested...')
-            result = handle_refresh()
-            self.send_response(200)
+            # 200 with the results of a refresh that has just finished, else 202 with the one to follow
+            job, finished = request_refresh()
+            status = job.to_dict()
+            body = json.dumps(status).encode()
+            self.send_response(200 if finished else 202)
             self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Location', status['url'])
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(result.encode())
+            self.wfile.write(body)
         else:
             self.send_error(404)
 
@@ -436,9 +1472,64 @@ class ReusableHTTPServer(HTTPServer):
     address_family = socket.AF_INET6
     allow_reuse_address = True
     allow_reuse_port = True
+    request_queue_size = 128  # listen backlog; socketserver's 5 stalls bursts of connections, like streams reconnecting
+
+
+class PooledHTTPServer(ReusableHTTPServer):
+    """ReusableHTTPServer that hands each connection to a fixed pool of worker threads.
+
+    A refresh can hold a worker for minutes while it talks to the EA API,
+    so the other workers keep serving the page, its data files and the
+    read APIs meanwhile.  Accepted connections wait for a worker in a
+    bounded queue; when that is full, new ones are turned away with a 503
+    rather than given a thread each, so a burst of requests can't exhaust
+    threads or memory.
+    """
+
+    def __init__(self, server_address, handler_class, workers: int = WORKERS, queue_size: int = REQUEST_QUEUE_SIZE) -> None:
+        super().__init__(server_address, handler_class)
+        self._pending: queue.Queue = queue.Queue(queue_size)
+        self._workers = [threading.Thread(target=self._work, name=f'http-worker-{n}', daemon=True) for n in range(workers)]
+        for worker in self._workers:
+            worker.start()
 
+    def process_request(self, request, client_address):
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            self._reject(request)
 
-def start_server(port: int, bind_addr: str = '::1') -> None:
+    def _work(self) -> None:
+        while (item := self._pending.get()) is not None:
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def _reject(self, request) -> None:
+        try:
+            request.sendall(b'HTTP/1.0 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Length: 0\r\n\r\n')
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        # Drop connections still waiting, then stop the workers once their current request is done
+        while True:
+            try:
+                request, _ = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            self.shutdown_request(request)
+        for _ in self._workers:
+            self._pending.put(None)
+
+
+def start_server(port: int, bind_addr: str = '::1', workers: int = WORKERS, poll_interval: float = POLL_INTERVAL) -> None:
     # Check if already running via PID file
     pid = read_pid()
     if pid:
@@ -459,7 +1550,10 @@ def start_server(port: int, bind_addr: str = '::1') -> None:
     if bind_addr in ('::', '0.0.0.0'):
         print('Warning: Binding to all interfaces -- server is publicly accessible')
 
-    server = ReusableHTTPServer((bind_addr, port), FloodwatchHandler)
+    if workers:
+        server = PooledHTTPServer((bind_addr, port), FloodwatchHandler, workers)
+    else:
+        server = ReusableHTTPServer((bind_addr, port), FloodwatchHandler)
     write_pid()
 
     def cleanup():
@@ -471,12 +1565,16 @@ def start_server(port: int, bind_addr: str = '::1') -> None:
     def handle_sigterm(sig, frame):
         """SIGTERM (from `serve.py stop`) — call shutdown from a thread to
         unblock serve_forever(), which runs in the main thread."""
-        import threading
-
         threading.Thread(target=server.shutdown, daemon=True).start()
 
     signal.signal(signal.SIGTERM, handle_sigterm)
 
+    print(f'Loaded {load_series_cache():,} readings into the series cache')
+    save_latest()
+    poller = StationPoller(poll_interval) if poll_interval else None
+    if poller:
+        poller.start()
+        print(f'Polling stations every {poll_interval / 60:g} min (active stations more often, dry rain gauges less)')
     print(f"""
 ╔══════════════════════════════════════════╗
 ║   Floodwatch Dev Server                  ║
@@ -490,7 +1588,10 @@ def start_server(port: int, bind_addr: str = '::1') -> None:
     except KeyboardInterrupt:
         pass
     print('Shutting down...')
+    if poller:
+        poller.stop()
     server.server_close()
+    close_stream()
     cleanup()
 
 
@@ -502,14 +1603,37 @@ if __name__ == '__main__':
     else:
         port = PORT
         bind_addr = '::1'
+        use_cache = True
+        workers = WORKERS
+        poll_interval = POLL_INTERVAL
         i = 0
         while i < len(args):
             if args[i] in ('--bind', '-b') and i + 1 < len(args):
                 bind_addr = args[i + 1]
                 i += 2
+            elif args[i] == '--format' and i + 1 < len(args) and args[i + 1] in ('json', 'csv'):
+                READINGS_FORMAT = args[i + 1]
+                i += 2
+            elif args[i] == '--threads' and i + 1 < len(args) and args[i + 1].isdigit():
+                workers = int(args[i + 1])
+                i += 2
+            elif args[i] == '--poll-interval' and i + 1 < len(args):
+                try:
+                    poll_interval = parse_duration(args[i + 1])
+                except ValueError:
+                    sys.exit(f'Invalid --poll-interval {args[i + 1]!r}: use e.g. 900, 90s, 15m or 1h')
+                i += 2
+            elif args[i] == '--no-cache':
+                use_cache = False
+                i += 1
+            elif args[i] == '--binary':
+                BINARY_STORE = True
+                i += 1
             elif args[i].isdigit():
                 port = int(args[i])
                 i += 1
             else:
                 i += 1
-        start_server(port, bind_addr)
+        if use_cache:
+            ea_client.enable_cache()
+        start_server(port, bind_addr, workers, poll_interval)
@@ -0,0 +1,146 @@
+"""
+The latest-readings snapshot, data/latest.json.
+
+Drawing the map needs only each station's newest reading, its trend and
+whether it is above its flood threshold, not its history.  The snapshot
+keeps exactly that for every station in one small file, so the frontend
+can draw the markers after one request and load a station's history when
+its popup is opened:
+
+    {"stations": {"50149": {"type": "level", "dateTime": "2026-02-10T11:45:00Z",
+                            "value": 0.523, "trend": "steady", "status": "normal"},
+                  ...},
+     "partitioned": ["50149", ...]}
+
+`trend` is "rising", "falling" or "steady" over the hour up to the latest
+reading, by the frontend's rule, and null for rainfall gauges or too few
+readings.  `status` is "high" for a level station at or above
+HIGH_LEVEL_FRACTION of its typicalRangeHigh (the frontend's red marker),
+"normal" below it, and null for stations without a threshold.
+
+`partitioned` lists the stations stored as monthly partitions (see
+partitions.py), so the frontend knows where each history lives without
+probing for a partition index.json per station.
+
+fetch_data.py rewrites the snapshot after every run and serve.py after
+every refresh that stores new readings; serve.py also answers
+GET /api/latest with it.
+"""
+
+import json
+import os
+from bisect import bisect_left
+from collections.abc import Iterable, Mapping, Sequence
+from operator import itemgetter
+from typing import Any
+
+import atomicfile
+import colstore
+import precompress
+
+type Row = Sequence[Any]  # (dateTime, value, ...) as stored
+type Entry = dict[str, Any]
+
+FILENAME: str = "latest.json"
+TREND_HOURS: int = 1  # readings the trend is fitted to, back from the latest
+RISING_THRESHOLD: float = 0.01  # m/hr, as the frontend's trend badge
+HIGH_LEVEL_FRACTION: float = 0.7  # of typicalRangeHigh — the frontend's red-marker threshold
+
+
+def path_for(data_dir: str) -> str:
+    return os.path.join(data_dir, FILENAME)
+
+
+def slope(points: list[tuple[float, float]]) -> float:
+    """Least-squares slope of (x, y) points, as the frontend's getTrend."""
+    n = len(points)
+    sum_x = sum(x for x, _ in points)
+    sum_y = sum(y for _, y in points)
+    denominator = n * sum(x * x for x, _ in points) - sum_x * sum_x
+    return (n * sum(x * y for x, y in points) - sum_x * sum_y) / denominator if denominator else 0.0
+
+
+def recent(rows: Sequence[Row], hours: float) -> list[tuple[float, float]]:
+    """(hours from the latest row, value) points for the numeric rows in the `hours` up to it."""
+    end = colstore.to_epoch(rows[-1][0])
+    points = []
+    for row in rows[bisect_left(rows, colstore.to_iso(int(end - hours * 3600)), key=itemgetter(0)) :]:
+        try:
+            points.append(((colstore.to_epoch(row[0]) - end) / 3600, float(row[1])))
+        except (TypeError, ValueError):
+            continue
+    return points
+
+
+def trend(station_type: str, rows: Sequence[Row]) -> str | None:
+    """'rising', 'falling' or 'steady' over the last TREND_HOURS of sorted rows; None without one."""
+    if station_type == "rainfall" or len(rows) < 4:
+        return None
+    points = recent(rows, TREND_HOURS)
+    if len(points) < 3:
+        return None
+    rate = slope(points)
+    return "rising" if rate > RISING_THRESHOLD else "falling" if rate < -RISING_THRESHOLD else "steady"
+
+
+def status(station: Mapping[str, Any], value: float) -> str | None:
+    """'high' or 'normal' against a level station's typicalRangeHigh; None for stations without one."""
+    high = station.get("typicalRangeHigh")
+    if station["type"] != "level" or not high:
+        return None
+    return "high" if value >= HIGH_LEVEL_FRACTION * high else "normal"
+
+
+def entry(station: Mapping[str, Any], rows: Sequence[Row]) -> Entry | None:
+    """A station's snapshot entry from its stored rows, sorted by dateTime (the last TREND_HOURS or more suffice).
+
+    None if no row has a numeric value.
+    """
+    for row in reversed(rows):
+        try:
+            value = float(row[1])
+        except (IndexError, TypeError, ValueError):
+            continue
+        return {
+            "type": station["type"],
+            "dateTime": row[0],
+            "value": value,
+            "trend": trend(station["type"], rows),
+            "status": status(station, value),
+        }
+    return None
+
+
+def build(entries: Mapping[str, Entry | None], partitioned: Iterable[str] = ()) -> dict[str, Any]:
+    """The snapshot document for {station id: entry} and the partitioned station ids; stations without readings are left out."""
+    return {
+        "stations": {station_id: e for station_id, e in entries.items() if e is not None},
+        "partitioned": sorted(partitioned),
+    }
+
+
+def read(data_dir: str) -> dict[str, Any] | None:
+    try:
+        with open(path_for(data_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write(data_dir: str, entries: Mapping[str, Entry | None], partitioned: Iterable[str] = ()) -> bool:
+    """Write the snapshot atomically (temp file, fsync, rename), then its compressed siblings.
+
+    An unchanged snapshot is left alone, so hourly runs that store nothing
+    new don't touch the file.  Returns whether it was written.
+    """
+    path = path_for(data_dir)
+    body = json.dumps(build(entries, partitioned), separators=(",", ":")) + "\n"
+    try:
+        with open(path, encoding="utf-8") as f:
+            if f.read() == body:
+                return False
+    except FileNotFoundError:
+        pass
+    atomicfile.atomic_write(path, body)
+    precompress.write_siblings(path)
+    return True
@@ -80,12 +80,13 @@ def data_dir(tmp_path, monkeypatch):
 
     monkeypatch.setattr(fetch_data, "DATA_DIR", str(d))
     monkeypatch.setattr(serve, "DATA_DIR", str(d))
+    monkeypatch.setattr(serve, "_series_cache", {})
 
     return d
 
 
-def make_mock_urlopen(response_data, status=200):
-    """Create a mock urlopen context manager that returns JSON data."""
+def make_mock_response(response_data, status=200):
+    """Create a mock ea_client.request context manager that returns JSON data."""
     mock_response = MagicMock()
     mock_response.read.return_value = json.dumps(response_data).encode("utf-8")
     mock_response.status = status
@@ -0,0 +1,37 @@
+"""Tests for atomicfile.py — atomic writes through a temporary file and rename."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import atomicfile
+
+
+class TestAtomicWrite:
+    def test_text_and_bytes_leave_no_temporary_files(self, tmp_path):
+        path = tmp_path / "latest.json"
+        atomicfile.atomic_write(str(path), "a\r\nb\n")
+        assert path.read_bytes() == b"a\r\nb\n"
+
+        atomicfile.atomic_write(str(path), b"\x00\x01", "wb", mtime_ns=1_700_000_000_000_000_000)
+        assert path.read_bytes() == b"\x00\x01"
+        assert os.stat(path).st_mtime_ns == 1_700_000_000_000_000_000
+        assert [p.name for p in tmp_path.iterdir()] == ["latest.json"]
+
+    def test_failed_write_keeps_the_original(self, tmp_path):
+        path = tmp_path / "index.json"
+        path.write_text("original\n")
+
+        def write_fn(f):
+            f.write("partial")
+            raise ValueError("simulated failure")
+
+        with pytest.raises(ValueError):
+            atomicfile.atomic_write_with(str(path), write_fn)
+
+        assert path.read_text() == "original\n"
+        assert [p.name for p in tmp_path.iterdir()] == ["index.json"]
@@ -0,0 +1,121 @@
+"""Tests for colstore.py — binary columnar series files read through mmap."""
+
+import os
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import colstore
+
+READINGS = [
+    ("2026-02-10T10:00:00Z", "0.523"),
+    ("2026-02-10T10:15:00Z", 0.521),
+    ("2026-02-10T10:30:00Z", "0.519"),
+    ("2026-02-10T10:45:00Z", 0.52),
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "level_50140_umberleigh.bin")
+
+
+def stored(path):
+    with colstore.open_series(path) as s:
+        return s.readings()
+
+
+# ============================================================
+# write / open_series — layout and zero-copy reads
+# ============================================================
+
+
+class TestWrite:
+    def test_round_trip(self, path):
+        """Values come back as written, despite float32 storage."""
+        assert colstore.write(path, reversed(READINGS)) == 4
+        assert stored(path) == [{"dateTime": t, "value": float(v)} for t, v in READINGS]
+
+    def test_eight_bytes_per_reading(self, path):
+        colstore.write(path, READINGS)
+        assert Path(path).stat().st_size == colstore.HEADER_SIZE + 8 * len(READINGS)
+
+    def test_readings_without_values_are_skipped(self, path):
+        colstore.write(path, [*READINGS, ("2026-02-10T11:00:00Z", ""), ("2026-02-10T11:15:00Z", None), ("2026-02-10T11:30:00Z", "nan")])
+        assert len(stored(path)) == 4
+
+    def test_missing_file_yields_none(self, path):
+        with colstore.open_series(path) as s:
+            assert s is None
+
+    def test_rejects_other_files(self, path):
+        Path(path).write_bytes(struct.pack("<4sHHIq", b"CSV!", 1, 0, 0, 0))
+        with pytest.raises(ValueError), colstore.open_series(path):
+            pass
+
+
+class TestRangeReads:
+    def test_binary_search_bounds(self, path):
+        colstore.write(path, READINGS)
+        with colstore.open_series(path) as s:
+            assert s.bounds("2026-02-10T10:15:00Z", "2026-02-10T10:30:00Z") == (1, 3)
+            assert s.bounds("2026-02-10T10:20:00Z") == (2, 4)
+            assert s.bounds(end="2026-02-10T09:00:00Z") == (0, 0)
+            assert s.last_time() == "2026-02-10T10:45:00Z"
+
+    def test_slices_are_views_onto_the_mapping(self, path):
+        colstore.write(path, READINGS)
+        with colstore.open_series(path) as s:
+            times, values = s.slice("2026-02-10T10:15:00Z")
+            assert times.obj is s.times.obj
+            assert list(times) == [900, 1800, 2700]
+            assert values[0] == pytest.approx(0.521)
+            del times, values
+
+
+# ============================================================
+# merge — appends on the fast path, full merge otherwise
+# ============================================================
+
+
+class TestMerge:
+    def test_newer_readings_are_appended(self, path):
+        colstore.write(path, READINGS[:2])
+        assert colstore.merge(path, READINGS[1:]) == 2
+        assert [r["dateTime"] for r in stored(path)] == [t for t, _ in READINGS]
+
+    def test_repeated_last_reading_is_ignored(self, path):
+        """A since= query repeats the last stored reading; it neither blocks the append nor rewrites an unchanged file."""
+        colstore.write(path, READINGS[:2])
+        assert colstore.merge(path, READINGS[1:3]) == 1
+        inode = os.stat(path).st_ino
+
+        assert colstore.merge(path, READINGS[1:3]) == 0
+        assert os.stat(path).st_ino == inode
+        assert [r["dateTime"] for r in stored(path)] == [t for t, _ in READINGS[:3]]
+
+    def test_non_numeric_overlap_is_ignored(self, path):
+        """A repeated last reading without a usable value leaves the stored one alone and still lets newer ones append."""
+        colstore.write(path, READINGS[:2])
+        assert colstore.merge(path, [(READINGS[1][0], "nan"), READINGS[2]]) == 1
+        assert [r["value"] for r in stored(path)] == [0.523, 0.521, 0.519]
+
+    def test_stale_siblings_are_removed(self, path):
+        """.bin files get no siblings; one left beside a file (by a sync or a copy) would go stale after an append."""
+        colstore.write(path, READINGS[:2])
+        Path(path + ".gz").write_bytes(b"stale")
+        colstore.merge(path, READINGS[2:])
+        assert not os.path.exists(path + ".gz")
+
+    def test_gap_fill_and_revised_value(self, path):
+        colstore.write(path, [READINGS[0], READINGS[2]])
+        assert colstore.merge(path, [READINGS[1], ("2026-02-10T10:30:00Z", 0.9)]) == 1
+        assert [r["value"] for r in stored(path)] == [0.523, 0.521, 0.9]
+
+    def test_missing_file_is_created(self, path):
+        assert colstore.merge(path, READINGS) == 4
+        assert len(stored(path)) == 4
@@ -0,0 +1,346 @@
+"""Tests for ea_client.py — pooled keep-alive connections against a local stub server."""
+
+import io
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ea_client
+
+ETAG = '"v1"'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive JSON stub that counts the TCP connections it accepts."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Server drops keep-alive connections idle for longer than this
+        self.connection.settimeout(self.server.idle_timeout)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        if self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", "/readings?redirected")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        status = 404 if self.path.startswith("/missing") else 200
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.daemon_threads = True
+    httpd.connections = 0
+    httpd.requests = 0
+    httpd.idle_timeout = 5
+    httpd.lock = threading.Lock()
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get_json(pool, url):
+    with pool.request(url) as resp:
+        return json.loads(resp.read())
+
+
+class TestConnectionPool:
+    def test_sequential_requests_reuse_one_connection(self, stub_server):
+        httpd, base = stub_server
+        pool = ea_client.ConnectionPool()
+
+        for i in range(5):
+            assert get_json(pool, f"{base}/readings?n={i}") == {"path": f"/readings?n={i}"}
+
+        assert httpd.connections == 1
+        assert pool.connections_opened == 1
+        pool.close()
+
+    def test_threads_share_pool_without_extra_handshakes(self, stub_server):
+        """Concurrent threads open at most one connection each, then reuse them."""
+        httpd, base = stub_server
+        pool = ea_client.ConnectionPool()
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(10):
+                    get_json(pool, f"{base}/readings")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert 1 <= httpd.connections <= 4
+        assert pool.connections_opened == httpd.connections
+        pool.close()
+
+    def test_idle_connections_are_evicted(self, stub_server):
+        httpd, base = stub_server
+        pool = ea_client.ConnectionPool(idle_timeout=0)
+
+        get_json(pool, f"{base}/readings")
+        get_json(pool, f"{base}/readings")
+
+        assert httpd.connections == 2
+        pool.close()
+
+    def test_reconnects_when_server_closes_idle_connection(self, stub_server):
+        """A keep-alive connection dropped by the server is replaced transparently."""
+        httpd, base = stub_server
+        httpd.idle_timeout = 0.1
+        pool = ea_client.ConnectionPool()
+
+        get_json(pool, f"{base}/readings")
+        time.sleep(0.3)  # server times out and closes the pooled connection
+        assert get_json(pool, f"{base}/readings?again") == {"path": "/readings?again"}
+
+        assert httpd.connections == 2
+        pool.close()
+
+    def test_http_error_raises_and_keeps_connection(self, stub_server):
+        httpd, base = stub_server
+        pool = ea_client.ConnectionPool()
+
+        with pytest.raises(HTTPError) as exc_info:
+            get_json(pool, f"{base}/missing")
+        assert exc_info.value.code == 404
+
+        get_json(pool, f"{base}/readings")
+        assert httpd.connections == 1
+        pool.close()
+
+    def test_follows_redirects(self, stub_server):
+        _, base = stub_server
+        pool = ea_client.ConnectionPool()
+
+        assert get_json(pool, f"{base}/redirect") == {"path": "/readings?redirected"}
+        pool.close()
+
+    def test_unreachable_host_raises_url_error(self, stub_server):
+        httpd, _ = stub_server
+        port = httpd.server_address[1]
+        httpd.shutdown()
+        httpd.server_close()
+
+        pool = ea_client.ConnectionPool()
+        with pytest.raises(URLError):
+            get_json(pool, f"http://127.0.0.1:{port}/readings")
+
+
+SAMPLE_READINGS_CSV = (
+    b"dateTime,measure,value\r\n"
+    b"2026-02-10T10:00:00Z,http://environment.data.gov.uk/flood-monitoring/id/measures/50140-level-stage-i-15_min-m,0.523\r\n"
+    b"2026-02-10T10:15:00Z,http://environment.data.gov.uk/flood-monitoring/id/measures/50140-level-stage-i-15_min-m,\r\n"
+    b"2026-02-10T10:30:00Z,http://environment.data.gov.uk/flood-monitoring/id/measures/50140-level-stage-i-15_min-m,0.519\r\n"
+)
+
+
+class TestIterCsvReadings:
+    def test_parses_rows_like_json_items(self):
+        """Rows become {dateTime, value} with float values; rows without a value are skipped."""
+        readings = list(ea_client.iter_csv_readings(io.BytesIO(SAMPLE_READINGS_CSV)))
+        assert readings == [
+            {"dateTime": "2026-02-10T10:00:00Z", "value": 0.523},
+            {"dateTime": "2026-02-10T10:30:00Z", "value": 0.519},
+        ]
+
+    def test_streams_from_response(self, stub_server, monkeypatch):
+        """Parsing straight from a pooled response leaves the connection reusable."""
+        httpd, base = stub_server
+        monkeypatch.setattr(StubHandler, "do_GET", _serve_sample_csv)
+        pool = ea_client.ConnectionPool()
+
+        for _ in range(2):
+            with pool.request(f"{base}/readings.csv") as resp:
+                assert len(list(ea_client.iter_csv_readings(resp))) == 2
+
+        assert httpd.connections == 1
+        pool.close()
+
+
+def _serve_sample_csv(handler):
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/csv")
+    handler.send_header("Content-Length", str(len(SAMPLE_READINGS_CSV)))
+    handler.end_headers()
+    handler.wfile.write(SAMPLE_READINGS_CSV)
+
+
+# ============================================================
+# ResponseCache — on-disk cache behind ea_client.request
+# ============================================================
+
+CLOSED_RANGE = "/readings?startdate=2020-01-01&enddate=2020-01-28&_sorted"
+OPEN_RANGE = "/readings?since=2026-02-10T10:00:00Z&_sorted"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Route ea_client.request through a fresh cache and pool; returns a factory for cache options."""
+    monkeypatch.setattr(ea_client, "_pool", ea_client.ConnectionPool())
+
+    def make(**kwargs):
+        monkeypatch.setattr(ea_client, "_cache", ea_client.ResponseCache(str(tmp_path / "cache"), **kwargs))
+        return ea_client._cache
+
+    return make
+
+
+def cached_get(url, **kwargs):
+    with ea_client.request(url, headers={"Accept": "application/json"}, **kwargs) as resp:
+        return json.loads(resp.read())
+
+
+class TestResponseCache:
+    def test_closed_range_is_cached_indefinitely(self, stub_server, cache):
+        httpd, base = stub_server
+        cache(open_ttl=0)
+
+        first = cached_get(base + CLOSED_RANGE)
+        assert cached_get(base + CLOSED_RANGE) == first
+        assert httpd.requests == 1
+
+    def test_open_range_is_fresh_within_ttl(self, stub_server, cache):
+        httpd, base = stub_server
+        c = cache()
+
+        cached_get(base + OPEN_RANGE)
+        cached_get(base + OPEN_RANGE)
+        assert httpd.requests == 1
+        assert (c.hits, c.misses) == (1, 1)
+
+    def test_expired_entry_is_revalidated_with_etag(self, stub_server, cache):
+        """After the TTL, a 304 Not Modified serves the stored body without re-downloading it."""
+        httpd, base = stub_server
+        c = cache(open_ttl=0)
+
+        first = cached_get(base + OPEN_RANGE)
+        assert cached_get(base + OPEN_RANGE) == first
+        assert httpd.requests == 2
+        assert (c.hits, c.misses) == (1, 1)
+
+    def test_partial_read_is_not_cached(self, stub_server, cache):
+        httpd, base = stub_server
+        cache()
+
+        with ea_client.request(base + CLOSED_RANGE, headers={"Accept": "application/json"}) as resp:
+            resp.read(5)
+        cached_get(base + CLOSED_RANGE)
+        assert httpd.requests == 2
+
+    def test_least_recently_used_entries_are_evicted(self, stub_server, cache):
+        httpd, base = stub_server
+        urls = [f"{base}/readings?startdate=2020-0{m}-01&enddate=2020-0{m}-28" for m in (1, 2, 3)]
+        c = cache()
+        cached_get(urls[0])
+        entry_size = c._size
+        c.max_bytes = entry_size * 2 + entry_size // 2  # room for two entries
+
+        cached_get(urls[1])
+        time.sleep(0.01)
+        cached_get(urls[0])  # hit — now more recently used than urls[1]
+        time.sleep(0.01)
+        cached_get(urls[2])  # over the limit — evicts urls[1]
+        assert c._size <= c.max_bytes
+        assert httpd.requests == 3
+
+        cached_get(urls[0])
+        assert httpd.requests == 3
+        cached_get(urls[1])
+        assert httpd.requests == 4
+
+    def test_offline_serves_cache_and_never_the_network(self, stub_server, cache):
+        httpd, base = stub_server
+        cache(open_ttl=0)
+        cached_get(base + OPEN_RANGE)
+
+        cache(open_ttl=0, offline=True)
+        assert cached_get(base + OPEN_RANGE) == {"path": OPEN_RANGE}
+        with pytest.raises(URLError):
+            cached_get(base + "/readings?since=2026-02-11T00:00:00Z")
+        assert httpd.requests == 1
+
+    def test_use_cache_false_bypasses_it(self, stub_server, cache):
+        """A request made with use_cache=False neither reads nor stores an entry."""
+        httpd, base = stub_server
+        c = cache()
+
+        cached_get(base + OPEN_RANGE)
+        cached_get(base + OPEN_RANGE, use_cache=False)
+        cached_get(base + CLOSED_RANGE, use_cache=False)
+        cached_get(base + CLOSED_RANGE)
+        assert httpd.requests == 4
+        assert (c.hits, c.misses) == (0, 2)
+
+    def test_body_evicted_before_touch_is_a_miss(self, stub_server, cache, monkeypatch):
+        """A body removed between open and touch is closed and reported evicted."""
+        _, base = stub_server
+        c = cache()
+        cached_get(base + CLOSED_RANGE)
+        path, _ = c.lookup(base + CLOSED_RANGE, "application/json")
+        opened = []
+        real_open = open
+
+        def tracking_open(*args, **kwargs):
+            f = real_open(*args, **kwargs)
+            opened.append(f)
+            return f
+
+        def evicted(*args):
+            raise FileNotFoundError(args[0])
+
+        monkeypatch.setattr("builtins.open", tracking_open)
+        monkeypatch.setattr("ea_client.os.utime", evicted)
+        assert c.open_body(path) is None
+        assert opened and opened[-1].closed
+
+    def test_before_send_runs_only_for_network_requests(self, stub_server, cache):
+        """A rate limiter hooked into before_send isn't charged for cache hits."""
+        _, base = stub_server
+        cache()
+        sent = []
+
+        for _ in range(3):
+            cached_get(base + CLOSED_RANGE, before_send=lambda: sent.append(1))
+        assert sent == [1]
@@ -1,7 +1,14 @@
 """Tests for fetch_data.py — data pipeline functions."""
 
 import csv
+import io
+import itertools
+import json
+import random
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, date, datetime, timedelta
 from pathlib import Path
 from urllib.error import URLError
 
@@ -10,8 +17,11 @@ import pytest
 # Ensure project root is importable
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import colstore
 import fetch_data
-from tests.conftest import make_mock_urlopen
+import partitions
+import rollups
+from tests.conftest import make_mock_response
 
 # ============================================================
 # get_measure_id — pure function, no mocking needed
@@ -138,6 +148,26 @@ class TestMergeReadings:
         result = fetch_data.merge_readings(existing, new)
         assert len(result) == 31  # 1-31 Jan, deduplicated
 
+    def test_merge_new_reading_replaces_existing(self):
+        """A revised value from the API wins over the stored one (last writer wins)."""
+        existing = [{"dateTime": "2026-01-13T00:00:00Z", "value": 0.5}, {"dateTime": "2026-01-13T01:00:00Z", "value": 0.6}]
+        new = [{"dateTime": "2026-01-13T01:00:00Z", "value": 0.65}, {"dateTime": "2026-01-13T02:00:00Z", "value": 0.7}]
+        result = fetch_data.merge_readings(existing, new)
+        assert [r["value"] for r in result] == [0.5, 0.65, 0.7]
+
+    def test_merge_out_of_order_input(self):
+        """Descending API pages and shuffled input still merge into one sorted, deduplicated run."""
+        existing = [{"dateTime": f"2026-01-{i:02d}T00:00:00Z", "value": i} for i in (5, 1, 3, 3)]
+        new = [{"dateTime": f"2026-01-{i:02d}T00:00:00Z", "value": i * 10} for i in (6, 4, 2)]
+        result = fetch_data.merge_readings(existing, new)
+        assert [r["dateTime"][8:10] for r in result] == ["01", "02", "03", "04", "05", "06"]
+        assert [r["value"] for r in result] == [1, 20, 3, 40, 5, 60]
+
+    def test_merge_duplicates_within_input_keep_last(self):
+        readings = [{"dateTime": "2026-01-13T00:00:00Z", "value": 0.5}, {"dateTime": "2026-01-13T00:00:00Z", "value": 0.55}]
+        result = fetch_data.merge_readings([], readings)
+        assert result == [{"dateTime": "2026-01-13T00:00:00Z", "value": 0.55}]
+
 
 # ============================================================
 # load_existing_csv — filesystem, uses data_dir fixture
@@ -221,6 +251,223 @@ class TestSaveReadingsCsv:
         assert header == "dateTime,value,unit,station_id,station_label"
 
 
+# ============================================================
+# update_readings_csv — append-only --recent writes
+# ============================================================
+
+
+class TestUpdateReadingsCsv:
+    def _seed(self, data_dir, station, hours):
+        readings = [{"dateTime": f"2026-02-10T{h:02d}:00:00Z", "value": h / 10} for h in hours]
+        fetch_data.save_readings_csv(station, readings, "test.csv")
+        return data_dir / "test.csv"
+
+    def _rows(self, path):
+        with open(path) as f:
+            return list(csv.DictReader(f))
+
+    def test_appends_newer_readings_in_place(self, data_dir, sample_station_level, monkeypatch):
+        path = self._seed(data_dir, sample_station_level, range(0, 10))
+        inode = path.stat().st_ino
+        before = path.read_bytes()
+
+        # Full history must not be loaded on the append path
+        monkeypatch.setattr(fetch_data, "load_existing_csv", lambda f: pytest.fail("full read"))
+        new = [{"dateTime": f"2026-02-10T{h:02d}:00:00Z", "value": h / 10} for h in range(8, 12)]
+        fetch_data.update_readings_csv(sample_station_level, new, "test.csv")
+
+        assert path.stat().st_ino == inode  # appended, not replaced
+        assert path.read_bytes().startswith(before)
+        rows = self._rows(path)
+        assert [r["dateTime"][11:13] for r in rows] == [f"{h:02d}" for h in range(12)]
+        assert rows[-1]["station_label"] == "Umberleigh"
+
+    def test_no_write_when_nothing_new(self, data_dir, sample_station_level):
+        path = self._seed(data_dir, sample_station_level, range(0, 5))
+        mtime = path.stat().st_mtime_ns
+
+        new = [{"dateTime": "2026-02-10T03:00:00Z", "value": 0.3}, {"dateTime": "2026-02-10T04:00:00Z", "value": "0.4"}]
+        fetch_data.update_readings_csv(sample_station_level, new, "test.csv")
+        assert path.stat().st_mtime_ns == mtime
+
+    def test_gap_fill_falls_back_to_rewrite(self, data_dir, sample_station_level):
+        path = self._seed(data_dir, sample_station_level, [0, 1, 3])
+        inode = path.stat().st_ino
+
+        fetch_data.update_readings_csv(sample_station_level, [{"dateTime": "2026-02-10T02:00:00Z", "value": 0.2}], "test.csv")
+
+        assert path.stat().st_ino != inode
+        assert [r["dateTime"][11:13] for r in self._rows(path)] == ["00", "01", "02", "03"]
+
+    def test_revised_value_falls_back_to_rewrite(self, data_dir, sample_station_level):
+        path = self._seed(data_dir, sample_station_level, range(0, 4))
+        inode = path.stat().st_ino
+
+        fetch_data.update_readings_csv(sample_station_level, [{"dateTime": "2026-02-10T03:00:00Z", "value": 9.9}], "test.csv")
+        assert path.stat().st_ino != inode
+
+    def test_tail_read_spans_blocks(self, data_dir, sample_station_level, monkeypatch):
+        """Overlap checks still see every stored row when the tail spans several blocks."""
+        monkeypatch.setattr(fetch_data, "TAIL_BLOCK_SIZE", 64)
+        path = self._seed(data_dir, sample_station_level, range(0, 24))
+        inode = path.stat().st_ino
+
+        new = [{"dateTime": f"2026-02-10T{h:02d}:00:00Z", "value": h / 10} for h in range(10, 24)]
+        new.append({"dateTime": "2026-02-11T00:00:00Z", "value": 2.4})
+        fetch_data.update_readings_csv(sample_station_level, new, "test.csv")
+
+        assert path.stat().st_ino == inode
+        assert len(self._rows(path)) == 25
+
+    def test_partial_last_line_is_repaired(self, data_dir, sample_station_level):
+        path = self._seed(data_dir, sample_station_level, range(0, 3))
+        with open(path, "a") as f:
+            f.write("2026-02-10T03:00:00Z,0.3,m")  # interrupted append
+
+        fetch_data.update_readings_csv(sample_station_level, [{"dateTime": "2026-02-10T04:00:00Z", "value": 0.4}], "test.csv")
+        rows = self._rows(path)
+        assert all(r["station_label"] == "Umberleigh" for r in rows)
+        assert rows[-1]["dateTime"] == "2026-02-10T04:00:00Z"
+
+    def test_creates_missing_file(self, data_dir, sample_station_level, sample_readings):
+        fetch_data.update_readings_csv(sample_station_level, sample_readings, "new.csv")
+        assert len(self._rows(data_dir / "new.csv")) == 5
+
+    def test_partitioned_station_updates_only_its_month(self, data_dir, sample_station_level):
+        """After --partition, new readings go to their month's file and the single CSV isn't recreated."""
+        self._seed(data_dir, sample_station_level, range(0, 4))
+        rows = [{"dateTime": "2026-01-31T23:45:00Z", "value": 0.1}, *fetch_data.load_existing_csv("test.csv")]
+        fetch_data.save_readings_csv(sample_station_level, rows, "test.csv")
+        assert partitions.migrate(str(data_dir), "test.csv") == 2
+        january = data_dir / "test" / "2026-01.csv"
+        inode = january.stat().st_ino
+
+        new = [{"dateTime": f"2026-02-10T{h:02d}:00:00Z", "value": h / 10} for h in range(3, 6)]
+        fetch_data.update_readings_csv(sample_station_level, new, "test.csv")
+
+        assert january.stat().st_ino == inode
+        assert len(self._rows(data_dir / "test" / "2026-02.csv")) == 6
+        assert not (data_dir / "test.csv").exists()
+        assert fetch_data.last_stored_time("test.csv") == "2026-02-10T05:00:00Z"
+        assert len(fetch_data.load_existing_csv("test.csv")) == 7
+
+    def test_binary_copy_is_built_from_csv_then_merged(self, data_dir, sample_station_level):
+        """--binary builds a missing .bin from the stored history, then merges each update into it."""
+        self._seed(data_dir, sample_station_level, range(0, 4))
+        fetch_data.save_series_file("test.csv", [{"dateTime": "2026-02-10T03:00:00Z", "value": 0.3}])
+        new = [{"dateTime": "2026-02-10T04:00:00Z", "value": 0.4}]
+        fetch_data.update_readings_csv(sample_station_level, new, "test.csv")
+        fetch_data.save_series_file("test.csv", new)
+
+        with colstore.open_series(str(data_dir / "test.bin")) as s:
+            assert [r["value"] for r in s.readings()] == [0.0, 0.1, 0.2, 0.3, 0.4]
+
+    def test_rollups_are_kept_once_built(self, data_dir, sample_station_level, monkeypatch):
+        """--rollups builds them; an appended update recomputes its day from the file's tail only."""
+        self._seed(data_dir, sample_station_level, range(0, 4))
+        monkeypatch.setattr(fetch_data, "get_station_filename", lambda s: "test.csv")
+        fetch_data.rebuild_rollups([sample_station_level])
+
+        monkeypatch.setattr(fetch_data, "load_existing_csv", lambda f: pytest.fail("full read"))
+        new = [{"dateTime": "2026-02-10T04:00:00Z", "value": 0.8}]
+        fetch_data.update_readings_csv(sample_station_level, new, "test.csv")
+        fetch_data.save_rollups(sample_station_level, "test.csv", new)
+
+        assert rollups.read(str(data_dir), "test.csv", "daily") == [["2026-02-10", "5", "0", "0.8", "0.28"]]
+        assert len(rollups.read(str(data_dir), "test.csv", "hourly")) == 5
+
+
+# ============================================================
+# fetch_recent_batch — one catchment-wide request for --recent
+# ============================================================
+
+MEASURE_URL = "http://environment.data.gov.uk/flood-monitoring/id/measures/"
+
+
+def iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class TestFetchRecentBatch:
+    def _seed(self, station, last):
+        fetch_data.save_readings_csv(station, [{"dateTime": last, "value": 0.5}], fetch_data.get_station_filename(station))
+
+    def _stations(self, sample_station_level):
+        fresh = sample_station_level
+        stale = {**sample_station_level, "id": "50119", "label": "Stale"}
+        missing = {**sample_station_level, "id": "50132", "label": "Missing"}
+        return fresh, stale, missing
+
+    def test_latest_readings_cover_unchanged_and_one_step_stations(self, data_dir, sample_station_level, monkeypatch):
+        """One ?latest request covers stations with nothing new or one new reading; the rest are left out."""
+        fresh, stale, missing = self._stations(sample_station_level)
+        ahead = {**sample_station_level, "id": "50135", "label": "Ahead"}
+        last = datetime.now(UTC).replace(second=0, microsecond=0) - timedelta(minutes=20)
+        for station in (fresh, stale, ahead):
+            self._seed(station, iso(last))
+        urls = []
+
+        def mock_api_get(url):
+            urls.append(url)
+            return {
+                "items": [
+                    {
+                        "dateTime": iso(last + timedelta(minutes=15)),
+                        "measure": MEASURE_URL + fetch_data.get_measure_id(fresh),
+                        "value": 0.6,
+                    },
+                    {"dateTime": iso(last), "measure": MEASURE_URL + fetch_data.get_measure_id(stale), "value": 0.5},
+                    {"dateTime": iso(last + timedelta(hours=1)), "measure": MEASURE_URL + fetch_data.get_measure_id(ahead), "value": 0.7},
+                    {"dateTime": iso(last), "measure": MEASURE_URL + "other-measure", "value": 9.9},
+                ]
+            }
+
+        monkeypatch.setattr(fetch_data, "api_get", mock_api_get)
+        batch = fetch_data.fetch_recent_batch([fresh, stale, ahead, missing])
+
+        assert batch == {
+            fetch_data.get_measure_id(fresh): [{"dateTime": iso(last + timedelta(minutes=15)), "value": 0.6}],
+            fetch_data.get_measure_id(stale): [],
+        }
+        assert len(urls) == 1
+        assert "/data/readings?latest&" in urls[0]
+
+    def test_hourly_run_skips_the_batch(self, data_dir, sample_station_level, monkeypatch):
+        """An hour or more behind, ?latest can't cover a station, so it isn't requested at all."""
+        fresh, stale, _ = self._stations(sample_station_level)
+        for station in (fresh, stale):
+            self._seed(station, iso(datetime.now(UTC) - timedelta(minutes=75)))
+        monkeypatch.setattr(fetch_data, "api_get", lambda url: pytest.fail("batch requested"))
+
+        assert fetch_data.fetch_recent_batch([fresh, stale]) == {}
+
+    def test_filling_every_page_is_a_failure(self, data_dir, sample_station_level, monkeypatch):
+        """A response that fills MAX_BATCH_PAGES pages may be missing measures, so nothing is taken from it."""
+        fresh, _, _ = self._stations(sample_station_level)
+        self._seed(fresh, iso(datetime.now(UTC)))
+        monkeypatch.setattr(fetch_data, "BATCH_PAGE_SIZE", 1)
+        item = {"dateTime": iso(datetime.now(UTC)), "measure": MEASURE_URL + fetch_data.get_measure_id(fresh), "value": 0.5}
+        urls = []
+
+        def mock_api_get(url):
+            urls.append(url)
+            return {"items": [item]}
+
+        monkeypatch.setattr(fetch_data, "api_get", mock_api_get)
+        assert fetch_data.fetch_recent_batch([fresh]) == {}
+        assert len(urls) == fetch_data.MAX_BATCH_PAGES
+
+    def test_failure_falls_back_to_per_station(self, data_dir, sample_station_level, monkeypatch):
+        fresh, _, _ = self._stations(sample_station_level)
+        self._seed(fresh, iso(datetime.now(UTC)))
+
+        def mock_api_get(url):
+            raise OSError("connection reset")
+
+        monkeypatch.setattr(fetch_data, "api_get", mock_api_get)
+        assert fetch_data.fetch_recent_batch([fresh]) == {}
+
+
 # ============================================================
 # save_stations_csv — filesystem, uses data_dir fixture
 # ============================================================
@@ -247,6 +494,30 @@ class TestSaveStationsCsv:
         assert header == "id,label,lat,lon,river,type,rloi,measure_id"
 
 
+# ============================================================
+# save_latest — data/latest.json from the stored tails
+# ============================================================
+
+
+class TestSaveLatest:
+    def test_snapshot_from_csv_and_partitioned_stations(self, data_dir):
+        """Each station's entry comes from the tail of its CSV or partitions; stations without data are left out."""
+        level, rainfall, empty = fetch_data.LEVEL_STATIONS[0], fetch_data.RAINFALL_STATIONS[0], fetch_data.RAINFALL_STATIONS[1]
+        times = [f"{day}T{h:02d}:{m:02d}:00Z" for day in ("2026-01-31", "2026-02-01") for h in (10, 11) for m in (0, 15, 30, 45)]
+        fetch_data.save_readings_csv(level, [{"dateTime": t, "value": 1.5} for t in times], fetch_data.get_station_filename(level))
+        fetch_data.save_readings_csv(rainfall, [{"dateTime": t, "value": 0.2} for t in times], fetch_data.get_station_filename(rainfall))
+        partitions.migrate(str(data_dir), fetch_data.get_station_filename(rainfall))
+
+        fetch_data.save_latest([level, rainfall, empty])
+
+        latest = json.loads((data_dir / "latest.json").read_text())
+        assert latest["partitioned"] == [rainfall["id"]]
+        assert latest["stations"] == {
+            level["id"]: {"type": "level", "dateTime": times[-1], "value": 1.5, "trend": "steady", "status": "high"},
+            rainfall["id"]: {"type": "rainfall", "dateTime": times[-1], "value": 0.2, "trend": None, "status": None},
+        }
+
+
 # ============================================================
 # api_get — HTTP mocking with monkeypatch
 # ============================================================
@@ -254,24 +525,24 @@ class TestSaveStationsCsv:
 
 class TestApiGet:
     def test_success_first_attempt(self, monkeypatch):
-        mock_resp = make_mock_urlopen({"items": [{"value": 1}]})
-        monkeypatch.setattr("fetch_data.urlopen", lambda *a, **kw: mock_resp)
+        mock_resp = make_mock_response({"items": [{"value": 1}]})
+        monkeypatch.setattr("ea_client.request", lambda *a, **kw: mock_resp)
 
         result = fetch_data.api_get("http://example.com/test")
         assert result == {"items": [{"value": 1}]}
 
     def test_retry_on_failure_then_success(self, monkeypatch):
         call_count = 0
-        mock_resp = make_mock_urlopen({"items": []})
+        mock_resp = make_mock_response({"items": []})
 
-        def fake_urlopen(*args, **kwargs):
+        def fake_request(*args, **kwargs):
             nonlocal call_count
             call_count += 1
             if call_count < 3:
                 raise URLError("connection failed")
             return mock_resp
 
-        monkeypatch.setattr("fetch_data.urlopen", fake_urlopen)
+        monkeypatch.setattr("ea_client.request", fake_request)
         monkeypatch.setattr("fetch_data.time.sleep", lambda _: None)
 
         result = fetch_data.api_get("http://example.com/test", retries=3)
@@ -282,7 +553,7 @@ class TestApiGet:
         def always_fail(*args, **kwargs):
             raise URLError("connection failed")
 
-        monkeypatch.setattr("fetch_data.urlopen", always_fail)
+        monkeypatch.setattr("ea_client.request", always_fail)
         monkeypatch.setattr("fetch_data.time.sleep", lambda _: None)
 
         with pytest.raises(URLError):
@@ -294,7 +565,7 @@ class TestApiGet:
         def always_fail(*args, **kwargs):
             raise URLError("connection failed")
 
-        monkeypatch.setattr("fetch_data.urlopen", always_fail)
+        monkeypatch.setattr("ea_client.request", always_fail)
         monkeypatch.setattr("fetch_data.time.sleep", lambda s: sleep_calls.append(s))
 
         with pytest.raises(URLError):
@@ -314,22 +585,75 @@ class TestApiGet:
 class TestFetchReadingsBatch:
     def test_returns_items_on_success(self, monkeypatch):
         items = [{"dateTime": "2026-01-13T00:00:00Z", "value": 0.5}]
-        mock_resp = make_mock_urlopen({"items": items})
-        monkeypatch.setattr("fetch_data.urlopen", lambda *a, **kw: mock_resp)
+        mock_resp = make_mock_response({"items": items})
+        monkeypatch.setattr("ea_client.request", lambda *a, **kw: mock_resp)
 
         result = fetch_data.fetch_readings_batch("50140-level-stage-i-15_min-m", "2026-01-01", "2026-01-13")
         assert len(result) == 1
         assert result[0]["value"] == 0.5
 
-    def test_returns_empty_on_error(self, monkeypatch):
+    def test_returns_none_on_error(self, monkeypatch):
+        """A batch that can't be fetched is None, not an empty list, so it isn't mistaken for a gap in the data."""
+
         def always_fail(*args, **kwargs):
             raise URLError("connection failed")
 
-        monkeypatch.setattr("fetch_data.urlopen", always_fail)
+        monkeypatch.setattr("ea_client.request", always_fail)
         monkeypatch.setattr("fetch_data.time.sleep", lambda _: None)
 
         result = fetch_data.fetch_readings_batch("50140-level-stage-i-15_min-m", "2026-01-01", "2026-01-13")
-        assert result == []
+        assert result is None
+
+    def test_csv_format_streams_readings_csv(self, monkeypatch):
+        """With the csv format, readings.csv is requested and parsed into the same items as JSON."""
+        body = b"dateTime,measure,value\r\n2026-01-13T00:00:00Z,50140-level-stage-i-15_min-m,0.5\r\n"
+        urls = []
+
+        def fake_request(url, **kw):
+            urls.append(url)
+            return io.BytesIO(body)
+
+        monkeypatch.setattr("ea_client.request", fake_request)
+        monkeypatch.setattr(fetch_data, "_readings_format", "csv")
+
+        result = fetch_data.fetch_readings_batch("50140-level-stage-i-15_min-m", "2026-01-01", "2026-01-13")
+        assert result == [{"dateTime": "2026-01-13T00:00:00Z", "value": 0.5}]
+        assert "/readings.csv?startdate=2026-01-01&enddate=2026-01-13" in urls[0]
+
+    def test_failed_range_is_bisected(self, monkeypatch):
+        """A month that times out is retried as smaller ranges instead of being dropped."""
+        urls = []
+
+        def fake_request(url, **kw):
+            urls.append(url)
+            query = dict(part.split("=", 1) for part in url.split("?", 1)[1].split("&") if "=" in part)
+            start, end = date.fromisoformat(query["startdate"]), date.fromisoformat(query["enddate"])
+            if (end - start).days > 7:
+                raise TimeoutError("timed out")
+            return make_mock_response({"items": daily_readings(query["startdate"], query["enddate"])})
+
+        monkeypatch.setattr("ea_client.request", fake_request)
+        monkeypatch.setattr("fetch_data.time.sleep", lambda _: None)
+
+        result = fetch_data.fetch_readings_batch("50140-level-stage-i-15_min-m", "2026-01-01", "2026-01-28", log=lambda _: None)
+        assert len(result) == 28
+        assert len(urls) > 1
+
+    def test_full_page_is_split(self, monkeypatch):
+        """A response that fills the row limit was truncated, so its range is fetched in halves."""
+        monkeypatch.setattr(fetch_data, "READINGS_LIMIT", 10)
+        ranges = []
+
+        def fake_api_get(url):
+            query = dict(part.split("=", 1) for part in url.split("?", 1)[1].split("&") if "=" in part)
+            ranges.append((query["startdate"], query["enddate"]))
+            return {"items": daily_readings(query["startdate"], query["enddate"])}
+
+        monkeypatch.setattr(fetch_data, "api_get", fake_api_get)
+
+        result = fetch_data.fetch_readings_batch("50140-level-stage-i-15_min-m", "2026-01-01", "2026-01-28", log=lambda _: None)
+        assert ranges[0] == ("2026-01-01", "2026-01-28")
+        assert sorted(r["dateTime"] for r in result) == [r["dateTime"] for r in daily_readings("2026-01-01", "2026-01-28")]
 
 
 # ============================================================
@@ -337,6 +661,12 @@ class TestFetchReadingsBatch:
 # ============================================================
 
 
+def daily_readings(start, end):
+    """One reading per day in [start, end], like a dense station's chunk."""
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    return [{"dateTime": f"{first + timedelta(days=i)}T00:00:00Z", "value": 0.5} for i in range((last - first).days + 1)]
+
+
 class TestFetchAllReadings:
     def test_deduplicates_overlapping_chunks(self, monkeypatch):
         """If the same reading appears in multiple chunks, it's only in the result once."""
@@ -371,6 +701,24 @@ class TestFetchAllReadings:
         # Should stop after 3 empty chunks, not iterate all 13+ chunks for 365 days
         assert call_count == 3
 
+    def test_failed_chunks_are_not_empty_chunks(self, monkeypatch):
+        """A failed chunk neither counts towards the empty streak nor grows the next chunk."""
+        windows = []
+
+        def mock_batch(measure_id, start, end, log=print, gaps=None):
+            windows.append((date.fromisoformat(start), date.fromisoformat(end)))
+            return None if len(windows) <= 3 else []
+
+        monkeypatch.setattr(fetch_data, "fetch_readings_batch", mock_batch)
+
+        lines = []
+        station = {"id": "50140", "label": "Umberleigh", "type": "level"}
+        fetch_data.fetch_all_readings(station, going_back_days=365, lookahead=1, log=lines.append)
+        assert sum("failed" in line for line in lines) == 3
+        assert sum("no data" in line for line in lines) == 3
+        assert len(windows) == 6
+        assert all((end - start).days + 1 == fetch_data.series.CHUNK_DAYS for start, end in windows[1:4])
+
     def test_returns_sorted(self, monkeypatch):
         """Results are sorted chronologically regardless of chunk order."""
         batch_num = 0
@@ -392,6 +740,282 @@ class TestFetchAllReadings:
         assert len(result) >= 2
         assert result[0]["dateTime"] < result[-1]["dateTime"]
 
+    def test_concurrent_matches_serial(self, monkeypatch):
+        """Fetching chunks over a pool gives the same result as the serial loop."""
+
+        monkeypatch.setattr(
+            fetch_data, "fetch_readings_batch", lambda measure_id, start, end, log=print, gaps=None: daily_readings(start, end)
+        )
+
+        station = {"id": "50140", "label": "Umberleigh", "type": "level"}
+        serial = fetch_data.fetch_all_readings(station, going_back_days=200, log=lambda _: None)
+        with ThreadPoolExecutor(4) as pool:
+            concurrent = fetch_data.fetch_all_readings(station, going_back_days=200, executor=pool, log=lambda _: None)
+        assert concurrent == serial
+        assert len(serial) > 10
+
+    def test_concurrent_stops_after_empty_streak(self, monkeypatch):
+        """The empty-streak cutoff applies in order, even with chunks fetched ahead."""
+        monkeypatch.setattr(fetch_data, "fetch_readings_batch", lambda *a, **kw: [])
+
+        lines = []
+        station = {"id": "50140", "label": "Umberleigh", "type": "level"}
+        with ThreadPoolExecutor(2) as pool:
+            result = fetch_data.fetch_all_readings(station, going_back_days=365, executor=pool, lookahead=2, log=lines.append)
+        assert result == []
+        assert sum("no data" in line for line in lines) == 3
+
+    def test_concurrent_plans_the_same_windows_as_serial(self, monkeypatch):
+        """Windows are sized in consumption order, so a pool fetches and cuts off exactly as the serial loop does."""
+        today = fetch_data.datetime.now(fetch_data.UTC).date()
+
+        def mock_batch(measure_id, start, end, log=print, gaps=None):
+            time.sleep(random.uniform(0, 0.01))  # finish out of order
+            recent = max(date.fromisoformat(start), today - timedelta(days=100))
+            old = min(date.fromisoformat(end), today - timedelta(days=600))
+            readings = daily_readings(recent.isoformat(), end) if recent <= date.fromisoformat(end) else []
+            return readings + (daily_readings(start, old.isoformat()) if old >= date.fromisoformat(start) else [])
+
+        monkeypatch.setattr(fetch_data, "fetch_readings_batch", mock_batch)
+
+        station = {"id": "50140", "label": "Umberleigh", "type": "level"}
+        serial_lines, concurrent_lines = [], []
+        serial = fetch_data.fetch_all_readings(station, going_back_days=730, lookahead=3, log=serial_lines.append)
+        with ThreadPoolExecutor(3) as pool:
+            concurrent = fetch_data.fetch_all_readings(
+                station, going_back_days=730, executor=pool, lookahead=3, log=concurrent_lines.append
+            )
+        assert concurrent == serial
+        assert concurrent_lines == serial_lines
+        assert sum("no data" in line for line in serial_lines) == 3
+        assert len(serial) == 101  # the older run is past the empty streak
+
+    def test_sparse_station_takes_fewer_requests(self, monkeypatch):
+        """Chunks grow for a gauge with few readings, so two years need far fewer than 26 requests."""
+        windows = []
+
+        def mock_batch(measure_id, start, end, log=print, gaps=None):
+            windows.append((start, end))
+            return [{"dateTime": f"{start}T00:00:00Z", "value": 0.2}]
+
+        monkeypatch.setattr(fetch_data, "fetch_readings_batch", mock_batch)
+
+        station = {"id": "50199", "label": "Lapford Bowerthy", "type": "rainfall"}
+        fetch_data.fetch_all_readings(station, going_back_days=730, log=lambda _: None)
+        assert len(windows) <= 14
+        assert windows[-1][0] == (fetch_data.datetime.now(fetch_data.UTC).date() - timedelta(days=730)).isoformat()
+
+
+# ============================================================
+# ChunkJournal — resumable backfill checkpoints
+# ============================================================
+
+
+JOURNAL_STATION = {"id": "50140", "label": "Umberleigh", "type": "level"}
+
+
+class TestChunkJournal:
+    filename = "level_50140_umberleigh.csv"
+
+    def _counting_batch(self, monkeypatch, fail_after=None):
+        calls = []
+
+        def mock_batch(measure_id, start, end, log=print, gaps=None):
+            calls.append((date.fromisoformat(start), date.fromisoformat(end)))
+            if fail_after is not None and len(calls) > fail_after:
+                raise KeyboardInterrupt  # the run is killed mid-backfill
+            return daily_readings(start, end)
+
+        monkeypatch.setattr(fetch_data, "fetch_readings_batch", mock_batch)
+        return calls
+
+    def test_resume_skips_recorded_chunks(self, data_dir, monkeypatch):
+        """A killed run's completed chunks are replayed from the journal, not refetched."""
+        self._counting_batch(monkeypatch, fail_after=2)
+        with pytest.raises(KeyboardInterrupt):
+            fetch_data.fetch_all_readings(
+                JOURNAL_STATION, going_back_days=400, log=lambda _: None, journal=fetch_data.ChunkJournal.open(self.filename)
+            )
+
+        calls = self._counting_batch(monkeypatch)
+        journal = fetch_data.ChunkJournal.open(self.filename, resume=True)
+        assert len(journal.done) == 2
+        resumed = fetch_data.fetch_all_readings(JOURNAL_STATION, going_back_days=400, log=lambda _: None, journal=journal)
+
+        assert calls
+        for start, end in calls:
+            assert not any(w_start <= end and start <= w_end for w_start, w_end in journal.done)
+        full = fetch_data.fetch_all_readings(JOURNAL_STATION, going_back_days=400, log=lambda _: None)
+        assert resumed == full
+
+    def test_window_with_a_failing_day_is_not_recorded(self, data_dir, monkeypatch):
+        """A day the API never serves leaves its window out of the journal, so a resumed run retries it."""
+        bad = fetch_data.datetime.now(fetch_data.UTC).date() - timedelta(days=10)
+
+        def fetch(url):
+            start, end = (date.fromisoformat(url.split(key)[1][:10]) for key in ("startdate=", "enddate="))
+            if start <= bad <= end:
+                raise OSError("server error")
+            return {"items": daily_readings(start.isoformat(), end.isoformat())}
+
+        monkeypatch.setattr(fetch_data, "api_get", fetch)
+        lines = []
+        readings = fetch_data.fetch_all_readings(
+            JOURNAL_STATION, going_back_days=60, log=lines.append, journal=fetch_data.ChunkJournal.open(self.filename)
+        )
+
+        assert bad.isoformat() not in {r["dateTime"][:10] for r in readings}
+        assert any("could not be fetched" in line and bad.isoformat() in line for line in lines)
+        journal = fetch_data.ChunkJournal.open(self.filename, resume=True)
+        assert journal.done
+        assert journal.covering(bad) is None
+
+    def test_without_resume_starts_over(self, data_dir, monkeypatch):
+        self._counting_batch(monkeypatch)
+        fetch_data.fetch_all_readings(
+            JOURNAL_STATION, going_back_days=60, log=lambda _: None, journal=fetch_data.ChunkJournal.open(self.filename)
+        )
+
+        journal = fetch_data.ChunkJournal.open(self.filename)
+        assert journal.done == {}
+        fetch_data.fetch_all_readings(JOURNAL_STATION, going_back_days=60, log=lambda _: None, journal=journal)
+        assert len(fetch_data.ChunkJournal.open(self.filename, resume=True).done) == 3
+
+    def test_torn_last_line_is_dropped(self, data_dir, monkeypatch):
+        self._counting_batch(monkeypatch)
+        fetch_data.fetch_all_readings(
+            JOURNAL_STATION, going_back_days=60, log=lambda _: None, journal=fetch_data.ChunkJournal.open(self.filename)
+        )
+        path = Path(fetch_data.ChunkJournal.path_for(self.filename))
+        intact = path.read_bytes()
+        path.write_bytes(intact + b'{"start":"2025-01-01","end":"2025-01-2')
+
+        journal = fetch_data.ChunkJournal.open(self.filename, resume=True)
+        assert len(journal.done) == 3
+        assert path.read_bytes() == intact
+
+    def test_resume_keeps_original_range(self, data_dir, monkeypatch):
+        """A journal started on an earlier day keeps its range; only the days since are fetched."""
+        calls = self._counting_batch(monkeypatch)
+        today = fetch_data.datetime.now(fetch_data.UTC).date()
+        planned_end = today - fetch_data.timedelta(days=3)
+        journal = fetch_data.ChunkJournal.open(self.filename)
+        start_limit = journal.plan(planned_end, planned_end - fetch_data.timedelta(days=60))
+        windows = list(fetch_data.chunk_windows(planned_end, start_limit))
+        for window in windows:
+            journal.record(window, daily_readings(window[0].isoformat(), window[1].isoformat()))
+
+        result = fetch_data.fetch_all_readings(
+            JOURNAL_STATION, going_back_days=30, log=lambda _: None, journal=fetch_data.ChunkJournal.open(self.filename, resume=True)
+        )
+        assert calls == [(planned_end + fetch_data.timedelta(days=1), today)]
+        assert len(result) == (today - start_limit).days + 1
+
+    def test_discard_removes_journal(self, data_dir, monkeypatch):
+        self._counting_batch(monkeypatch)
+        fetch_data.fetch_all_readings(
+            JOURNAL_STATION, going_back_days=30, log=lambda _: None, journal=fetch_data.ChunkJournal.open(self.filename)
+        )
+        assert Path(fetch_data.ChunkJournal.path_for(self.filename)).exists()
+        fetch_data.ChunkJournal.discard(self.filename)
+        assert not Path(fetch_data.ChunkJournal.path_for(self.filename)).exists()
+
+
+# ============================================================
+# chunk_windows — date range splitting
+# ============================================================
+
+
+class TestChunkWindows:
+    def test_windows_cover_range_newest_first(self):
+        windows = list(fetch_data.chunk_windows(date(2026, 3, 1), date(2026, 1, 1)))
+        assert windows[0][1] == date(2026, 3, 1)
+        assert windows[-1][0] == date(2026, 1, 1)
+        for (start, _), (_, next_end) in itertools.pairwise(windows):
+            assert (start - next_end).days == 1
+
+    def test_closed_windows_repeat_across_days(self):
+        """Older windows are whole calendar-grid cells, so a run a few days later requests the same ranges."""
+        monday = list(fetch_data.chunk_windows(date(2026, 3, 2), date(2025, 6, 1)))
+        thursday = list(fetch_data.chunk_windows(date(2026, 3, 5), date(2025, 6, 1)))
+        assert set(monday[1:-1]) <= set(thursday)
+        for start, end in monday[1:-1]:
+            assert (start.toordinal() - 1) % fetch_data.series.CHUNK_DAYS == 0
+            assert (end - start).days + 1 == fetch_data.series.CHUNK_DAYS
+
+    def test_resized_windows_stay_on_the_grid(self):
+        """After the sizer shrinks or grows, each older window is still a whole cell, never cut down to a fragment."""
+        sizer = fetch_data.series.ChunkSizer()
+        sizes = iter([14, 4, 100, 2, 256, 7, 32])
+        previous = None
+        for start, end in fetch_data.chunk_windows(date(2026, 3, 5), date(2020, 1, 1), sizer):
+            length = (end - start).days + 1
+            if previous is not None and start > date(2020, 1, 1):
+                cell = max(n for n in fetch_data.series.GRID_DAYS if n <= sizer.days)
+                assert (start.toordinal() - 1) % length == 0
+                assert length in fetch_data.series.GRID_DAYS
+                # A shrink takes effect at once; a grow may wait one window for the longer cell's boundary
+                assert length >= min(cell, previous)
+            previous = length
+            sizer.days = next(sizes, sizer.days)
+
+    def test_empty_when_no_range(self):
+        assert list(fetch_data.chunk_windows(date(2026, 1, 1), date(2026, 1, 1))) == []
+
+
+# ============================================================
+# RateLimiter / fetch_stations — concurrent fetching
+# ============================================================
+
+
+class TestRateLimiter:
+    def test_burst_then_waits_for_refill(self, monkeypatch):
+        sleep_calls = []
+        monkeypatch.setattr("fetch_data.time.monotonic", lambda: 100.0)
+        monkeypatch.setattr("fetch_data.time.sleep", lambda s: sleep_calls.append(s))
+
+        limiter = fetch_data.RateLimiter(rate=2.0, burst=2)
+        limiter.acquire()
+        limiter.acquire()
+        assert sleep_calls == []
+
+        # Third and fourth requests queue behind each other at 2 per second
+        limiter.acquire()
+        limiter.acquire()
+        assert sleep_calls == [0.5, 1.0]
+
+    def test_refills_over_time(self, monkeypatch):
+        now = [100.0]
+        sleep_calls = []
+        monkeypatch.setattr("fetch_data.time.monotonic", lambda: now[0])
+        monkeypatch.setattr("fetch_data.time.sleep", lambda s: sleep_calls.append(s))
+
+        limiter = fetch_data.RateLimiter(rate=1.0, burst=1)
+        limiter.acquire()
+        now[0] += 5.0  # idle time never banks more than `burst` tokens
+        limiter.acquire()
+        limiter.acquire()
+        assert sleep_calls == [1.0]
+
+
+class TestFetchStations:
+    def test_yields_in_station_order_with_workers(self, monkeypatch, capsys):
+        def mock_fetch_all(station, going_back_days, executor=None, lookahead=4, log=print, journal=None):
+            log(f"  fetched {station['id']}")
+            return [{"dateTime": "2026-01-01T00:00:00Z", "value": station["id"]}]
+
+        monkeypatch.setattr(fetch_data, "fetch_all_readings", mock_fetch_all)
+
+        stations = [{"id": str(i), "label": f"S{i}", "type": "level"} for i in range(6)]
+        serial = list(fetch_data.fetch_stations(stations, 2, workers=1))
+        serial_out = capsys.readouterr().out
+        concurrent = list(fetch_data.fetch_stations(stations, 2, workers=4))
+        concurrent_out = capsys.readouterr().out
+
+        assert [s["id"] for s, _ in concurrent] == [s["id"] for s in stations]
+        assert concurrent == serial
+        assert concurrent_out == serial_out
+
 
 # ============================================================
 # _atomic_write_csv — atomic file write helper
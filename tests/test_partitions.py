@@ -0,0 +1,120 @@
+"""Tests for partitions.py — monthly partitioned station storage."""
+
+import csv
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import partitions
+
+
+def row(timestamp, value="0.5"):
+    return [timestamp, value, "m", "50140", "Umberleigh"]
+
+
+# Three readings across two months, January's last one just before midnight UTC
+HISTORY = [row("2026-01-15T12:00:00Z"), row("2026-01-31T23:45:00Z"), row("2026-02-01T00:00:00Z")]
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+# ============================================================
+# save / merge — writes touch only the months that change
+# ============================================================
+
+
+class TestSave:
+    def test_splits_rows_by_month_with_index(self, tmp_path):
+        partitions.save(str(tmp_path), reversed(HISTORY))
+
+        assert read_csv(tmp_path / "2026-01.csv") == [partitions.HEADER, *HISTORY[:2]]
+        assert read_csv(tmp_path / "2026-02.csv") == [partitions.HEADER, HISTORY[2]]
+        index = json.loads((tmp_path / "index.json").read_text())
+        assert index["months"]["2026-01"] == {"first": "2026-01-15T12:00:00Z", "last": "2026-01-31T23:45:00Z", "rows": 2}
+
+    def test_unchanged_months_are_not_rewritten(self, tmp_path):
+        partitions.save(str(tmp_path), HISTORY)
+        inode = (tmp_path / "2026-01.csv").stat().st_ino
+
+        written = partitions.save(str(tmp_path), [*HISTORY, row("2026-02-01T00:15:00Z")])
+        assert written == 1
+        assert (tmp_path / "2026-01.csv").stat().st_ino == inode
+
+    def test_revised_value_rewrites_the_index(self, tmp_path):
+        """A month rewritten with the same first/last/rows still replaces index.json, which readers watch for changes."""
+        partitions.save(str(tmp_path), HISTORY)
+        inode = (tmp_path / "index.json").stat().st_ino
+
+        assert partitions.save(str(tmp_path), [*HISTORY[:2], row("2026-02-01T00:00:00Z", "0.9")]) == 1
+        assert (tmp_path / "index.json").stat().st_ino != inode
+
+        inode = (tmp_path / "index.json").stat().st_ino
+        assert partitions.save(str(tmp_path), [*HISTORY[:2], row("2026-02-01T00:00:00Z", "0.9")]) == 0
+        assert (tmp_path / "index.json").stat().st_ino == inode
+
+    def test_months_no_longer_present_are_removed(self, tmp_path):
+        partitions.save(str(tmp_path), HISTORY)
+        partitions.save(str(tmp_path), HISTORY[2:])
+
+        assert not (tmp_path / "2026-01.csv").exists()
+        assert list(partitions.load_index(str(tmp_path))) == ["2026-02"]
+
+
+class TestMerge:
+    def test_only_the_current_month_is_read_and_rewritten(self, tmp_path, monkeypatch):
+        partitions.save(str(tmp_path), HISTORY)
+        january = (tmp_path / "2026-01.csv").read_bytes()
+        read = []
+        original = partitions.read_month
+        monkeypatch.setattr(partitions, "read_month", lambda d, m: read.append(m) or original(d, m))
+
+        added = partitions.merge(str(tmp_path), [HISTORY[2], row("2026-02-01T00:15:00Z")])
+
+        assert added == 1
+        assert read == ["2026-02"]
+        assert (tmp_path / "2026-01.csv").read_bytes() == january
+        assert partitions.latest_time(str(tmp_path)) == "2026-02-01T00:15:00Z"
+        assert partitions.row_count(str(tmp_path)) == 4
+
+    def test_revised_value_replaces_stored_row(self, tmp_path):
+        partitions.save(str(tmp_path), HISTORY)
+
+        assert partitions.merge(str(tmp_path), [row("2026-02-01T00:00:00Z", "0.9")]) == 0
+        assert read_csv(tmp_path / "2026-02.csv")[1][1] == "0.9"
+
+
+# ============================================================
+# read_rows / migrate
+# ============================================================
+
+
+class TestReadRows:
+    def test_range_reads_only_overlapping_months(self, tmp_path, monkeypatch):
+        partitions.save(str(tmp_path), HISTORY)
+        read = []
+        original = partitions.read_month
+        monkeypatch.setattr(partitions, "read_month", lambda d, m: read.append(m) or original(d, m))
+
+        assert partitions.read_rows(str(tmp_path), start="2026-01-20T00:00:00Z") == HISTORY[1:]
+        assert partitions.read_rows(str(tmp_path), start="2026-02-01T00:00:00Z") == [HISTORY[2]]
+        assert read == ["2026-01", "2026-02", "2026-02"]
+
+
+class TestMigrate:
+    def test_single_file_is_split_and_removed(self, tmp_path):
+        single = tmp_path / "level_50140_umberleigh.csv"
+        with open(single, "w", newline="") as f:
+            csv.writer(f).writerows([partitions.HEADER, *HISTORY])
+
+        assert partitions.migrate(str(tmp_path), single.name) == 2
+        assert not single.exists()
+        assert partitions.is_partitioned(str(tmp_path), single.name)
+        assert partitions.read_rows(partitions.directory_for(str(tmp_path), single.name)) == HISTORY
+
+    def test_missing_file_is_skipped(self, tmp_path):
+        assert partitions.migrate(str(tmp_path), "level_50140_umberleigh.csv") is None
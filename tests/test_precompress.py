@@ -0,0 +1,45 @@
+"""Tests for precompress.py — compressed siblings and Accept-Encoding negotiation."""
+
+import gzip
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import precompress
+
+CSV = b"dateTime,value,unit,station_id,station_label\r\n" + b"".join(
+    f"2026-02-10T{h:02d}:{m:02d}:00Z,0.5{m},m,50140,Umberleigh\r\n".encode() for h in range(24) for m in range(0, 60, 15)
+)
+
+
+class TestNegotiate:
+    def test_prefers_server_order_and_honours_q(self):
+        assert precompress.negotiate("gzip, deflate") == "gzip"
+        assert precompress.negotiate("gzip;q=0, deflate") is None
+        assert precompress.negotiate("*;q=0.5") == next(iter(precompress.SUFFIXES))
+        assert precompress.negotiate("") is None
+
+    def test_identity_only(self):
+        assert precompress.negotiate("identity") is None
+
+
+class TestWriteSiblings:
+    def test_gzip_sibling_matches_source_and_mtime(self, tmp_path):
+        path = tmp_path / "level_50140_umberleigh.csv"
+        path.write_bytes(CSV)
+        precompress.write_siblings(str(path))
+
+        sibling = tmp_path / "level_50140_umberleigh.csv.gz"
+        assert gzip.decompress(sibling.read_bytes()) == CSV
+        assert sibling.stat().st_size < len(CSV) / 5
+        assert os.stat(sibling).st_mtime_ns == os.stat(path).st_mtime_ns
+
+    def test_small_file_drops_its_siblings(self, tmp_path):
+        path = tmp_path / "index.json"
+        (tmp_path / "index.json.gz").write_bytes(b"stale")
+        path.write_text('{"months": {}}\n')
+        precompress.write_siblings(str(path))
+
+        assert not (tmp_path / "index.json.gz").exists()
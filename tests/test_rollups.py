@@ -0,0 +1,82 @@
+"""Tests for rollups.py — hourly and daily rollups kept in side files."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import rollups
+
+FILENAME = "level_50140_umberleigh.csv"
+
+# Two days of readings: 10:00 and 10:30 on the 9th, 23:45 on the 9th, 00:00 and 00:15 on the 10th
+ROWS = [
+    ["2026-02-09T10:00:00Z", "0.5"],
+    ["2026-02-09T10:30:00Z", "0.7"],
+    ["2026-02-09T23:45:00Z", "0.6"],
+    ["2026-02-10T00:00:00Z", "0.8"],
+    ["2026-02-10T00:15:00Z", "1.0"],
+]
+
+
+class TestAggregate:
+    def test_level_min_max_mean(self):
+        assert rollups.aggregate(ROWS, "level", "daily") == [
+            ["2026-02-09", "3", "0.5", "0.7", "0.6"],
+            ["2026-02-10", "2", "0.8", "1", "0.9"],
+        ]
+        assert rollups.aggregate(ROWS, "tidal", "hourly")[0] == ["2026-02-09T10:00:00Z", "2", "0.5", "0.7", "0.6"]
+
+    def test_rainfall_totals_skip_missing_values(self):
+        rows = [["2026-02-09T10:00:00Z", "0.2"], ["2026-02-09T10:15:00Z", ""], ["2026-02-09T10:30:00Z", "0.4"]]
+        assert rollups.aggregate(rows, "rainfall", "hourly") == [["2026-02-09T10:00:00Z", "2", "0.6"]]
+
+
+class TestUpdate:
+    def test_only_days_from_since_are_recomputed(self, tmp_path):
+        """Earlier periods are kept as stored; the touched day is rebuilt from the rows passed in."""
+        assert rollups.rebuild(str(tmp_path), FILENAME, "level", ROWS) == 2
+        new = ["2026-02-10T00:30:00Z", "1.2"]
+
+        assert rollups.update(str(tmp_path), FILENAME, "level", "2026-02-10T00:00:00Z", [*ROWS[3:], new])
+
+        assert rollups.read(str(tmp_path), FILENAME, "daily") == [
+            ["2026-02-09", "3", "0.5", "0.7", "0.6"],
+            ["2026-02-10", "3", "0.8", "1.2", "1"],
+        ]
+        assert rollups.read(str(tmp_path), FILENAME, "hourly") == rollups.aggregate([*ROWS, new], "level", "hourly")
+
+    def test_only_the_tail_is_read_and_rewritten(self, tmp_path, monkeypatch):
+        """Rows before `since` stay where they are on disk; the file is cut back and appended to, not re-read."""
+        rows = [[f"2026-02-{d:02d}T{h:02d}:00:00Z", f"0.{d}"] for d in range(1, 11) for h in range(24)]
+        rollups.rebuild(str(tmp_path), FILENAME, "level", rows)
+        path = rollups.path_for(str(tmp_path), FILENAME, "hourly")
+        before = Path(path).read_bytes()
+        monkeypatch.setattr(rollups, "TAIL_BLOCK_SIZE", 64)
+        monkeypatch.setattr(rollups, "read", lambda *args: pytest.fail("whole file read"))
+        new = ["2026-02-10T00:30:00Z", "1.5"]
+
+        assert rollups.update(str(tmp_path), FILENAME, "level", "2026-02-10T00:00:00Z", [*rows[-24:], new])
+
+        after = Path(path).read_bytes()
+        kept = before[: before.index(b"2026-02-10T00")]
+        assert after.startswith(kept)
+        monkeypatch.undo()
+        assert rollups.read(str(tmp_path), FILENAME, "hourly") == rollups.aggregate([*rows, new], "level", "hourly")
+        assert rollups.read(str(tmp_path), FILENAME, "daily") == rollups.aggregate([*rows, new], "level", "daily")
+
+    def test_station_without_rollups_is_left_alone(self, tmp_path):
+        assert not rollups.update(str(tmp_path), FILENAME, "level", "2026-02-10T00:00:00Z", ROWS[3:])
+        assert not (tmp_path / rollups.DIRECTORY).exists()
+
+
+class TestRead:
+    def test_periods_overlapping_the_range(self, tmp_path):
+        rollups.rebuild(str(tmp_path), FILENAME, "level", ROWS)
+
+        assert [r[0] for r in rollups.read(str(tmp_path), FILENAME, "daily", start="2026-02-09T12:00:00Z")] == ["2026-02-09", "2026-02-10"]
+        assert [r[0] for r in rollups.read(str(tmp_path), FILENAME, "hourly", "2026-02-09T10:30:00Z", "2026-02-09T22:59:00Z")] == [
+            "2026-02-09T10:00:00Z"
+        ]
@@ -0,0 +1,138 @@
+"""Tests for series.py — adaptive chunk sizing and range bisection."""
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import series
+
+# ============================================================
+# ChunkSizer — grows and shrinks chunk length from feedback
+# ============================================================
+
+
+class TestChunkSizer:
+    def test_sparse_station_grows_towards_max(self):
+        """A gauge returning few rows doubles its chunk length each step, up to the cap."""
+        sizer = series.ChunkSizer()
+        for _ in range(10):
+            sizer.observe(sizer.days, rows=50, seconds=0.5)
+        assert sizer.days == series.MAX_CHUNK_DAYS
+
+    def test_dense_station_settles_near_target_rows(self):
+        sizer = series.ChunkSizer(target_rows=1000)
+        for _ in range(5):
+            sizer.observe(sizer.days, rows=sizer.days * 96, seconds=0.5)  # 15-minute readings
+        assert 9 <= sizer.days <= 11
+
+    def test_short_chunk_under_target_does_not_shrink(self):
+        """A chunk cut short (by the grid or the range) but under target keeps the current length."""
+        sizer = series.ChunkSizer()
+        sizer.observe(3, rows=50, seconds=0.5)
+        assert sizer.days == series.CHUNK_DAYS
+
+    def test_slow_response_shrinks_chunk(self):
+        sizer = series.ChunkSizer(target_seconds=10)
+        sizer.observe(28, rows=100, seconds=20)
+        assert sizer.days == 14
+
+    def test_shrink_is_bounded_per_step(self):
+        """One pathological chunk can cut the length by at most 4x, never below the minimum."""
+        sizer = series.ChunkSizer()
+        sizer.observe(28, rows=1_000_000, seconds=600)
+        assert sizer.days == 7
+        for _ in range(5):
+            sizer.observe(sizer.days, rows=1_000_000, seconds=600)
+        assert sizer.days == series.MIN_CHUNK_DAYS
+
+
+# ============================================================
+# fetch_bisecting — split failing ranges instead of dropping them
+# ============================================================
+
+
+def days_between(start, end):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class TestFetchBisecting:
+    def test_success_needs_one_request(self):
+        calls = []
+
+        def fetch(start, end):
+            calls.append((start, end))
+            return days_between(start, end)
+
+        result = series.fetch_bisecting(fetch, date(2026, 1, 1), date(2026, 1, 28))
+        assert calls == [(date(2026, 1, 1), date(2026, 1, 28))]
+        assert len(result) == 28
+
+    def test_oversized_range_is_split_until_it_succeeds(self):
+        """Ranges longer than a week fail (as a timing-out request would); halves are retried."""
+
+        def fetch(start, end):
+            return days_between(start, end) if (end - start).days < 7 else None
+
+        result = series.fetch_bisecting(fetch, date(2026, 1, 1), date(2026, 1, 28))
+        assert sorted(result) == days_between(date(2026, 1, 1), date(2026, 1, 28))
+
+    def test_bad_day_is_isolated(self):
+        """A day that always fails is reported in `gaps`; the rest of the range comes back, newer readings first."""
+        bad = date(2026, 1, 10)
+
+        def fetch(start, end):
+            return None if start <= bad <= end else days_between(start, end)
+
+        gaps = []
+        result = series.fetch_bisecting(fetch, date(2026, 1, 1), date(2026, 1, 28), gaps)
+        assert gaps == [bad]
+        assert bad not in result
+        assert len(result) == 27
+        assert result[0] > bad
+
+    def test_unresolvable_day_fails_the_range_without_gaps(self):
+        """Without `gaps` to report it in, a permanently failing day isn't silently dropped."""
+        bad = date(2026, 1, 10)
+
+        def fetch(start, end):
+            return None if start <= bad <= end else days_between(start, end)
+
+        assert series.fetch_bisecting(fetch, date(2026, 1, 1), date(2026, 1, 28)) is None
+
+    def test_gives_up_quickly_when_nothing_succeeds(self):
+        """When the API is down, a failing range costs about log2(days) requests, not one per day."""
+        calls = []
+
+        def fetch(start, end):
+            calls.append((start, end))
+
+        assert series.fetch_bisecting(fetch, date(2026, 1, 1), date(2026, 1, 28)) is None
+        assert len(calls) == 5
+        assert calls[-1] == (date(2026, 1, 28), date(2026, 1, 28))
+
+
+# ============================================================
+# lttb — downsampling that keeps peaks
+# ============================================================
+
+
+class TestLttb:
+    def test_keeps_endpoints_and_count(self):
+        xs = list(range(1000))
+        keep = series.lttb(xs, [x % 7 for x in xs], 50)
+        assert len(keep) == 50
+        assert keep[0] == 0 and keep[-1] == 999
+        assert keep == sorted(set(keep))
+
+    def test_keeps_a_peak_that_striding_would_miss(self):
+        """A one-reading spike survives, where every-20th-point sampling steps over it."""
+        ys = [0.5] * 1000
+        ys[333] = 3.2
+        keep = series.lttb(range(1000), ys, 50)
+        assert 333 in keep
+        assert 333 not in range(0, 1000, 20)
+
+    def test_short_series_returned_whole(self):
+        assert series.lttb([0, 1, 2], [1.0, 2.0, 3.0], 10) == [0, 1, 2]
@@ -1,18 +1,27 @@
 """Tests for serve.py — dev server logic (non-HTTP functions)."""
 
 import csv
+import io
 import json
 import os
 import sys
-from datetime import UTC, datetime, timedelta
+import threading
+import time
+from datetime import UTC, date, datetime, timedelta
 from pathlib import Path
 from unittest.mock import MagicMock
 from urllib.error import URLError
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import colstore
+import partitions
+import rollups
 import serve
-from tests.conftest import make_mock_urlopen
+import snapshot
+from tests.conftest import make_mock_response
 
 # ============================================================
 # api_get — retries with exponential backoff and jitter
@@ -21,8 +30,8 @@ from tests.conftest import make_mock_urlopen
 
 class TestServeApiGet:
     def test_success(self, monkeypatch):
-        mock_resp = make_mock_urlopen({"items": [{"value": 1}]})
-        monkeypatch.setattr("serve.urllib.request.urlopen", lambda *a, **kw: mock_resp)
+        mock_resp = make_mock_response({"items": [{"value": 1}]})
+        monkeypatch.setattr("ea_client.request", lambda *a, **kw: mock_resp)
 
         result = serve.api_get("http://example.com/test")
         assert result == {"items": [{"value": 1}]}
@@ -35,7 +44,7 @@ class TestServeApiGet:
             call_count += 1
             raise URLError("connection failed")
 
-        monkeypatch.setattr("serve.urllib.request.urlopen", fail)
+        monkeypatch.setattr("ea_client.request", fail)
         monkeypatch.setattr("serve._time.sleep", lambda _: None)
         result = serve.api_get("http://example.com/test")
         assert result is None
@@ -47,23 +56,23 @@ class TestServeApiGet:
         mock_resp.__enter__ = lambda s: s
         mock_resp.__exit__ = MagicMock(return_value=False)
 
-        monkeypatch.setattr("serve.urllib.request.urlopen", lambda *a, **kw: mock_resp)
+        monkeypatch.setattr("ea_client.request", lambda *a, **kw: mock_resp)
         monkeypatch.setattr("serve._time.sleep", lambda _: None)
         result = serve.api_get("http://example.com/test")
         assert result is None
 
     def test_retry_then_success(self, monkeypatch):
         call_count = 0
-        mock_resp = make_mock_urlopen({"items": []})
+        mock_resp = make_mock_response({"items": []})
 
-        def fake_urlopen(*args, **kwargs):
+        def fake_request(*args, **kwargs):
             nonlocal call_count
             call_count += 1
             if call_count < 3:
                 raise URLError("connection failed")
             return mock_resp
 
-        monkeypatch.setattr("serve.urllib.request.urlopen", fake_urlopen)
+        monkeypatch.setattr("ea_client.request", fake_request)
         monkeypatch.setattr("serve._time.sleep", lambda _: None)
 
         result = serve.api_get("http://example.com/test", retries=3)
@@ -76,7 +85,7 @@ class TestServeApiGet:
         def always_fail(*args, **kwargs):
             raise URLError("connection failed")
 
-        monkeypatch.setattr("serve.urllib.request.urlopen", always_fail)
+        monkeypatch.setattr("ea_client.request", always_fail)
         monkeypatch.setattr("serve._time.sleep", lambda s: sleep_calls.append(s))
 
         serve.api_get("http://example.com/test", retries=3)
@@ -85,6 +94,46 @@ class TestServeApiGet:
         assert 1.0 <= sleep_calls[0] < 2.0  # 2^0 + jitter
         assert 2.0 <= sleep_calls[1] < 3.0  # 2^1 + jitter
 
+    def test_concurrent_requests_per_host_are_capped(self, monkeypatch):
+        active = peak = 0
+        lock = threading.Lock()
+
+        def read():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return b"{}"
+
+        mock_resp = make_mock_response({})
+        mock_resp.read.side_effect = read
+        monkeypatch.setattr("ea_client.request", lambda *a, **kw: mock_resp)
+        monkeypatch.setattr(serve, "MAX_REQUESTS_PER_HOST", 2)
+        monkeypatch.setattr(serve, "_host_slots", {})
+
+        threads = [threading.Thread(target=serve.api_get, args=(f"http://example.com/test/{i}",)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak == 2
+
+    def test_since_and_latest_queries_skip_the_response_cache(self, monkeypatch):
+        calls = []
+
+        def fake_request(url, **kwargs):
+            calls.append(kwargs["use_cache"])
+            return make_mock_response({"items": []})
+
+        monkeypatch.setattr("ea_client.request", fake_request)
+        serve.api_get("http://example.com/data/readings?since=2026-02-10T10:00:00Z&_limit=10")
+        serve.api_get("http://example.com/data/readings?latest")
+        serve.api_get("http://example.com/id/measures/m/readings?startdate=2026-01-01&enddate=2026-01-28")
+        assert calls == [False, False, True]
+
 
 # ============================================================
 # refresh_station — filesystem + HTTP mocking
@@ -162,6 +211,26 @@ class TestRefreshStation:
         result = serve.refresh_station(station)
         assert result["new_readings"] >= 1
 
+    def test_large_gap_bisects_failed_chunk(self, data_dir, monkeypatch):
+        """A gap chunk that fails is split and retried rather than dropped."""
+        station = serve.STATIONS[0]
+        ten_days_ago = datetime.now(UTC) - timedelta(days=10)
+        self._write_csv(
+            data_dir, station["file"], [[ten_days_ago.strftime("%Y-%m-%dT%H:%M:%SZ"), "0.500", "m", station["id"], station["label"]]]
+        )
+
+        def mock_api_get(url):
+            query = dict(part.split("=", 1) for part in url.split("?", 1)[1].split("&") if "=" in part)
+            start, end = date.fromisoformat(query["startdate"]), date.fromisoformat(query["enddate"])
+            if (end - start).days > 3:
+                return None  # timed out after retries
+            return {"items": [{"dateTime": f"{start}T12:00:00Z", "value": 0.6}, {"dateTime": f"{end}T12:00:00Z", "value": 0.6}]}
+
+        monkeypatch.setattr(serve, "api_get", mock_api_get)
+
+        result = serve.refresh_station(station)
+        assert result["new_readings"] >= 8
+
     def test_deduplicates_readings(self, data_dir, monkeypatch):
         """New readings with same dateTime as existing are not duplicated."""
         station = serve.STATIONS[0]
@@ -181,6 +250,24 @@ class TestRefreshStation:
         assert result["new_readings"] == 0
         assert result["total"] == 1
 
+    def test_revised_value_replaces_stored_reading(self, data_dir, monkeypatch):
+        """A reading the API has revised overwrites the stored value in place."""
+        station = serve.STATIONS[0]
+        base = datetime.now(UTC) - timedelta(hours=2)
+        times = [(base + timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(3)]
+        self._write_csv(data_dir, station["file"], [[t, "0.5", "m", station["id"], station["label"]] for t in times])
+
+        # Newest-first, as the API returns with _sorted
+        items = [{"dateTime": "2099-01-01T00:00:00Z", "value": 0.7}, {"dateTime": times[1], "value": 0.65}]
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": items})
+
+        result = serve.refresh_station(station)
+        assert result["new_readings"] == 1
+        assert result["total"] == 4
+        with open(data_dir / station["file"]) as f:
+            rows = list(csv.DictReader(f))
+        assert [r["value"] for r in rows] == ["0.5", "0.65", "0.5", "0.7"]
+
     def test_tidal_station_unit(self, data_dir, monkeypatch):
         """Tidal station CSV rows use mAOD unit."""
         # Find the tidal station
@@ -196,6 +283,267 @@ class TestRefreshStation:
             rows = list(csv.DictReader(f))
         assert rows[0]["unit"] == "mAOD"
 
+    def test_csv_format_streams_readings_csv(self, data_dir, monkeypatch):
+        """With READINGS_FORMAT = 'csv', readings.csv rows are merged into the station CSV."""
+        body = b"dateTime,measure,value\r\n2026-02-20T10:00:00Z,m,0.55\r\n2026-02-20T10:15:00Z,m,0.56\r\n"
+        urls = []
+
+        def fake_request(url, **kw):
+            urls.append(url)
+            return io.BytesIO(body)
+
+        monkeypatch.setattr("ea_client.request", fake_request)
+        monkeypatch.setattr(serve, "READINGS_FORMAT", "csv")
+
+        station = serve.STATIONS[0]
+        result = serve.refresh_station(station)
+        assert result["new_readings"] == 2
+        assert "/readings.csv?" in urls[0]
+        with open(data_dir / station["file"]) as f:
+            rows = list(csv.DictReader(f))
+        assert rows[1]["value"] == "0.56"
+
+    def test_partitioned_station_rewrites_only_new_months(self, data_dir, monkeypatch):
+        """Once migrated to monthly files, a refresh leaves older months untouched."""
+        station = serve.STATIONS[0]
+        directory = partitions.directory_for(str(data_dir), station["file"])
+        now = datetime.now(UTC)
+        last = (now - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        new = (now - timedelta(minutes=15)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        partitions.save(
+            directory,
+            [["2025-01-15T12:00:00Z", "0.4", "m", station["id"], station["label"]], [last, "0.5", "m", station["id"], station["label"]]],
+        )
+        old_month = Path(directory) / "2025-01.csv"
+        inode = old_month.stat().st_ino
+
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [{"dateTime": last, "value": 0.5}, {"dateTime": new, "value": 0.55}]})
+        result = serve.refresh_station(station)
+
+        assert (result["new_readings"], result["total"]) == (1, 3)
+        assert old_month.stat().st_ino == inode
+        assert partitions.latest_time(directory) == new
+        assert not (data_dir / station["file"]).exists()
+
+    def test_binary_store_follows_csv(self, data_dir, monkeypatch):
+        """With BINARY_STORE, the .bin copy is built from the CSV, then merged on later refreshes."""
+        station = serve.STATIONS[0]
+        now = datetime.now(UTC)
+        times = [(now - timedelta(minutes=m)).strftime("%Y-%m-%dT%H:%M:%SZ") for m in (45, 30, 15)]
+        self._write_csv(data_dir, station["file"], [[times[0], "0.500", "m", station["id"], station["label"]]])
+        monkeypatch.setattr(serve, "BINARY_STORE", True)
+
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [{"dateTime": times[1], "value": 0.51}]})
+        serve.refresh_station(station)
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [{"dateTime": times[2], "value": 0.52}]})
+        serve.refresh_station(station)
+
+        with colstore.open_series(colstore.path_for(str(data_dir), station["file"])) as s:
+            assert s.readings() == [{"dateTime": t, "value": v} for t, v in zip(times, (0.5, 0.51, 0.52), strict=True)]
+
+        # A refresh that only repeats the last stored reading leaves the file alone
+        inode = os.stat(colstore.path_for(str(data_dir), station["file"])).st_ino
+        serve.refresh_station(station)
+        assert os.stat(colstore.path_for(str(data_dir), station["file"])).st_ino == inode
+
+
+# ============================================================
+# readings_in_range — binary search over the stored series
+# ============================================================
+
+
+class TestReadingsInRange:
+    TIMES = ("2026-02-10T10:00:00Z", "2026-02-10T10:15:00Z", "2026-02-10T10:30:00Z", "2026-02-10T10:45:00Z")
+
+    @staticmethod
+    def rows(station, times):
+        return [[t, f"0.5{i}", "m", station["id"], station["label"]] for i, t in enumerate(times)]
+
+    def write_csv(self, data_dir, station, times):
+        with open(data_dir / station["file"], "w", newline="") as f:
+            csv.writer(f).writerows([partitions.HEADER, *self.rows(station, times)])
+
+    def test_range_from_cached_series(self, data_dir, monkeypatch):
+        """Bounds are inclusive; the CSV is parsed once."""
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES)
+        loads = []
+        original = serve._stored_rows
+        monkeypatch.setattr(serve, "_stored_rows", lambda s: loads.append(s["id"]) or original(s))
+
+        assert serve.readings_in_range(station, self.TIMES[1], self.TIMES[2]) == [(self.TIMES[1], 0.51), (self.TIMES[2], 0.52)]
+        assert serve.readings_in_range(station, "2026-02-10T10:20:00Z") == [(self.TIMES[2], 0.52), (self.TIMES[3], 0.53)]
+        assert len(loads) == 1
+
+    def test_partitioned_station(self, data_dir):
+        station = serve.STATIONS[0]
+        partitions.save(partitions.directory_for(str(data_dir), station["file"]), self.rows(station, ["2026-01-31T23:45:00Z", *self.TIMES]))
+
+        assert [t for t, _ in serve.readings_in_range(station, end="2026-02-10T10:00:00Z")] == ["2026-01-31T23:45:00Z", self.TIMES[0]]
+
+    def test_binary_file_used_only_when_current(self, data_dir, monkeypatch):
+        """A .bin older than the CSV (written by something else) is bypassed."""
+        monkeypatch.setattr(serve, "BINARY_STORE", True)
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES)
+        bin_path = colstore.path_for(str(data_dir), station["file"])
+        colstore.write(bin_path, [(t, 0.9) for t in self.TIMES])
+
+        assert serve.readings_in_range(station, self.TIMES[3]) == [(self.TIMES[3], 0.9)]
+        os.utime(bin_path, (0, 0))
+        assert serve.readings_in_range(station, self.TIMES[3]) == [(self.TIMES[3], 0.53)]
+
+    def test_missing_station_data(self, data_dir):
+        assert serve.readings_in_range(serve.STATIONS[0]) == []
+
+    def test_readings_since_excludes_the_watermark(self, data_dir):
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES)
+
+        assert serve.readings_since(station, self.TIMES[2]) == [(self.TIMES[3], 0.53)]
+        assert serve.readings_since(station, self.TIMES[3]) == []
+
+    def test_downsampled_range_is_cached_until_refresh_writes(self, data_dir, monkeypatch):
+        monkeypatch.setattr(serve, "_downsampled", {})
+        station = serve.STATIONS[0]
+        now = datetime.now(UTC).replace(second=0, microsecond=0)
+        times = [(now - timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(100, 0, -1)]
+        self.write_csv(data_dir, station, times)
+
+        first = serve.downsampled_range(station, None, None, 10)
+        assert len(first) == 10
+        assert (first[0][0], first[-1][0]) == (times[0], times[-1])
+        assert serve.downsampled_range(station, None, None, 10) is first
+
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [{"dateTime": now.strftime("%Y-%m-%dT%H:%M:%SZ"), "value": 0.9}]})
+        serve.refresh_station(station)
+        assert serve._downsampled == {}
+        assert serve.downsampled_range(station, None, None, 10)[-1] == (now.strftime("%Y-%m-%dT%H:%M:%SZ"), 0.9)
+
+    def test_rollups_built_on_first_use_then_kept_by_refresh(self, data_dir, monkeypatch):
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES)
+        assert serve.station_rollups(station, "daily", None, None) == [["2026-02-10", 4, 0.5, 0.53, 0.515]]
+
+        update = []
+        monkeypatch.setattr(rollups, "update", lambda *args: update.append(args))
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [{"dateTime": "2026-02-10T11:00:00Z", "value": 0.6}]})
+        serve.refresh_station(station)
+
+        ((_, _, _, since, rows),) = update
+        assert since == "2026-02-10T00:00:00Z"
+        assert [row[0] for row in rows] == [*self.TIMES, "2026-02-10T11:00:00Z"]
+
+    def test_rollups_rebuilt_after_an_external_write(self, data_dir):
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES)
+        serve.station_rollups(station, "hourly", None, None)
+        os.utime(rollups.path_for(str(data_dir), station["file"], "hourly"), (0, 0))
+        self.write_csv(data_dir, station, self.TIMES[:2])
+
+        assert serve.station_rollups(station, "hourly", None, None) == [["2026-02-10T10:00:00Z", 2, 0.5, 0.51, 0.505]]
+
+
+# ============================================================
+# station_series — in-memory series kept current with the files
+# ============================================================
+
+
+class TestSeriesCache:
+    TIMES = TestReadingsInRange.TIMES
+    rows = staticmethod(TestReadingsInRange.rows)
+    write_csv = TestReadingsInRange.write_csv
+
+    @pytest.fixture
+    def loads(self, monkeypatch):
+        """Stations whose stored rows are read in full."""
+        loads = []
+        original = serve._stored_rows
+        monkeypatch.setattr(serve, "_stored_rows", lambda s: loads.append(s["id"]) or original(s))
+        return loads
+
+    def test_unchanged_file_is_not_read_again(self, data_dir, loads):
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES)
+        first = serve.station_series(station)
+        assert serve.station_series(station) is first
+        assert first.times == list(self.TIMES)
+        assert loads == [station["id"]]
+
+    def test_rows_appended_in_place_are_read_on_their_own(self, data_dir, loads):
+        """fetch_data.py --recent appends to the CSV; only the new rows are parsed."""
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES[:2])
+        serve.station_series(station)
+        with open(data_dir / station["file"], "a", newline="") as f:
+            csv.writer(f).writerows(self.rows(station, self.TIMES)[2:])
+
+        assert serve.station_series(station).times == list(self.TIMES)
+        assert len(loads) == 1
+
+    def test_rewritten_file_is_reloaded(self, data_dir, loads):
+        """An atomic rewrite (a new inode) or an edit that isn't an append reloads the station."""
+        station = serve.STATIONS[0]
+        self.write_csv(data_dir, station, self.TIMES)
+        serve.station_series(station)
+
+        replacement = data_dir / "replacement.csv"
+        with open(replacement, "w", newline="") as f:
+            csv.writer(f).writerows([partitions.HEADER, *self.rows(station, ["2026-02-09T10:00:00Z", *self.TIMES])])
+        os.replace(replacement, data_dir / station["file"])
+        assert serve.station_series(station).times[0] == "2026-02-09T10:00:00Z"
+
+        self.write_csv(data_dir, station, [self.TIMES[0], "2026-02-10T12:00:00Z", "2026-02-10T12:15:00Z", "2026-02-10T12:30:00Z"])
+        assert serve.station_series(station).times[1] == "2026-02-10T12:00:00Z"
+        assert len(loads) == 3
+
+    def test_partitioned_station_rereads_changed_months(self, data_dir, loads, monkeypatch):
+        station = serve.STATIONS[0]
+        directory = partitions.directory_for(str(data_dir), station["file"])
+        partitions.save(directory, self.rows(station, ["2026-01-31T23:45:00Z", *self.TIMES[:2]]))
+        serve.station_series(station)
+
+        starts = []
+        read_rows = partitions.read_rows
+        monkeypatch.setattr(partitions, "read_rows", lambda d, start="": starts.append(start) or read_rows(d, start=start))
+        partitions.merge(directory, self.rows(station, self.TIMES[2:]))
+
+        assert serve.station_series(station).times == ["2026-01-31T23:45:00Z", *self.TIMES]
+        assert starts == ["2026-02"]
+        assert len(loads) == 1
+
+    def test_rewritten_index_swaps_in_a_new_entry(self, data_dir, loads):
+        """An index rewritten with no month changed restamps the series in a new entry; the one readers hold is untouched."""
+        station = serve.STATIONS[0]
+        directory = partitions.directory_for(str(data_dir), station["file"])
+        partitions.save(directory, self.rows(station, self.TIMES))
+        held = serve.station_series(station)
+        stamp = held.stamp
+
+        partitions._save_index(directory, partitions.load_index(directory))
+        fresh = serve.station_series(station)
+
+        assert fresh is not held
+        assert held.stamp == stamp
+        assert fresh.stamp != stamp
+        assert fresh.rows is held.rows
+        assert serve.station_series(station) is fresh
+        assert len(loads) == 1
+
+    @pytest.mark.parametrize("partitioned", [False, True])
+    def test_refresh_updates_the_cache_without_reading_it_back(self, data_dir, loads, monkeypatch, partitioned):
+        station = serve.STATIONS[0]
+        if partitioned:
+            partitions.save(partitions.directory_for(str(data_dir), station["file"]), self.rows(station, self.TIMES))
+        else:
+            self.write_csv(data_dir, station, self.TIMES)
+        assert serve.load_series_cache() == 4
+
+        monkeypatch.setattr(serve, "_stored_rows", lambda s: pytest.fail("re-read after a refresh"))
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [{"dateTime": "2026-02-10T11:00:00Z", "value": 0.6}]})
+        assert serve.refresh_station(station)["total"] == 5
+        assert serve.station_series(station).times[-1] == "2026-02-10T11:00:00Z"
+
 
 # ============================================================
 # write_pid / read_pid — PID file management
@@ -232,7 +580,10 @@ class TestPidFile:
 
 class TestHandleRefresh:
     def test_returns_valid_json(self, monkeypatch):
-        monkeypatch.setattr(serve, "refresh_station", lambda s: {"id": s["id"], "label": s["label"], "new_readings": 0, "total": 100})
+        monkeypatch.setattr(serve, "fetch_batch_readings", lambda stations: {})
+        monkeypatch.setattr(
+            serve, "refresh_station", lambda s, batch_items=None: {"id": s["id"], "label": s["label"], "new_readings": 0, "total": 100}
+        )
 
         result_json = serve.handle_refresh()
         result = json.loads(result_json)
@@ -241,19 +592,167 @@ class TestHandleRefresh:
         assert "timestamp" in result
         assert len(result["details"]) == len(serve.STATIONS)
 
-    def test_counts_updated_stations(self, monkeypatch):
-        call_idx = 0
-
-        def mock_refresh(s):
-            nonlocal call_idx
-            call_idx += 1
-            nr = 5 if call_idx <= 3 else 0  # first 3 stations get new readings
+    def test_counts_updated_stations(self, data_dir, monkeypatch):
+        def mock_refresh(s, batch_items=None):
+            nr = 5 if s in serve.STATIONS[:3] else 0  # first 3 stations get new readings
             return {"id": s["id"], "label": s["label"], "new_readings": nr, "total": 100}
 
         monkeypatch.setattr(serve, "refresh_station", mock_refresh)
+        monkeypatch.setattr(serve, "fetch_batch_readings", lambda stations: {})
         result = json.loads(serve.handle_refresh())
         assert result["stations_updated"] == 3
 
+    def test_stations_refresh_concurrently(self, monkeypatch):
+        """The first REFRESH_WORKERS stations can only get past the barrier together."""
+        monkeypatch.setattr(serve, "REFRESH_WORKERS", 3)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def mock_refresh(s, batch_items=None):
+            if s in serve.STATIONS[:3]:
+                barrier.wait()
+            return {"id": s["id"], "label": s["label"], "new_readings": 0, "total": 100}
+
+        monkeypatch.setattr(serve, "refresh_station", mock_refresh)
+        monkeypatch.setattr(serve, "fetch_batch_readings", lambda stations: {})
+        result = serve.refresh_all()
+        assert not any("error" in d for d in result["details"])
+
+    def test_details_stay_in_station_order(self, data_dir, monkeypatch):
+        stations = serve.STATIONS[:4]
+        finished = []
+
+        def mock_refresh(s, batch_items=None):
+            time.sleep(0.05 * (len(stations) - stations.index(s)))  # the last station finishes first
+            if s is stations[1]:
+                raise OSError("disk full")
+            return {"id": s["id"], "label": s["label"], "new_readings": 1, "total": 100}
+
+        monkeypatch.setattr(serve, "refresh_station", mock_refresh)
+        monkeypatch.setattr(serve, "fetch_batch_readings", lambda stations: {})
+        result = serve.refresh_all(lambda r: finished.append(r["id"]), stations)
+
+        assert [d["id"] for d in result["details"]] == [s["id"] for s in stations]
+        assert finished == [s["id"] for s in reversed(stations)]
+        assert result["details"][1]["error"] == "disk full"
+        assert result["stations_updated"] == 3
+
+
+# ============================================================
+# fetch_batch_readings — stations covered by /data/readings?latest
+# ============================================================
+
+
+def iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class TestBatchRefresh:
+    def _seed(self, data_dir, station, latest):
+        with open(data_dir / station["file"], "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+            writer.writerow([iso(latest), "0.5", "m", station["id"], station["label"]])
+
+    def test_latest_readings_spare_per_measure_requests(self, data_dir, monkeypatch):
+        """One /data/readings?latest query covers stations with nothing new or a single new reading."""
+        last = datetime.now(UTC).replace(second=0, microsecond=0) - timedelta(minutes=20)
+        one_step, unchanged, ahead = serve.STATIONS[0], serve.STATIONS[1], serve.STATIONS[2]
+        for station in (one_step, unchanged, ahead):
+            self._seed(data_dir, station, last)
+        measure_url = "http://environment.data.gov.uk/flood-monitoring/id/measures/"
+        latest_items = [
+            {"measure": measure_url + one_step["measureId"], "dateTime": iso(last + timedelta(minutes=15)), "value": 0.6},
+            {"measure": measure_url + unchanged["measureId"], "dateTime": iso(last), "value": 0.5},
+            {"measure": measure_url + ahead["measureId"], "dateTime": iso(last + timedelta(hours=1)), "value": 0.7},
+            {"measure": measure_url + "99999-level-stage-i-15_min-m", "dateTime": iso(last), "value": 9.9},
+        ]
+        urls = []
+
+        def mock_api_get(url):
+            urls.append(url)
+            return {"items": latest_items if "/data/readings?" in url else []}
+
+        monkeypatch.setattr(serve, "api_get", mock_api_get)
+        monkeypatch.setattr(serve, "BATCH_MIN_STATIONS", 3)
+
+        result = serve.refresh_all(stations=serve.STATIONS[:3])
+        batch_urls = [u for u in urls if "/data/readings?" in u]
+        assert len(batch_urls) == 1
+        assert "/data/readings?latest&" in batch_urls[0]
+        assert not any(one_step["measureId"] in u or unchanged["measureId"] in u for u in urls)
+        assert any(ahead["measureId"] in u for u in urls)  # several new readings: per-measure request
+        details = {d["id"]: d for d in result["details"]}
+        assert details[one_step["id"]]["new_readings"] == 1
+        assert details[unchanged["id"]]["new_readings"] == 0
+
+    def test_small_refresh_skips_batch(self, data_dir, monkeypatch):
+        """A poll of a station or two makes its own since= requests rather than downloading the ?latest feed."""
+        for station in serve.STATIONS[:2]:
+            self._seed(data_dir, station, datetime.now(UTC))
+        urls = []
+
+        def mock_api_get(url):
+            urls.append(url)
+            return {"items": []}
+
+        monkeypatch.setattr(serve, "api_get", mock_api_get)
+
+        serve.refresh_all(stations=serve.STATIONS[:2])
+        assert len(urls) == 2
+        assert not any("/data/readings?" in u for u in urls)
+
+    def test_pages_until_short_page(self, data_dir, monkeypatch):
+        monkeypatch.setattr(serve, "BATCH_PAGE_SIZE", 2)
+        monkeypatch.setattr(serve, "MAX_BATCH_PAGES", 3)
+        station = serve.STATIONS[0]
+        now = datetime.now(UTC).replace(second=0, microsecond=0)
+        self._seed(data_dir, station, now)
+        other = {"measure": "other-measure", "dateTime": iso(now), "value": 0.6}
+        item = {"measure": station["measureId"], "dateTime": iso(now + timedelta(minutes=15)), "value": 0.6}
+        pages = [[other, other], [other, other], [item]]
+        urls = []
+
+        def mock_api_get(url):
+            urls.append(url)
+            return {"items": pages[len(urls) - 1]}
+
+        monkeypatch.setattr(serve, "api_get", mock_api_get)
+
+        batch = serve.fetch_batch_readings([station])
+        assert batch == {station["measureId"]: [{"dateTime": item["dateTime"], "value": 0.6}]}
+        assert [u.rsplit("_offset=", 1)[1] for u in urls] == ["0", "2", "4"]
+
+    def test_filling_every_page_falls_back_to_per_measure(self, data_dir, monkeypatch):
+        """Reaching MAX_BATCH_PAGES full pages means the response may be cut short, so it isn't used."""
+        monkeypatch.setattr(serve, "BATCH_PAGE_SIZE", 1)
+        station = serve.STATIONS[0]
+        self._seed(data_dir, station, datetime.now(UTC))
+        item = {"measure": station["measureId"], "dateTime": iso(datetime.now(UTC)), "value": 0.5}
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [item]})
+
+        assert serve.fetch_batch_readings([station]) == {}
+
+    def test_failed_batch_falls_back_to_per_measure(self, data_dir, monkeypatch):
+        station = serve.STATIONS[0]
+        self._seed(data_dir, station, datetime.now(UTC))
+        monkeypatch.setattr(serve, "api_get", lambda url: None)
+
+        assert serve.fetch_batch_readings([station]) == {}
+
+    def test_stations_an_hour_behind_skip_batch(self, data_dir, monkeypatch):
+        """?latest can't cover a station several readings behind, so it isn't requested for one."""
+        self._seed(data_dir, serve.STATIONS[0], datetime.now(UTC) - timedelta(hours=1))
+        monkeypatch.setattr(serve, "api_get", MagicMock())
+
+        assert serve.fetch_batch_readings(serve.STATIONS[:1]) == {}
+        serve.api_get.assert_not_called()
+
+    def test_no_stored_stations_skips_batch(self, data_dir, monkeypatch):
+        monkeypatch.setattr(serve, "api_get", MagicMock())
+
+        assert serve.fetch_batch_readings(serve.STATIONS) == {}
+        serve.api_get.assert_not_called()
+
 
 # ============================================================
 # _atomic_write_csv — atomic file write in serve.py
@@ -272,6 +771,110 @@ class TestAtomicWriteServe:
         assert tmp_files == []
 
 
+# ============================================================
+# StationPoller — adaptive background refresh
+# ============================================================
+
+
+class TestStationPoller:
+    @staticmethod
+    def write_readings(data_dir, station, values, step=15):
+        """Readings `step` minutes apart, ending now."""
+        now = datetime.now(UTC).replace(second=0, microsecond=0)
+        times = [(now - timedelta(minutes=step * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(len(values) - 1, -1, -1)]
+        with open(data_dir / station["file"], "w", newline="") as f:
+            csv.writer(f).writerows(
+                [partitions.HEADER, *([t, v, "m", station["id"], station["label"]] for t, v in zip(times, values, strict=True))]
+            )
+
+    def test_parse_duration(self):
+        assert [serve.parse_duration(v) for v in ("900", "90s", "15m", "1.5h")] == [900, 90, 900, 5400]
+        with pytest.raises(ValueError):
+            serve.parse_duration("15 minutes")
+
+    @pytest.mark.parametrize(
+        ("station_type", "values", "activity"),
+        [
+            ("level", ["0.50", "0.50", "0.51", "0.50", "0.50"], "normal"),
+            ("level", ["0.50", "0.52", "0.54", "0.56", "0.58"], "active"),  # rising 8 cm/hr
+            ("level", ["1.40", "1.40", "1.40", "1.39", "1.40"], "active"),  # above 70% of a 1.8 m typical high
+            ("tidal", ["0.50", "0.70", "0.90", "1.10", "1.30"], "normal"),  # a rising tide isn't a flood
+            ("rainfall", ["0.2", "0.0", "0.0", "0.0", "0.0"], "normal"),
+            ("rainfall", ["0.0", "0.0", "0.0", "0.0", "0.0"], "quiet"),
+        ],
+    )
+    def test_station_activity(self, data_dir, station_type, values, activity):
+        station = next(s for s in serve.STATIONS if s["type"] == station_type)
+        self.write_readings(data_dir, station, values)
+        assert serve.station_activity(station) == activity
+
+    def test_due_stations_are_refreshed_together_then_rescheduled_by_activity(self, data_dir, monkeypatch):
+        monkeypatch.setattr(serve, "_jobs", {})
+        refreshed = []
+        monkeypatch.setattr(serve, "refresh_all", lambda on_result, stations: refreshed.append([s["id"] for s in stations]))
+        busy, dry = serve.STATIONS[0], next(s for s in serve.STATIONS if s["type"] == "rainfall")
+        self.write_readings(data_dir, busy, ["1.40", "1.50"])
+        self.write_readings(data_dir, dry, ["0.0", "0.0"])
+
+        poller = serve.StationPoller(900)
+        later = time.monotonic() + 3600
+        poller.due = {s["id"]: later for s in serve.STATIONS} | {busy["id"]: 0, dry["id"]: 0}
+        started = time.monotonic()
+        assert poller.poll_due().status == "done"
+        assert refreshed == [[busy["id"], dry["id"]]]
+        assert 900 * 0.25 * 0.9 <= poller.due[busy["id"]] - started <= 900 * 0.25 * 1.1 + 5
+        assert 900 * 4 * 0.9 <= poller.due[dry["id"]] - started <= 900 * 4 * 1.1 + 5
+        assert poller.poll_due() is None
+
+
+# ============================================================
+# station_update — the data of /api/stream events
+# ============================================================
+
+
+class TestStationUpdate:
+    @pytest.mark.parametrize(
+        ("station_type", "values", "trend"),
+        [
+            ("level", ["0.50", "0.52", "0.54", "0.56", "0.58"], "rising"),
+            ("level", ["0.58", "0.56", "0.54", "0.52", "0.50"], "falling"),
+            ("tidal", ["0.50", "0.50", "0.51", "0.50", "0.50"], "steady"),
+            ("level", ["0.50", "0.52", "0.54"], None),  # too few readings for a trend
+            ("rainfall", ["0.2", "0.4", "0.6", "0.8", "1.0"], None),
+        ],
+    )
+    def test_trend_matches_the_frontend(self, data_dir, station_type, values, trend):
+        station = next(s for s in serve.STATIONS if s["type"] == station_type)
+        TestStationPoller.write_readings(data_dir, station, values)
+        assert serve.station_trend(station) == trend
+
+    def test_update_carries_readings_after_since(self, data_dir):
+        station = serve.STATIONS[0]
+        TestStationPoller.write_readings(data_dir, station, ["0.50", "0.52", "0.54", "0.56", "0.58"])
+        rows = serve.station_series(station).rows
+
+        update = serve.station_update(station, rows[2][0])
+        assert update["readings"] == [{"dateTime": rows[3][0], "value": 0.56}, {"dateTime": rows[4][0], "value": 0.58}]
+        assert update["latest"] == update["readings"][-1]
+        assert (update["id"], update["type"], update["trend"]) == (station["id"], "level", "rising")
+        assert serve.station_update(station, rows[4][0])["readings"] == []
+
+    def test_refresh_with_new_readings_rewrites_the_snapshot(self, data_dir, monkeypatch):
+        station = serve.STATIONS[0]
+        TestStationPoller.write_readings(data_dir, station, ["0.50", "0.52", "0.54", "0.56", "0.58"])
+        serve.save_latest()
+        assert snapshot.read(str(data_dir))["stations"][station["id"]]["value"] == 0.58
+
+        latest = serve.station_series(station).rows[-1][0]
+        new = (datetime.fromisoformat(latest.replace("Z", "+00:00")) + timedelta(minutes=15)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        monkeypatch.setattr(serve, "fetch_batch_readings", lambda stations: {})
+        monkeypatch.setattr(serve, "api_get", lambda url: {"items": [{"dateTime": new, "value": 1.3}]})
+        serve.refresh_all(stations=[station])
+
+        entry = snapshot.read(str(data_dir))["stations"][station["id"]]
+        assert entry == {"type": "level", "dateTime": new, "value": 1.3, "trend": "rising", "status": "high"}
+
+
 # ============================================================
 # start_server — bind warning
 # ============================================================
@@ -283,9 +886,11 @@ class TestBindWarning:
         mock_server.server_address = (bind_addr, 8080)
         mock_server.serve_forever.side_effect = KeyboardInterrupt
 
-        monkeypatch.setattr(serve, "ReusableHTTPServer", lambda addr, handler: mock_server)
+        monkeypatch.setattr(serve, "PooledHTTPServer", lambda addr, handler, workers: mock_server)
         monkeypatch.setattr(serve, "PID_FILE", str(tmp_path / ".server.pid"))
         monkeypatch.setattr(serve, "read_pid", lambda: None)
+        monkeypatch.setattr(serve, "DATA_DIR", str(tmp_path))
+        monkeypatch.setattr(serve, "_series_cache", {})
 
         serve.start_server(8080, bind_addr)
         return capsys.readouterr()
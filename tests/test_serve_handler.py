@@ -1,10 +1,14 @@
 """Tests for serve.py — FloodwatchHandler HTTP behaviour."""
 
 import csv
+import gzip
 import json
+import os
+import socket
 import sys
 import threading
 import urllib.error
+import urllib.parse
 import urllib.request
 from pathlib import Path
 
@@ -21,7 +25,10 @@ def server(tmp_path, monkeypatch):
     data_dir = tmp_path / "data"
     data_dir.mkdir()
     monkeypatch.setattr(serve, "DATA_DIR", str(data_dir))
-    monkeypatch.setattr(serve, "_last_refresh", 0)
+    monkeypatch.setattr(serve, "_latest_refresh", None)
+    monkeypatch.setattr(serve, "_jobs", {})
+    monkeypatch.setattr(serve, "_series_cache", {})
+    monkeypatch.setattr(serve, "_stream_hub", None)
 
     # Write a sample CSV so we can test cache headers
     sample_csv = data_dir / "test.csv"
@@ -31,9 +38,11 @@ def server(tmp_path, monkeypatch):
         writer.writerow(["2026-01-01T00:00:00Z", "0.5"])
 
     # Mock refresh_station to avoid real API calls
-    monkeypatch.setattr(serve, "refresh_station", lambda s: {"id": s["id"], "label": s["label"], "new_readings": 0, "total": 100})
+    monkeypatch.setattr(
+        serve, "refresh_station", lambda s, batch_items=None: {"id": s["id"], "label": s["label"], "new_readings": 0, "total": 100}
+    )
 
-    httpd = serve.ReusableHTTPServer(("::1", 0), serve.FloodwatchHandler)
+    httpd = serve.PooledHTTPServer(("::1", 0), serve.FloodwatchHandler, workers=4)
     port = httpd.server_address[1]
     thread = threading.Thread(target=httpd.serve_forever, daemon=True)
     thread.start()
@@ -42,32 +51,100 @@ def server(tmp_path, monkeypatch):
 
     httpd.shutdown()
     httpd.server_close()
+    serve.close_stream()
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def open_stream(server, *headers):
+    """Open /api/stream; returns the stream positioned after its `retry:` preamble."""
+    sock = socket.create_connection(("::1", urllib.parse.urlsplit(server).port), timeout=10)
+    sock.sendall("\r\n".join(["GET /api/stream HTTP/1.1", "Host: localhost", *headers, "", ""]).encode())
+    stream = sock.makefile("rb")
+    sock.close()  # the file keeps the connection open
+    head = b"".join(iter(stream.readline, b"\r\n"))
+    assert head.startswith(b"HTTP/1.0 200") and b"Content-Type: text/event-stream" in head
+    assert stream.readline() == b"retry: 5000\n"
+    assert stream.readline() == b"\n"
+    return stream
+
+
+def read_event(stream):
+    """The next event's fields; a comment comes back under the name ''."""
+    fields = {}
+    while line := stream.readline().decode().rstrip("\n"):
+        name, _, value = line.partition(": ")
+        fields[name] = value
+    return fields
+
+
+def wait_for_job(server, job):
+    """Poll a refresh job's status until it has finished."""
+    while job["status"] in ("queued", "running"):
+        threading.Event().wait(0.01)
+        job = get_json(server + job["url"])
+    return job
 
 
 class TestFloodwatchHandler:
-    def test_post_refresh_returns_200(self, server):
-        """POST /refresh.php returns 200 with valid JSON."""
+    def test_post_refresh_returns_202_with_a_job(self, server):
+        """POST /refresh.php starts a background job at once; GET /refresh/<id> reports its results."""
         req = urllib.request.Request(f"{server}/refresh.php", method="POST", data=b"")
         with urllib.request.urlopen(req, timeout=10) as resp:
-            assert resp.status == 200
-            body = json.loads(resp.read())
-            assert body["success"] is True
+            assert resp.status == 202
+            job = json.loads(resp.read())
+            assert resp.headers["Location"] == job["url"] == f"/refresh/{job['id']}"
 
-    def test_rate_limiting_returns_429(self, server, monkeypatch):
-        """Second POST within 5 minutes returns 429."""
-        # First request succeeds
-        req1 = urllib.request.Request(f"{server}/refresh.php", method="POST", data=b"")
-        with urllib.request.urlopen(req1, timeout=10) as resp:
-            assert resp.status == 200
+        job = wait_for_job(server, job)
+        assert job["status"] == "done"
+        assert job["completed"] == job["total"] == len(serve.STATIONS)
+        assert [d["id"] for d in job["details"]] == [s["id"] for s in serve.STATIONS]
 
-        # Second request should be rate-limited
-        req2 = urllib.request.Request(f"{server}/refresh.php", method="POST", data=b"")
         with pytest.raises(urllib.error.HTTPError) as exc_info:
-            urllib.request.urlopen(req2, timeout=10)
-        assert exc_info.value.code == 429
-        body = json.loads(exc_info.value.read())
-        assert body["success"] is False
-        assert "retry_after" in body
+            urllib.request.urlopen(f"{server}/refresh/0123456789abcdef", timeout=10)
+        assert exc_info.value.code == 404
+
+    def test_job_reports_stations_as_they_complete(self, server, monkeypatch):
+        release = threading.Event()
+
+        def refresh_station(station, batch_items=None):
+            if station is serve.STATIONS[2]:
+                release.wait(10)
+            return {"id": station["id"], "label": station["label"], "new_readings": 1, "total": 100}
+
+        monkeypatch.setattr(serve, "refresh_station", refresh_station)
+        req = urllib.request.Request(f"{server}/refresh", method="POST", data=b"")
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            job = json.loads(resp.read())
+        try:
+            # Stations refresh in parallel, so the others finish while the third is held up
+            while job["completed"] < len(serve.STATIONS) - 1:
+                job = get_json(server + job["url"])
+            assert job["status"] == "running"
+            assert job["stations_updated"] == len(serve.STATIONS) - 1
+            assert [d["id"] for d in job["details"]] == [s["id"] for s in serve.STATIONS if s is not serve.STATIONS[2]]
+        finally:
+            release.set()
+        assert wait_for_job(server, job)["stations_updated"] == len(serve.STATIONS)
+
+    def test_recent_refresh_is_served_instead_of_repeated(self, server):
+        """A POST within 5 minutes of a finished refresh gets its results (200), not a 429 or a new refresh."""
+        req = urllib.request.Request(f"{server}/refresh.php", method="POST", data=b"")
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            job = wait_for_job(server, json.loads(resp.read()))
+
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            assert resp.status == 200
+            assert json.loads(resp.read()) == job
+
+        serve._latest_refresh.finished_at -= serve._REFRESH_FRESH_FOR
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            assert resp.status == 202
+            assert json.loads(resp.read())["id"] != job["id"]
+        wait_for_job(server, serve._latest_refresh.to_dict())
 
     def test_options_returns_cors_headers(self, server):
         """OPTIONS /refresh returns CORS headers."""
@@ -77,15 +154,159 @@ class TestFloodwatchHandler:
             assert "POST" in resp.headers.get("Access-Control-Allow-Methods", "")
 
     def test_csv_has_no_cache_headers(self, server):
-        """GET for a .csv file includes Cache-Control: no-cache.
+        """GET for a .csv file includes Cache-Control: no-cache (revalidate), not no-store, and an ETag.
 
         Uses an actual CSV from the project's data/ directory since
         FloodwatchHandler serves from the script's own directory.
         """
         with urllib.request.urlopen(f"{server}/data/stations.csv", timeout=10) as resp:
             assert resp.status == 200
-            cache_control = resp.headers.get("Cache-Control", "")
-            assert "no-cache" in cache_control
+            assert resp.headers["Cache-Control"] == "no-cache"
+            assert resp.headers["ETag"].startswith('"')
+
+    def test_conditional_get_returns_304(self, server):
+        url = f"{server}/data/stations.csv"
+        with urllib.request.urlopen(url, timeout=10) as resp:
+            etag, last_modified = resp.headers["ETag"], resp.headers["Last-Modified"]
+
+        for headers in ({"If-None-Match": etag}, {"If-None-Match": f'"other", W/{etag}'}, {"If-Modified-Since": last_modified}):
+            with pytest.raises(urllib.error.HTTPError) as exc_info:
+                urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=10)
+            assert exc_info.value.code == 304
+            assert exc_info.value.headers["ETag"] == etag
+
+        # If-None-Match wins over If-Modified-Since, and the gzip body has an ETag of its own
+        req = urllib.request.Request(url, headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            assert resp.status == 200
+        req = urllib.request.Request(url, headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            assert resp.status == 200
+            assert resp.headers["ETag"] != etag
+
+    def test_versioned_geojson_is_immutable(self, server):
+        with urllib.request.urlopen(f"{server}/data/tarka_line.geojson?v=v1.4.1", timeout=10) as resp:
+            assert resp.headers["Cache-Control"] == f"public, max-age={365 * 86400}, immutable"
+        with urllib.request.urlopen(f"{server}/data/tarka_line.geojson", timeout=10) as resp:
+            assert resp.headers["Cache-Control"] == "no-cache"
+
+    def test_csv_is_gzipped_when_accepted(self, server):
+        """A client sending Accept-Encoding: gzip gets a gzip body with Vary."""
+        req = urllib.request.Request(f"{server}/data/stations.csv", headers={"Accept-Encoding": "gzip"})
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            assert resp.headers["Content-Encoding"] == "gzip"
+            assert resp.headers["Vary"] == "Accept-Encoding"
+            body = gzip.decompress(resp.read())
+        assert body == (Path(serve.__file__).parent / "data" / "stations.csv").read_bytes()
+
+    def test_csv_is_sent_as_is_without_accept_encoding(self, server):
+        with urllib.request.urlopen(f"{server}/data/stations.csv", timeout=10) as resp:
+            assert "Content-Encoding" not in resp.headers
+            assert resp.headers["Vary"] == "Accept-Encoding"
+
+    def test_readings_api_returns_range(self, server):
+        """GET /api/readings returns only the requested slice, as compact JSON or CSV."""
+        station = serve.STATIONS[0]
+        with open(Path(serve.DATA_DIR) / station["file"], "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+            writer.writerows([f"2026-02-10T{h:02d}:00:00Z", "0.5", "m", station["id"], station["label"]] for h in range(24))
+
+        query = f"station={station['id']}&from=2026-02-10T06:00:00Z&to=2026-02-10T08:00:00%2B00:00"
+        with urllib.request.urlopen(f"{server}/api/readings?{query}", timeout=10) as resp:
+            body = json.loads(resp.read())
+        assert body["readings"] == [["2026-02-10T06:00:00Z", 0.5], ["2026-02-10T07:00:00Z", 0.5], ["2026-02-10T08:00:00Z", 0.5]]
+        assert body["to"] == "2026-02-10T08:00:00Z"
+
+        with urllib.request.urlopen(f"{server}/api/readings?{query}&format=csv", timeout=10) as resp:
+            assert resp.headers["Content-Type"].startswith("text/csv")
+            assert resp.read().decode().splitlines() == ["dateTime,value", *[f"2026-02-10T0{h}:00:00Z,0.5" for h in (6, 7, 8)]]
+
+    def test_readings_api_downsamples_to_points(self, server):
+        station = serve.STATIONS[0]
+        with open(Path(serve.DATA_DIR) / station["file"], "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+            writer.writerows(
+                [f"2026-02-10T{h:02d}:{m:02d}:00Z", "0.5", "m", station["id"], station["label"]] for h in range(24) for m in (0, 30)
+            )
+
+        with urllib.request.urlopen(f"{server}/api/readings?station={station['id']}&points=12", timeout=10) as resp:
+            readings = json.loads(resp.read())["readings"]
+        assert len(readings) == 12
+        assert (readings[0][0], readings[-1][0]) == ("2026-02-10T00:00:00Z", "2026-02-10T23:30:00Z")
+
+    def test_delta_api_returns_only_newer_readings(self, server):
+        """GET /api/readings/delta returns readings after `since` for the listed stations, in one response."""
+        first, second = serve.STATIONS[:2]
+        for station in (first, second):
+            with open(Path(serve.DATA_DIR) / station["file"], "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+                writer.writerows([f"2026-02-10T{h:02d}:00:00Z", "0.5", "m", station["id"], station["label"]] for h in range(24))
+
+        query = f"since=2026-02-10T21:00:00Z&stations={first['id']},{second['id']}"
+        with urllib.request.urlopen(f"{server}/api/readings/delta?{query}", timeout=10) as resp:
+            body = json.loads(resp.read())
+        assert body["since"] == "2026-02-10T21:00:00Z"
+        assert list(body["readings"]) == [first["id"], second["id"]]
+        assert body["readings"][first["id"]] == [["2026-02-10T22:00:00Z", 0.5], ["2026-02-10T23:00:00Z", 0.5]]
+
+        with urllib.request.urlopen(
+            f"{server}/api/readings/delta?since=2026-02-10T22:00:00Z&stations={second['id']}&format=csv", timeout=10
+        ) as resp:
+            assert resp.read().decode().splitlines() == ["station,dateTime,value", f"{second['id']},2026-02-10T23:00:00Z,0.5"]
+
+    def test_latest_api(self, server):
+        """GET /api/latest returns every station's latest reading from the series cache, as data/latest.json holds it."""
+        station = serve.STATIONS[0]
+        with open(Path(serve.DATA_DIR) / station["file"], "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+            writer.writerows([f"2026-02-10T{h:02d}:00:00Z", "1.5", "m", station["id"], station["label"]] for h in range(24))
+
+        with urllib.request.urlopen(f"{server}/api/latest", timeout=10) as resp:
+            body = json.loads(resp.read())
+        assert body == {
+            "stations": {
+                station["id"]: {"type": "level", "dateTime": "2026-02-10T23:00:00Z", "value": 1.5, "trend": None, "status": "high"}
+            },
+            "partitioned": [],
+        }
+
+    def test_rollups_api(self, server):
+        """GET /api/rollups returns daily rainfall totals, built from the CSV on first use."""
+        station = next(s for s in serve.STATIONS if s["type"] == "rainfall")
+        with open(Path(serve.DATA_DIR) / station["file"], "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+            writer.writerows(
+                [f"2026-02-{d}T{h:02d}:00:00Z", "0.2", "mm", station["id"], station["label"]] for d in (10, 11) for h in range(24)
+            )
+
+        with urllib.request.urlopen(f"{server}/api/rollups?station={station['id']}&period=daily&from=2026-02-11", timeout=10) as resp:
+            body = json.loads(resp.read())
+        assert body["columns"] == ["period", "count", "total"]
+        assert body["rows"] == [["2026-02-11", 24, 4.8]]
+
+    @pytest.mark.parametrize(
+        ("path", "query", "status"),
+        [
+            ("readings", "station=nope", 404),
+            ("readings", "", 400),
+            ("readings", "station=50149&from=yesterday", 400),
+            ("readings", "station=50149&points=2", 400),
+            ("rollups", "station=50149&period=weekly", 400),
+            ("readings/delta", "stations=50149", 400),
+            ("readings/delta", "since=yesterday", 400),
+            ("readings/delta", "since=2026-02-10T00:00:00Z&stations=50149,nope", 404),
+        ],
+    )
+    def test_api_rejects_bad_queries(self, server, path, query, status):
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            urllib.request.urlopen(f"{server}/api/{path}?{query}", timeout=10)
+        assert exc_info.value.code == status
+        assert json.loads(exc_info.value.read())["success"] is False
 
     def test_post_to_unknown_path_returns_404(self, server):
         """POST to a non-refresh path returns 404."""
@@ -93,3 +314,165 @@ class TestFloodwatchHandler:
         with pytest.raises(urllib.error.HTTPError) as exc_info:
             urllib.request.urlopen(req, timeout=10)
         assert exc_info.value.code == 404
+
+
+class TestPooledServer:
+    def test_site_stays_responsive_during_a_refresh(self, server, monkeypatch):
+        """While a refresh job runs, other requests are answered, and concurrent refreshes all join it."""
+        release = threading.Event()
+        runs = []
+        monkeypatch.setattr(serve, "refresh_all", lambda on_result, stations: runs.append(stations) or release.wait(10))
+
+        def post_refresh():
+            with urllib.request.urlopen(urllib.request.Request(f"{server}/refresh", method="POST", data=b""), timeout=5) as resp:
+                return resp.status, json.loads(resp.read())
+
+        assert post_refresh()[0] == 202
+        job = serve._latest_refresh.to_dict()
+        try:
+            with urllib.request.urlopen(f"{server}/data/stations.csv", timeout=5) as resp:
+                assert resp.status == 200
+            joined = []
+            posts = [threading.Thread(target=lambda: joined.append(post_refresh())) for _ in range(3)]
+            for post in posts:
+                post.start()
+            for post in posts:
+                post.join()
+            assert [(s, j["id"]) for s, j in joined] == [(202, job["id"])] * 3
+        finally:
+            release.set()
+        assert wait_for_job(server, job)["status"] == "done"
+        assert len(runs) == 1
+
+    def test_connections_beyond_the_queue_get_503(self):
+        started, release = threading.Event(), threading.Event()
+
+        class SlowHandler(serve.FloodwatchHandler):
+            def do_GET(self):
+                started.set()
+                release.wait(10)
+                self.send_response(204)
+                self.end_headers()
+
+        httpd = serve.PooledHTTPServer(("::1", 0), SlowHandler, workers=1, queue_size=1)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        clients = []
+        try:
+            for _ in range(3):
+                client = socket.create_connection(httpd.server_address[:2], timeout=10)
+                client.sendall(b"GET / HTTP/1.0\r\n\r\n")
+                clients.append(client)
+                started.wait(10)  # the first is with the worker before the others arrive
+            assert clients[2].recv(64).startswith(b"HTTP/1.0 503")
+            release.set()
+            assert [c.recv(64).split(b"\r\n")[0].split()[1] for c in clients[:2]] == [b"204", b"204"]
+        finally:
+            release.set()
+            for client in clients:
+                client.close()
+            httpd.shutdown()
+            httpd.server_close()
+
+
+class TestEventStream:
+    def write_station(self, station, hours):
+        with open(Path(serve.DATA_DIR) / station["file"], "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dateTime", "value", "unit", "station_id", "station_label"])
+            writer.writerows([f"2026-02-10T{h:02d}:00:00Z", f"0.{h}", "m", station["id"], station["label"]] for h in hours)
+
+    def test_refresh_pushes_new_readings(self, server, monkeypatch):
+        station = serve.STATIONS[0]
+        self.write_station(station, [10])
+
+        def refresh_station(s, batch_items=None):
+            if s is not station:
+                return {"id": s["id"], "label": s["label"], "new_readings": 0, "total": 0}
+            self.write_station(station, [10, 11, 12])
+            return {"id": s["id"], "label": s["label"], "new_readings": 2, "total": 3}
+
+        monkeypatch.setattr(serve, "refresh_station", refresh_station)
+        stream = open_stream(server)
+        req = urllib.request.Request(f"{server}/refresh", method="POST", data=b"")
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            wait_for_job(server, json.loads(resp.read()))
+
+        event = read_event(stream)
+        assert event["event"] == "readings"
+        assert event["id"] == f"{serve._stream_hub.epoch}-1"
+        update = json.loads(event["data"])
+        assert update["id"] == station["id"]
+        assert update["readings"] == [
+            {"dateTime": "2026-02-10T11:00:00Z", "value": 0.11},
+            {"dateTime": "2026-02-10T12:00:00Z", "value": 0.12},
+        ]
+        assert update["latest"] == update["readings"][-1]
+        stream.close()
+
+    def test_reconnect_resumes_after_last_event_id(self, server):
+        open_stream(server).close()
+        hub = serve._stream_hub
+        for n in range(3):
+            hub.publish("readings", {"n": n})
+
+        stream = open_stream(server, f"Last-Event-ID: {hub.epoch}-1")
+        assert [json.loads(read_event(stream)["data"])["n"] for _ in range(2)] == [1, 2]
+        stream.close()
+
+        stream = open_stream(server, "Last-Event-ID: 0123abcd-2")  # from before a restart
+        assert read_event(stream) == {"id": f"{hub.epoch}-3", "event": "reset", "data": "{}"}
+        stream.close()
+
+    def test_idle_streams_get_heartbeats(self, server, monkeypatch):
+        monkeypatch.setattr(serve, "STREAM_HEARTBEAT", 0.05)
+        stream = open_stream(server)
+        assert read_event(stream) == {"": "heartbeat"}
+        stream.close()
+
+    def test_open_streams_dont_hold_workers(self, server):
+        """Twice as many subscribers as workers, and the site is still served."""
+        streams = [open_stream(server) for _ in range(8)]
+        try:
+            with urllib.request.urlopen(f"{server}/data/stations.csv", timeout=5) as resp:
+                assert resp.status == 200
+            assert serve._stream_hub.clients() == 8
+        finally:
+            for stream in streams:
+                stream.close()
+
+
+class TestDataBody:
+    def test_stale_sibling_is_ignored_and_result_cached(self, tmp_path, monkeypatch):
+        """A .gz whose mtime doesn't match the CSV's (e.g. after refresh.php) is not served."""
+        monkeypatch.setattr(serve, "_bodies", {})
+        path = tmp_path / "level_50140_umberleigh.csv"
+        path.write_bytes(b"dateTime,value\n" * 200)
+        (tmp_path / "level_50140_umberleigh.csv.gz").write_bytes(gzip.compress(b"stale"))
+        os.utime(tmp_path / "level_50140_umberleigh.csv.gz", ns=(0, 0))
+
+        body, *_ = serve.data_body(str(path), "gzip")
+        assert gzip.decompress(body) == path.read_bytes()
+        assert serve._bodies[(str(path), "gzip")][2] is body
+        assert serve.data_body(str(path), "gzip")[0] is body
+
+    def test_current_sibling_is_served(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(serve, "_bodies", {})
+        path = tmp_path / "level_50140_umberleigh.csv"
+        path.write_bytes(b"dateTime,value\n" * 200)
+        serve.precompress.write_siblings(str(path))
+
+        body, *_ = serve.data_body(str(path), "gzip")
+        assert body == (tmp_path / "level_50140_umberleigh.csv.gz").read_bytes()
+
+    def test_body_is_kept_in_memory_until_the_file_changes(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(serve, "_bodies", {})
+        path = tmp_path / "stations.geojson"
+        path.write_bytes(b'{"type": "FeatureCollection"}')
+        body, *_ = serve.data_body(str(path))
+
+        with monkeypatch.context() as m:
+            m.setattr("builtins.open", lambda *args, **kwargs: pytest.fail("read from disk"))
+            assert serve.data_body(str(path))[0] is body
+
+        path.write_bytes(b'{"type": "FeatureCollection", "features": []}')
+        assert serve.data_body(str(path))[0] == path.read_bytes()
@@ -0,0 +1,63 @@
+"""Tests for snapshot.py — the latest-readings snapshot in data/latest.json."""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import snapshot
+
+STATION = {"id": "50140", "type": "level", "typicalRangeHigh": 2.0}
+
+# An hour of 15-minute readings rising 2 cm/hr, and a blank reading at the end
+ROWS = [[f"2026-02-10T10:{m:02d}:00Z", f"{1.4 + 0.02 * m / 60:.4f}"] for m in (0, 15, 30, 45)] + [["2026-02-10T11:00:00Z", ""]]
+
+
+class TestEntry:
+    def test_latest_numeric_reading_with_trend_and_status(self):
+        assert snapshot.entry(STATION, ROWS) == {
+            "type": "level",
+            "dateTime": "2026-02-10T10:45:00Z",
+            "value": 1.415,
+            "trend": "rising",
+            "status": "high",
+        }
+
+    def test_status_against_the_threshold(self):
+        assert snapshot.status(STATION, 1.39) == "normal"
+        assert snapshot.status(STATION, 1.4) == "high"
+        assert snapshot.status({"type": "level"}, 9.9) is None
+        assert snapshot.status({"type": "rainfall", "typicalRangeHigh": 2.0}, 9.9) is None
+
+    def test_trend_needs_readings_and_a_level(self):
+        assert snapshot.trend("level", [[t, "1.4"] for t, _ in ROWS[:4]]) == "steady"
+        assert snapshot.trend("level", ROWS[:3]) is None
+        assert snapshot.trend("rainfall", ROWS) is None
+
+    def test_rows_without_a_value_are_skipped(self):
+        rows = [*ROWS[:4], ["2026-02-10T11:00:00Z", None]]
+        assert snapshot.trend("level", rows) == "rising"
+        assert snapshot.entry(STATION, rows)["dateTime"] == "2026-02-10T10:45:00Z"
+
+    def test_station_without_values(self):
+        assert snapshot.entry(STATION, []) is None
+        assert snapshot.entry(STATION, ROWS[-1:]) is None
+
+
+class TestWrite:
+    def test_round_trip_leaves_out_stations_without_readings(self, tmp_path):
+        entries = {"50140": snapshot.entry(STATION, ROWS), "50149": None}
+        assert snapshot.write(str(tmp_path), entries, partitioned=["50149"])
+        assert snapshot.read(str(tmp_path)) == {"stations": {"50140": entries["50140"]}, "partitioned": ["50149"]}
+        assert [p.name for p in tmp_path.iterdir()] == ["latest.json"]  # no temp files, and too small for siblings
+
+    def test_unchanged_snapshot_is_not_rewritten(self, tmp_path):
+        entries = {"50140": snapshot.entry(STATION, ROWS)}
+        snapshot.write(str(tmp_path), entries)
+        path = Path(snapshot.path_for(str(tmp_path)))
+        mtime = path.stat().st_mtime_ns
+
+        assert not snapshot.write(str(tmp_path), entries)
+        assert path.stat().st_mtime_ns == mtime
+        assert json.loads(path.read_text())["stations"]["50140"]["trend"] == "rising"